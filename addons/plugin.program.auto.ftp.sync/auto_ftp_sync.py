@@ -4,15 +4,17 @@ Auto FTP Sync - Kodi service addon.
 Syncs favourites and addon_data via FTP, optional image rotation and startup file copies.
 Kodi Matrix (Python 3); cross-platform (special://, xbmcvfs).
 """
+import asyncio
 import os
 import random
 import urllib.request
 import re
+import shutil
+import threading
 import xbmc
 import xbmcaddon
 import xbmcvfs
 import time
-import zipfile
 
 #
 # =========================
@@ -47,11 +49,23 @@ def _safe_get_string(setting_id, default=''):
         return default
 
 
+def _safe_get_int(setting_id, default=0):
+    """Liest eine Zahl aus einem Text-Setting (wie sftp_port). Bei ungültigem Wert: Default."""
+    try:
+        return int(_safe_get_string(setting_id, str(default)) or default)
+    except (ValueError, TypeError):
+        return default
+
+
 def _load_settings():
     """Lädt alle Service-Settings mit sicheren Lesern; repariert defekte Werte durch Zurückschreiben der Defaults."""
     global ENABLED, IS_MAIN_SYSTEM, OVERWRITE_STATIC, CUSTOM_FOLDER, SPECIFIC_CUSTOM_FOLDER
     global STATIC_FOLDERS, IMAGE_SOURCE_IDX, IMAGE_LIST_URL, IMAGE_LOCAL_FOLDER, IMAGE_NETWORK_PATH
     global ENABLE_IMAGE_ROTATION, ENABLE_ADDON_SYNC, ENABLE_ADDON_STARTUPFILE
+    global TRANSFER_BUFFER_SIZE, RESUME_THRESHOLD, ADDON_SYNC_MODE, CHUNK_DEDUP, ADDON_SYNC_IDS, METADATA_TTL
+    global ASYNC_PIPELINE, CONNECT_TIMEOUT, READ_TIMEOUT, TRANSFER_RETRIES, SYNC_DEADLINE, SEGMENTS, SEGMENT_THRESHOLD
+    global MIRROR_MODE, MIRROR_PROFILES, STREAM_ADDON_ZIP, SEGMENT_READBACK
+    global ZIP_WORKERS, ZIP_REUSE, ZIP_LEVEL, ZIP_TEXT_METHOD, EXTRACT_WORKERS
     ENABLED = _safe_get_bool('enable_sync', False)
     IS_MAIN_SYSTEM = _safe_get_bool('is_main_system', True)
     OVERWRITE_STATIC = _safe_get_bool('overwrite_static', False)
@@ -68,7 +82,35 @@ def _load_settings():
     IMAGE_NETWORK_PATH = (_safe_get_string('image_network_path', '') or '').strip()
     ENABLE_IMAGE_ROTATION = _safe_get_bool('enable_image_rotation', False)
     ENABLE_ADDON_SYNC = _safe_get_bool('addon_sync', True)
+    ADDON_SYNC_MODE = _safe_get_int('addon_sync_mode', 0)
+    CHUNK_DEDUP = _safe_get_bool('chunk_dedup', False)
+    ADDON_SYNC_IDS = _safe_get_string('addon_sync_ids', '')
+    STREAM_ADDON_ZIP = _safe_get_bool('stream_addon_zip', False)
+    ZIP_WORKERS = _safe_get_int('zip_workers', 0)
+    ZIP_REUSE = _safe_get_bool('zip_reuse', True)
+    ZIP_LEVEL = _safe_get_int('zip_level', 6)
+    ZIP_TEXT_METHOD = _safe_get_int('zip_text_method', 0)
+    EXTRACT_WORKERS = _safe_get_int('extract_workers', 0)
     ENABLE_ADDON_STARTUPFILE = _safe_get_bool('startup_file', False)
+    TRANSFER_BUFFER_SIZE = max(16, _safe_get_int('transfer_buffer_kb', 256)) * 1024
+    if _safe_get_bool('resume_transfers', True):
+        RESUME_THRESHOLD = max(0, _safe_get_int('resume_threshold_mb', 8)) * 1024 * 1024
+    else:
+        RESUME_THRESHOLD = 0
+    METADATA_TTL = max(0, _safe_get_int('metadata_cache_ttl', 60))
+    ASYNC_PIPELINE = _safe_get_bool('async_pipeline', False)
+    CONNECT_TIMEOUT = max(1, _safe_get_int('connect_timeout_s', 10))
+    READ_TIMEOUT = max(1, _safe_get_int('read_timeout_s', 30))
+    TRANSFER_RETRIES = max(0, _safe_get_int('transfer_retries', 3))
+    SYNC_DEADLINE = max(0, _safe_get_int('sync_deadline_s', 90))
+    if _safe_get_bool('segmented_transfers', False):
+        SEGMENTS = min(16, max(1, _safe_get_int('segment_count', 4)))
+    else:
+        SEGMENTS = 1
+    SEGMENT_THRESHOLD = max(1, _safe_get_int('segment_threshold_mb', 32)) * 1024 * 1024
+    SEGMENT_READBACK = _safe_get_bool('segment_verify_readback', False)
+    MIRROR_MODE = _safe_get_bool('mirror_mode', False)
+    MIRROR_PROFILES = _safe_get_string('mirror_profiles', '')
 
 
 # Defaults (werden in _load_settings() überschrieben)
@@ -84,7 +126,32 @@ IMAGE_LOCAL_FOLDER = ''
 IMAGE_NETWORK_PATH = ''
 ENABLE_IMAGE_ROTATION = False
 ENABLE_ADDON_SYNC = True
+ADDON_SYNC_MODE = 0  # 0 = ZIP, 1 = dateiweise (Delta), 2 = ein Archiv pro Addon
+CHUNK_DEDUP = False  # große Dateien im Delta-Modus als deduplizierte Chunks
+ADDON_SYNC_IDS = ''  # Nebensystem, Modus 2: kommagetrennte Addon-IDs (leer = alle)
+STREAM_ADDON_ZIP = False  # Modus 0: ZIP ohne temporäre Datei streamen (Upload bzw. Download mit Entpacken)
+ZIP_WORKERS = 0  # Kompressions-Threads für addon_data.zip (0 = einer pro CPU-Kern)
+ZIP_REUSE = True  # unveränderte Dateien komprimiert aus dem vorherigen Archiv übernehmen
+ZIP_LEVEL = 6  # Deflate-Stufe 1-9
+ZIP_TEXT_METHOD = 0  # große Textdateien: 0 = Deflate 9, 1 = BZIP2, 2 = LZMA
+EXTRACT_WORKERS = 0  # Threads beim Entpacken (0 = 4)
 ENABLE_ADDON_STARTUPFILE = False
+TRANSFER_BUFFER_SIZE = 256 * 1024
+RESUME_THRESHOLD = 8 * 1024 * 1024
+METADATA_TTL = 60  # Sekunden, die Remote-Verzeichnislisten gecacht werden (0 = aus)
+ASYNC_PIPELINE = False  # addon_data und Favoriten gleichzeitig in einer asyncio-Event-Loop
+CONNECT_TIMEOUT = 10  # Sekunden Verbindungsaufbau
+READ_TIMEOUT = 30  # Sekunden ohne Antwort auf bestehender Verbindung
+TRANSFER_RETRIES = 3  # Wiederholungen bei vorübergehenden Netzwerkfehlern (Backoff mit Jitter)
+SYNC_DEADLINE = 90  # Zeitbudget des Start-Syncs in Sekunden (0 = unbegrenzt); Rest läuft im Hintergrund nach
+# Hintergrund-Wiederholung zurückgestellter Sync-Stufen
+DEFERRED_ATTEMPTS = 5
+DEFERRED_BASE_DELAY = 60
+SEGMENTS = 1  # parallele Segmente für große FTP-Dateien (1 = aus)
+SEGMENT_THRESHOLD = 32 * 1024 * 1024  # ab dieser Größe werden FTP-Dateien segmentiert übertragen
+SEGMENT_READBACK = False  # segmentierte Uploads zurücklesen, wenn der Server keine Prüfsumme (HASH/XCRC) kennt
+MIRROR_MODE = False  # Hauptsystem: Uploads gleichzeitig auf mehrere Profile
+MIRROR_PROFILES = ''  # Spiegel-Zielprofile, kommagetrennt (1-3; leer = alle eingerichteten)
 
 # Pfade
 ADDON_ID = ADDON.getAddonInfo('id')
@@ -97,65 +164,296 @@ IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp')
 LANGUAGE = ADDON.getLocalizedString
 
 
+# Spiegel-Modus: Zielprofil, Backend und Manifest-Artefakte des Threads, der gerade ein Ziel bedient
+_TARGET = threading.local()
+
+
 def _get_active_profile_settings():
     """
-    Liest die Einstellungen des aktiven Verbindungsprofils (nur sichere Leser).
+    Liest die Einstellungen des aktiven Verbindungsprofils (siehe resources/lib/profiles.py).
+    In einem Spiegel-Thread ist das aktive Profil dessen Zielprofil.
     Returns: dict mit connection_type, host, user, password, base_path, sftp_port
     """
-    try:
-        idx = int(_safe_get_string('active_profile', '0') or '0')
-    except (ValueError, TypeError):
-        idx = 0
-    idx = 0 if idx not in (0, 1, 2) else idx
-    if idx == 0:
-        try:
-            ct = int(_safe_get_string('connection_type', '0') or '0')
-        except (ValueError, TypeError):
-            ct = 0
-        ct = ('ftp', 'sftp', 'smb')[ct] if 0 <= ct <= 2 else 'ftp'
-        return {
-            'connection_type': ct,
-            'host': _safe_get_string('ftp_host', ''),
-            'user': _safe_get_string('ftp_user', ''),
-            'password': _safe_get_string('ftp_pass', ''),
-            'base_path': _safe_get_string('ftp_base_path', ''),
-            'sftp_port': _safe_get_string('sftp_port', '22'),
-        }
-    if idx == 1:
-        prefix = 'profile_2_'
-    else:
-        prefix = 'profile_3_'
-    try:
-        ct = int(_safe_get_string(prefix + 'connection_type', '0') or '0')
-    except (ValueError, TypeError):
-        ct = 0
-    ct = ('ftp', 'sftp', 'smb')[ct] if 0 <= ct <= 2 else 'ftp'
-    return {
-        'connection_type': ct,
-        'host': _safe_get_string(prefix + 'host', ''),
-        'user': _safe_get_string(prefix + 'user', ''),
-        'password': _safe_get_string(prefix + 'pass', ''),
-        'base_path': _safe_get_string(prefix + 'base_path', ''),
-        'sftp_port': _safe_get_string(prefix + 'sftp_port', '22'),
-    }
+    target = getattr(_TARGET, 'profile', None)
+    if target is not None:
+        return target
+    from resources.lib import profiles
+    return profiles.get_active_profile_settings()
+
+
+_BACKEND = None
+_DEADLINE = None  # sync_backend.Deadline des laufenden Sync-Durchgangs (None = unbegrenzt)
+
+
+def _network_kwargs():
+    """Timeouts, Retries und Zeitbudget für Backends dieses Laufs."""
+    return {'connect_timeout': CONNECT_TIMEOUT, 'read_timeout': READ_TIMEOUT, 'retries': TRANSFER_RETRIES,
+            'deadline': _DEADLINE}
 
 
 def _get_backend():
-    """Return sync backend (FTP/SFTP/SMB) from active profile settings."""
-    from resources.lib import sync_backend
-    p = _get_active_profile_settings()
-    return sync_backend.get_backend(
-        p['connection_type'], p['host'], p['user'], p['password'],
-        p['base_path'] or '', p['sftp_port']
+    """
+    Return sync backend (FTP/SFTP/SMB) from active profile settings.
+    Die Instanz wird bis _close_backend() wiederverwendet, damit FTP-Sessions über den ganzen Lauf gepoolt bleiben.
+    """
+    global _BACKEND
+    if getattr(_TARGET, 'profile', None) is not None:
+        if _TARGET.backend is None:
+            _TARGET.backend = _new_backend()
+        return _TARGET.backend
+    if _BACKEND is None:
+        _BACKEND = _new_backend()
+    return _BACKEND
+
+
+def _new_backend():
+    from resources.lib import profiles
+    return profiles.get_backend(
+        _get_active_profile_settings(), buffer_size=TRANSFER_BUFFER_SIZE,
+        resume_threshold=RESUME_THRESHOLD, metadata_ttl=METADATA_TTL, segments=SEGMENTS,
+        segment_threshold=SEGMENT_THRESHOLD, segment_readback=SEGMENT_READBACK, **_network_kwargs()
     )
 
 
+def _get_transfer_workers():
+    """Worker-Anzahl für parallele Transfers des aktiven Verbindungstyps (Setting transfer_workers_<typ>, 0 = Standard)."""
+    from resources.lib import transfer_jobs
+    ct = _get_active_profile_settings()['connection_type']
+    return transfer_jobs.get_worker_count(ct, _safe_get_int('transfer_workers_' + ct, 0))
+
+
+_PIPELINE_ACTIVE = False  # async Pipeline läuft: Backend erst an ihrem Ende schließen
+
+
+def _close_backend():
+    """Schließt gepoolte Verbindungen am Ende eines Sync-Laufs (loggt Verbindungs-/Handshake-Zähler)."""
+    global _BACKEND
+    if getattr(_TARGET, 'profile', None) is not None:
+        backend, _TARGET.backend = _TARGET.backend, None
+    elif not _PIPELINE_ACTIVE:
+        backend, _BACKEND = _BACKEND, None
+    else:
+        return
+    if backend is not None:
+        try:
+            backend.close()
+        except Exception as e:
+            xbmc.log(f"[AutoFTP] Backend close: {e}", xbmc.LOGERROR)
+
+
+_SYNC_STATE = None
+_APPLIED_STATE = None
+_REMOTE_MANIFEST = False      # False = in diesem Lauf noch nicht geladen, None = nicht vorhanden
+_REMOTE_MANIFEST_LOCK = threading.Lock()  # Executor-Threads der async Pipeline laden es nur einmal
+_MANIFEST_ARTIFACTS = {}      # Hauptsystem: in diesem Lauf hochgeladene/bestätigte Artefakte für manifest.json
+_MIRROR_ARTIFACTS = {}        # Spiegel-Modus: dasselbe je Zielprofil (Index -> Artefakte)
+
+
+def _get_sync_state():
+    """Lokaler Sync-Status (Größe/mtime/Hash der zuletzt hochgeladenen Dateien je Profil)."""
+    global _SYNC_STATE
+    if _SYNC_STATE is None:
+        from resources.lib import sync_state
+        _SYNC_STATE = sync_state.SyncState()
+    return _SYNC_STATE
+
+
+def _get_applied_state():
+    """Nebensystem: Hashes der zuletzt heruntergeladenen und angewendeten Artefakte je Profil."""
+    global _APPLIED_STATE
+    if _APPLIED_STATE is None:
+        from resources.lib import sync_state
+        _APPLIED_STATE = sync_state.SyncState(sync_state.APPLIED_FILE)
+    return _APPLIED_STATE
+
+
+def _save_sync_state():
+    if _SYNC_STATE is not None:
+        _SYNC_STATE.save()
+    if _APPLIED_STATE is not None:
+        _APPLIED_STATE.save()
+
+
+def _artifact_name(remote_path):
+    """Name eines Artefakts im Manifest (Pfad relativ zu auto_fav_sync/<custom_folder>/), sonst None."""
+    base = _remote_path(CUSTOM_FOLDER) + '/'
+    return remote_path[len(base):] if CUSTOM_FOLDER and remote_path.startswith(base) else None
+
+
+def _manifest_artifacts():
+    """Artefakte für manifest.json des aktiven Profils (im Spiegel-Thread: des Zielprofils)."""
+    target = getattr(_TARGET, 'profile', None)
+    if target is not None:
+        return _MIRROR_ARTIFACTS.setdefault(target['index'], {})
+    return _MANIFEST_ARTIFACTS
+
+
+def _note_artifact(remote_path, sig):
+    name = _artifact_name(remote_path)
+    if name and sig.get('hash'):
+        _manifest_artifacts()[name] = {'hash': sig['hash'], 'size': sig['size']}
+
+
+def _get_remote_manifest():
+    """
+    Lädt manifest.json des Custom-Ordners einmal pro Lauf (None, wenn nicht vorhanden).
+    Thread-sicher: parallele Aufrufer warten auf den ersten Download, statt None zu sehen.
+    """
+    global _REMOTE_MANIFEST
+    with _REMOTE_MANIFEST_LOCK:
+        if _REMOTE_MANIFEST is False:
+            from resources.lib import sync_state
+            tmp = os.path.join(xbmcvfs.translatePath('special://temp'), 'auto_ftp_sync_manifest.json')
+            manifest = None
+            if _get_backend().download(_remote_path(CUSTOM_FOLDER, sync_state.MANIFEST_NAME), tmp):
+                manifest = sync_state.read_manifest(tmp)
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            if manifest:
+                xbmc.log(f"[AutoFTP] Manifest Generation {manifest['generation']} geladen", xbmc.LOGINFO)
+            _REMOTE_MANIFEST = manifest
+    return _REMOTE_MANIFEST
+
+
+def _check_download(remote_path, local_path):
+    """
+    Prüft anhand von manifest.json, ob remote_path seit dem letzten angewendeten Download unverändert ist.
+    Ohne Manifest-Eintrag werden Größe/mtime aus dem Remote-Metadaten-Cache des Backends verglichen.
+
+    Returns:
+        dict | None: Eintrag für _record_download() ({} wenn nichts vergleichbar ist), oder None wenn übersprungen werden kann.
+    """
+    manifest = _get_remote_manifest()
+    name = _artifact_name(remote_path)
+    entry = manifest['artifacts'].get(name) if manifest and name else None
+    if not entry:
+        return _check_download_stat(remote_path, local_path)
+    applied = _get_applied_state().get(_profile_key(), remote_path)
+    if applied.get('hash') == entry.get('hash') and os.path.exists(local_path):
+        xbmc.log(f"[AutoFTP] Unverändert laut Manifest, Download übersprungen: {remote_path} "
+                 f"({entry.get('size', 0)} Bytes eingespart)", xbmc.LOGDEBUG)
+        return None
+    return dict(entry, generation=manifest['generation'])
+
+
+def _check_download_stat(remote_path, local_path):
+    """Fallback ohne Manifest: remote Größe/mtime (gecachtes Listing) mit dem zuletzt angewendeten Stand vergleichen."""
+    remote = _get_backend().stat(remote_path)
+    if not remote or remote.get('size') is None or not remote.get('mtime'):
+        return {}
+    sig = {'remote_size': remote['size'], 'remote_mtime': remote['mtime']}
+    applied = _get_applied_state().get(_profile_key(), remote_path)
+    if all(applied.get(k) == v for k, v in sig.items()) and os.path.exists(local_path):
+        xbmc.log(f"[AutoFTP] Remote unverändert (Größe/mtime), Download übersprungen: {remote_path} "
+                 f"({remote['size']} Bytes eingespart)", xbmc.LOGDEBUG)
+        return None
+    return sig
+
+
+def _record_download(remote_path, entry):
+    """Merkt sich den angewendeten Manifest-Eintrag nach erfolgreichem Download."""
+    if entry:
+        _get_applied_state().record(_profile_key(), remote_path, entry)
+
+
+def publish_manifest():
+    """
+    Hauptsystem: schreibt manifest.json (Generation + Hash/Größe je Artefakt) in den Custom-Ordner,
+    sofern sich seit der letzten Veröffentlichung etwas geändert hat.
+
+    Returns:
+        bool: True wenn das Manifest aktuell ist.
+    """
+    artifacts = _manifest_artifacts()
+    if not IS_MAIN_SYSTEM or not CUSTOM_FOLDER or not artifacts:
+        return False
+    import json
+    from resources.lib import sync_state
+    backend = _get_backend()
+    remote = _remote_path(CUSTOM_FOLDER, sync_state.MANIFEST_NAME)
+    tmp = os.path.join(xbmcvfs.translatePath('special://temp'), f'auto_ftp_sync_manifest{_target_suffix()}.json')
+    try:
+        current = sync_state.read_manifest(tmp) if backend.download(remote, tmp) else None
+        manifest = sync_state.updated_manifest(current, artifacts)
+        if manifest is None:
+            xbmc.log("[AutoFTP] Manifest unverändert.", xbmc.LOGDEBUG)
+            return True
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        if backend.upload(tmp, remote):
+            xbmc.log(f"[AutoFTP] Manifest Generation {manifest['generation']} veröffentlicht", xbmc.LOGINFO)
+            return True
+        return False
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        _close_backend()
+
+
+def _target_suffix():
+    """Namenszusatz für lokale Arbeitsdateien, damit gleichzeitige Spiegel-Threads sich nicht überschreiben."""
+    target = getattr(_TARGET, 'profile', None)
+    return f"_{target['index'] + 1}" if target is not None else ''
+
+
+def _state_work_dir():
+    """Arbeitsverzeichnis der Delta-/Archiv-Engines (je Spiegel-Ziel ein eigenes Unterverzeichnis)."""
+    from resources.lib import sync_state
+    suffix = _target_suffix()
+    return os.path.join(sync_state.STATE_DIR, 'mirror' + suffix) if suffix else sync_state.STATE_DIR
+
+
+def _profile_key():
+    from resources.lib import sync_state
+    return sync_state.profile_key(_get_active_profile_settings())
+
+
+def _check_upload(local_path, remote_path):
+    """
+    Prüft, ob local_path seit dem letzten Upload nach remote_path (aktives Profil) unverändert ist.
+
+    Returns:
+        dict | None: Signatur für _record_upload(), oder None wenn der Upload übersprungen werden kann.
+    """
+    try:
+        unchanged, sig = _get_sync_state().signature(_profile_key(), remote_path, local_path)
+    except OSError as e:
+        xbmc.log(f"[AutoFTP] Sync-Status für {local_path} nicht ermittelbar: {e}", xbmc.LOGWARNING)
+        return {}
+    if unchanged:
+        xbmc.log(f"[AutoFTP] Unverändert, Upload übersprungen: {remote_path} ({sig['size']} Bytes eingespart)", xbmc.LOGDEBUG)
+        _note_artifact(remote_path, sig)
+        return None
+    return sig
+
+
+def _record_upload(remote_path, sig):
+    """Merkt sich die Signatur eines erfolgreichen Uploads (siehe _check_upload)."""
+    if sig:
+        _get_sync_state().record(_profile_key(), remote_path, sig)
+        _note_artifact(remote_path, sig)
+
+
+def _log_progress(label):
+    """Progress-Callback für Backend-Transfers: loggt in 10-%-Schritten (bzw. alle 10 MB ohne Gesamtgröße)."""
+    state = {'next': 10}
+
+    def progress(done, total):
+        if total:
+            pct = done * 100 // total
+            if pct >= state['next']:
+                xbmc.log(f"[AutoFTP] {label}: {pct}% ({done} / {total} Bytes)", xbmc.LOGDEBUG)
+                state['next'] = pct // 10 * 10 + 10
+        elif done >= state['next'] * 1024 * 1024:
+            xbmc.log(f"[AutoFTP] {label}: {done} Bytes", xbmc.LOGDEBUG)
+            state['next'] += 10
+    return progress
+
+
 def _remote_path(*path_parts):
     """Baut Remote-Pfad für Sync (Basis aus aktivem Profil). path_parts ohne führenden Slash."""
-    base = (_get_active_profile_settings()['base_path'] or '').strip().strip('/')
-    segs = [base, 'auto_fav_sync'] if base else ['auto_fav_sync']
-    segs.extend(str(p).strip('/') for p in path_parts if p)
-    return '/' + '/'.join(segs)
+    from resources.lib import profiles
+    return profiles.remote_path(_get_active_profile_settings(), *path_parts)
 
 
 def show_notification(message_id, duration=5000, **kwargs):
@@ -171,10 +469,43 @@ def show_notification(message_id, duration=5000, **kwargs):
         None
     """
     message = LANGUAGE(message_id).format(**kwargs)
+    if getattr(_TARGET, 'profile', None) is not None:
+        # Spiegel-Thread: keine Einzelmeldung je Ziel, sync_mirror() meldet das Gesamtergebnis
+        xbmc.log(f"[AutoFTP] Spiegel Profil {_TARGET.profile['index'] + 1}: {message}", xbmc.LOGINFO)
+        return
     xbmc.executebuiltin(f'Notification({LANGUAGE(30001)}, {message}, {duration}, {ICON_PATH})')
     time.sleep(duration / 1000)  # Warte, bis die Benachrichtigung abgeschlossen ist
 
 
+def _record_results(results, upload_sigs, download_entries):
+    """Merkt sich Signaturen/Manifest-Einträge der erfolgreichen TransferJobs."""
+    for r in results:
+        if r.ok and r.job.remote_path in upload_sigs:
+            _record_upload(r.job.remote_path, upload_sigs[r.job.remote_path])
+        elif r.ok and r.job.remote_path in download_entries:
+            _record_download(r.job.remote_path, download_entries[r.job.remote_path])
+
+
+def _plan_standard_favourites():
+    """
+    TransferJob für favourites.xml (leer, wenn laut Sync-Status/Manifest nichts zu tun ist).
+
+    Returns:
+        tuple: (jobs, upload_sigs, download_entries)
+    """
+    from resources.lib import transfer_jobs
+    ftp_path = _remote_path(CUSTOM_FOLDER, 'favourites.xml')
+    if IS_MAIN_SYSTEM:
+        sig = _check_upload(LOCAL_FAVOURITES, ftp_path)
+        if sig is None:
+            return [], {}, {}
+        return [transfer_jobs.TransferJob(transfer_jobs.UPLOAD, LOCAL_FAVOURITES, ftp_path)], {ftp_path: sig}, {}
+    entry = _check_download(ftp_path, LOCAL_FAVOURITES)
+    if entry is None:
+        return [], {}, {}
+    return [transfer_jobs.TransferJob(transfer_jobs.DOWNLOAD, LOCAL_FAVOURITES, ftp_path)], {}, {ftp_path: entry}
+
+
 def sync_standard_favourites():
     """
     Synchronisiert die Haupt-Favoriten (favourites.xml).
@@ -182,23 +513,26 @@ def sync_standard_favourites():
     Returns:
         bool: True bei Erfolg, sonst False.
     """
-    backend = _get_backend()
-    ftp_path = _remote_path(CUSTOM_FOLDER, 'favourites.xml')
-    if IS_MAIN_SYSTEM:
-        return backend.upload(LOCAL_FAVOURITES, ftp_path)
-    return backend.download(ftp_path, LOCAL_FAVOURITES)
+    from resources.lib import transfer_jobs
+    jobs, upload_sigs, download_entries = _plan_standard_favourites()
+    if not jobs:
+        return True
+    results = transfer_jobs.run_jobs(_get_backend(), jobs)
+    _record_results(results, upload_sigs, download_entries)
+    return results[0].ok
 
-def sync_static_favourites():
+
+def _plan_static_favourites():
     """
-    Synchronisiert statische Favoritenordner (z.B. Anime, Horror).
-    Speicherort: addon_data/plugin.program.auto.ftp.sync/Static Favourites/<folder>/favourites.xml
+    TransferJobs für die statischen Favoritenordner (nur geänderte; Überschreib-Ordner als Folgejob).
 
     Returns:
-        bool: True wenn mindestens ein Ordner verarbeitet wurde.
+        tuple: (jobs, upload_sigs, download_entries)
     """
-    if not STATIC_FOLDERS:
-        return False
-    backend = _get_backend()
+    from resources.lib import transfer_jobs
+    jobs = []
+    upload_sigs = {}
+    download_entries = {}
     for folder in STATIC_FOLDERS:
         folder_dir = os.path.join(STATIC_FAVOURITES_PATH, folder)
         if IS_MAIN_SYSTEM:
@@ -208,13 +542,57 @@ def sync_static_favourites():
         remote_static_path = _remote_path(CUSTOM_FOLDER, folder, 'favourites.xml')
         if IS_MAIN_SYSTEM:
             if xbmcvfs.exists(local_static_path):
-                backend.upload(local_static_path, remote_static_path)
+                sig = _check_upload(local_static_path, remote_static_path)
+                if sig is None:
+                    continue
+                upload_sigs[remote_static_path] = sig
+                jobs.append(transfer_jobs.TransferJob(
+                    transfer_jobs.UPLOAD, local_static_path, remote_static_path, label=folder))
         else:
-            backend.download(remote_static_path, local_static_path)
+            overwrite = None
             if OVERWRITE_STATIC and folder == SPECIFIC_CUSTOM_FOLDER:
                 specific_remote_static_path = _remote_path(SPECIFIC_CUSTOM_FOLDER, 'favourites.xml')
-                backend.download(specific_remote_static_path, local_static_path)
-    return True
+                overwrite = transfer_jobs.TransferJob(
+                    transfer_jobs.DOWNLOAD, local_static_path, specific_remote_static_path, label=folder)
+            else:
+                # Überschriebene Ordner immer laden; sonst nur bei geändertem Manifest-Hash
+                entry = _check_download(remote_static_path, local_static_path)
+                if entry is None:
+                    continue
+                download_entries[remote_static_path] = entry
+            jobs.append(transfer_jobs.TransferJob(
+                transfer_jobs.DOWNLOAD, local_static_path, remote_static_path, label=folder, then=overwrite))
+    return jobs, upload_sigs, download_entries
+
+
+def _finish_static_favourites(results):
+    """Wertet die Ergebnisse der statischen Ordner aus (Log + Teilfehler-Notification)."""
+    failed = [r.label for r in results if not r.ok]
+    if failed:
+        xbmc.log(f"[AutoFTP] Statische Ordner fehlgeschlagen: {', '.join(failed)}", xbmc.LOGWARNING)
+        if len(failed) < len(results):
+            show_notification(30125, 5000, failed=len(failed), total=len(results))
+    return len(failed) < len(results)
+
+
+def sync_static_favourites():
+    """
+    Synchronisiert statische Favoritenordner (z.B. Anime, Horror).
+    Speicherort: addon_data/plugin.program.auto.ftp.sync/Static Favourites/<folder>/favourites.xml
+    Alle Ordner werden als TransferJobs eingereiht und parallel übertragen (Worker-Anzahl je Verbindungstyp).
+
+    Returns:
+        bool: True wenn mindestens ein Ordner übertragen wurde (bzw. nichts zu tun war).
+    """
+    if not STATIC_FOLDERS:
+        return False
+    from resources.lib import transfer_jobs
+    jobs, upload_sigs, download_entries = _plan_static_favourites()
+    if not jobs:
+        return True
+    results = transfer_jobs.run_jobs(_get_backend(), jobs, _get_transfer_workers())
+    _record_results(results, upload_sigs, download_entries)
+    return _finish_static_favourites(results)
 
 def _copy_image_to_targets(source_path):
     """Copy image file from source_path to LOCAL_IMAGE_PATH and ADDON_IMAGE_PATH."""
@@ -294,13 +672,9 @@ def download_random_image():
                 return False
             chosen_name = random.choice(images)
             source_url = path + chosen_name
-            f = xbmcvfs.File(source_url, 'rb')
-            img_data = f.read()
-            f.close()
-            with open(LOCAL_IMAGE_PATH, 'wb') as out:
-                out.write(img_data)
-            with open(ADDON_IMAGE_PATH, 'wb') as out:
-                out.write(img_data)
+            from resources.lib import sync_backend
+            sync_backend.download_from_vfs(source_url, LOCAL_IMAGE_PATH, TRANSFER_BUFFER_SIZE)
+            shutil.copyfile(LOCAL_IMAGE_PATH, ADDON_IMAGE_PATH)
             show_notification(30031, 5000)
             return True
         except Exception as e:
@@ -345,32 +719,295 @@ def sync_favourites():
     Startet die Synchronisation der Standard-Favoriten sowie der statischen Ordner.
 
     Returns:
-        None
+        bool: True wenn Standard-Favoriten oder statische Ordner synchronisiert wurden.
     """
     if not CUSTOM_FOLDER:
         show_notification(30022, 5000)  # Ein benutzerdefinierter Ordnername ist erforderlich
-        return
+        return False
 
-    backend = _get_backend()
-    if not backend.folder_exists(_remote_path(CUSTOM_FOLDER)):
-        show_notification(30023, 5000, folder=CUSTOM_FOLDER)  # Benutzerdefinierter Ordner nicht gefunden
-        return
+    try:
+        backend = _get_backend()
+        if not backend.folder_exists(_remote_path(CUSTOM_FOLDER)):
+            show_notification(30023, 5000, folder=CUSTOM_FOLDER)  # Benutzerdefinierter Ordner nicht gefunden
+            return False
 
-    # Mach Upload/Download
-    result_std = sync_standard_favourites()  # z.B. True/False zurückgeben
-    result_stat = sync_static_favourites()   # z.B. True/False
+        # Mach Upload/Download
+        result_std = sync_standard_favourites()  # z.B. True/False zurückgeben
+        result_stat = sync_static_favourites()   # z.B. True/False
+    finally:
+        _save_sync_state()
+        _close_backend()
 
     if result_std or result_stat:
         show_notification(30024, 5000)  # "Favoriten erfolgreich synchronisiert"
+        return True
+    show_notification(30028, 5000)  # "Fehler bei Favoriten-Sync"
+    return False
+
+def _sync_addon_data_delta(backend, local_base_path):
+    """
+    Dateiweiser addon_data-Sync: nur neue/geänderte Dateien, Löschungen als Tombstones (resources/lib/delta_sync.py).
+    Mit chunk_dedup werden große Dateien als inhaltsadressierte Chunks übertragen (resources/lib/chunk_store.py).
+
+    Returns:
+        bool: False, wenn auf die ZIP-Variante zurückgefallen werden soll.
+    """
+    from resources.lib import delta_sync, sync_state
+    remote_root = _remote_path(CUSTOM_FOLDER, 'addon_data_files')
+    index_remote = remote_root + '/' + delta_sync.INDEX_NAME
+
+    engine = delta_sync.DeltaSync(backend, remote_root, local_base_path, _state_work_dir(),
+                                  _profile_key(), _get_transfer_workers(), chunked=CHUNK_DEDUP,
+                                  scan=lambda: _addon_data_files(local_base_path))
+    if IS_MAIN_SYSTEM:
+        if not os.path.exists(local_base_path) or not engine.push():
+            xbmc.log("Delta-Sync nicht möglich, verwende ZIP-Variante.", xbmc.LOGWARNING)
+            return False
+        if os.path.exists(engine.index_path):
+            _note_artifact(index_remote, {'hash': sync_state.file_hash(engine.index_path),
+                                          'size': os.path.getsize(engine.index_path)})
+        if engine.stats['failed']:
+            show_notification(30029, 5000)  # Fehler beim Upload
+        elif engine.stats['transferred'] or engine.stats['deleted']:
+            show_notification(30020, 5000)  # Addon-Daten erfolgreich hochgeladen
+        return True
+
+    entry = _check_download(index_remote, local_base_path)
+    if entry is None:
+        xbmc.log("addon_data laut Manifest unverändert, überspringe Delta-Sync.", xbmc.LOGINFO)
+        return True
+    index = engine.fetch_index()
+    if index is None:
+        xbmc.log("Kein Delta-Index auf dem Server, verwende ZIP-Variante.", xbmc.LOGINFO)
+        return False
+    if engine.pull(index):
+        _record_download(index_remote, entry)
+        if engine.stats['transferred'] or engine.stats['deleted']:
+            show_notification(30025, 5000)  # Addon-Daten heruntergeladen
     else:
-        show_notification(30028, 5000)  # "Fehler bei Favoriten-Sync"
+        show_notification(30021, 5000)  # Fehler beim Herunterladen
+    return True
+
+
+def _sync_addon_data_shards(backend, local_base_path):
+    """
+    addon_data als ein Archiv pro Addon-ID plus index.json (resources/lib/addon_shards.py).
+    Nebensysteme laden nur die in addon_sync_ids gewählten Addons (leer = alle).
+
+    Returns:
+        bool: False, wenn auf die ZIP-Variante zurückgefallen werden soll.
+    """
+    from resources.lib import addon_shards, sync_state
+    remote_root = _remote_path(CUSTOM_FOLDER, 'addon_data_shards')
+
+    engine = addon_shards.ShardSync(backend, remote_root, local_base_path, _state_work_dir(),
+                                    _profile_key(), _get_transfer_workers(),
+                                    scan=lambda: _addon_data_files(local_base_path))
+    if IS_MAIN_SYSTEM:
+        if not os.path.exists(local_base_path) or not engine.push():
+            xbmc.log("Addon-Archive nicht möglich, verwende ZIP-Variante.", xbmc.LOGWARNING)
+            return False
+        if os.path.exists(engine.index_path):
+            _note_artifact(remote_root + '/' + addon_shards.INDEX_NAME,
+                           {'hash': sync_state.file_hash(engine.index_path),
+                            'size': os.path.getsize(engine.index_path)})
+        if engine.stats['failed']:
+            show_notification(30029, 5000)  # Fehler beim Upload
+        elif engine.stats['transferred'] or engine.stats['removed']:
+            show_notification(30020, 5000)  # Addon-Daten erfolgreich hochgeladen
+        return True
+
+    # Index immer laden: die Auswahl der Addon-IDs kann sich seit dem letzten Lauf geändert haben
+    index = engine.fetch_index()
+    if index is None:
+        xbmc.log("Kein Addon-Index auf dem Server, verwende ZIP-Variante.", xbmc.LOGINFO)
+        return False
+    if engine.pull(addon_shards.parse_addon_ids(ADDON_SYNC_IDS), index):
+        if engine.stats['transferred']:
+            show_notification(30025, 5000)  # Addon-Daten heruntergeladen
+    else:
+        show_notification(30021, 5000)  # Fehler beim Herunterladen
+    return True
+
+
+def _addon_data_files(source_dir):
+    """
+    Zu synchronisierende addon_data-Dateien (alle Modi): Liste von (rel_path, abs_path, stat) nach den
+    Include-/Exclude-Regeln und Größenlimits (resources/lib/sync_filter.py), ohne den lokalen Sync-Status.
+    """
+    from resources.lib import sync_filter
+    report = sync_filter.SyncFilter.from_settings(ADDON).scan(source_dir)
+    xbmc.log(f"[AutoFTP] addon_data-Auswahl: {report.summary()}", xbmc.LOGINFO)
+    for rel, size in report.too_large:
+        xbmc.log(f"[AutoFTP] addon_data: {rel} übersprungen ({size} Bytes, über dem Limit)", xbmc.LOGINFO)
+    for addon_dir, size in report.over_cap:
+        xbmc.log(f"[AutoFTP] addon_data: {addon_dir or '/'} übersprungen ({size} Bytes, über dem Addon-Limit)",
+                 xbmc.LOGWARNING)
+    return report.files
+
+
+def create_zip(source_dir, zip_path, files=None):
+    """
+    Erstellt eine ZIP-Datei von einem Quellverzeichnis. Die Dateien werden auf ZIP_WORKERS Threads
+    komprimiert und in fester Reihenfolge zusammengesetzt (resources/lib/zip_build.py). Die Methode je Datei
+    (gespeichert, Deflate, BZIP2/LZMA) wählt resources/lib/zip_policy.py.
+    Mit ZIP_REUSE werden unveränderte Dateien (Größe + mtime) roh aus dem vorherigen Archiv im Sync-Status
+    übernommen; ein als Datei erstelltes Archiv wird danach zum neuen Cache (Hardlink, sonst Kopie).
+
+    Args:
+        source_dir (str): Pfad zum Quellordner.
+        zip_path (str | file): Zielpfad für das ZIP oder beschreibbarer Stream (z.B. zip_stream.BoundedPipe).
+        files (list): Optional bereits ermittelte Dateien (siehe _addon_data_files).
+
+    Returns:
+        bool: True bei Erfolg.
+    """
+    from resources.lib import zip_build, zip_policy
+    target = zip_path if isinstance(zip_path, str) else 'Stream'
+    try:
+        workers = zip_build.get_worker_count(ZIP_WORKERS)
+        xbmc.log(f"Starte die Erstellung der ZIP-Datei: {target} ({workers} Threads)", xbmc.LOGINFO)
+        start = time.monotonic()
+        if files is None:
+            files = _addon_data_files(source_dir)
+        policy = zip_policy.CompressionPolicy.from_settings(ZIP_LEVEL, ZIP_TEXT_METHOD)
+        cache = zip_build.ArchiveCache(os.path.join(_state_work_dir(), 'archive_cache.zip')).open() if ZIP_REUSE else None
+        try:
+            if isinstance(zip_path, str):
+                # neue Datei statt Überschreiben: zip_path kann ein Hardlink auf den Archiv-Cache sein
+                with open(zip_path + '.part', 'wb') as out:
+                    stats = zip_build.build_zip(out, files, workers, policy, cache=cache)
+                os.replace(zip_path + '.part', zip_path)
+            else:
+                stats = zip_build.build_zip(zip_path, files, workers, policy, cache=cache)
+        finally:
+            if cache is not None:
+                cache.close()
+        xbmc.log(f"ZIP-Datei erstellt: {target} ({stats['files']} Dateien, {stats['reused']} unverändert übernommen, "
+                 f"{stats['bytes_in']} -> {stats['bytes_out']} Bytes in {time.monotonic() - start:.1f} s)", xbmc.LOGINFO)
+        xbmc.log(f"[AutoFTP] Kompression: {stats['policy'].summary()}", xbmc.LOGINFO)
+        if cache is not None and isinstance(zip_path, str):
+            try:
+                cache.store(zip_path, files)
+            except OSError as e:
+                xbmc.log(f"Archiv-Cache nicht aktualisiert: {e}", xbmc.LOGWARNING)
+        return True
+    except Exception as e:
+        xbmc.log(f"Fehler beim Erstellen der ZIP-Datei: {str(e)}", xbmc.LOGERROR)
+        if isinstance(zip_path, str):
+            for stale in (zip_path + '.part', zip_path):  # kein halbes oder altes Archiv hochladen
+                if os.path.exists(stale):
+                    os.remove(stale)
+        return False
+
+
+def _stream_addon_zip(backend, source_dir, remote_zip_path):
+    """
+    Upload-Zweig ohne temporäre Datei: create_zip schreibt in einem Producer-Thread über eine begrenzte
+    In-Memory-Pipe (resources/lib/zip_stream.py) direkt in backend.upload_stream.
+    Da vorab kein Archiv existiert, entscheidet die Signatur des Quellbaums (Pfad, Größe, mtime) über "unverändert".
+
+    Returns:
+        bool: True bei Erfolg oder unverändertem addon_data.
+    """
+    from resources.lib import sync_state, zip_stream
+    files = _addon_data_files(source_dir)
+    tree = sync_state.tree_signature(files)
+    last = _get_sync_state().get(_profile_key(), remote_zip_path)
+    if last.get('tree') == tree and last.get('hash'):
+        xbmc.log("addon_data unverändert seit letztem Upload, überspringe Upload.", xbmc.LOGINFO)
+        _note_artifact(remote_zip_path, last)
+        return True
+    ok, pipe = zip_stream.run_pipeline(
+        lambda out: create_zip(source_dir, out, files),
+        lambda src: backend.upload_stream(src, remote_zip_path, progress=_log_progress('addon_data.zip Upload')),
+        TRANSFER_BUFFER_SIZE)
+    if not ok:
+        xbmc.log("ZIP-Stream-Upload fehlgeschlagen.", xbmc.LOGERROR)
+        show_notification(30029, 5000)  # Fehler beim Upload
+        return False
+    xbmc.log(f"ZIP erfolgreich gestreamt: {remote_zip_path} ({pipe.size} Bytes)", xbmc.LOGINFO)
+    _record_upload(remote_zip_path, {'size': pipe.size, 'hash': pipe.hexdigest(), 'tree': tree})
+    show_notification(30020, 5000)  # Addon-Daten erfolgreich hochgeladen
+    return True
+
+
+def extract_zip(zip_path, target_dir):
+    """
+    Entpackt eine ZIP-Datei in ein Zielverzeichnis. Dateien, deren Größe und CRC-32 bereits mit dem
+    Archiv übereinstimmen, werden nicht neu geschrieben (resources/lib/zip_extract.py). Entpackt wird
+    auf EXTRACT_WORKERS Threads, jeder mit eigenem ZipFile-Handle.
+
+    Args:
+        zip_path (str): Pfad zur ZIP-Datei.
+        target_dir (str): Zielverzeichnis für das Entpacken.
+
+    Returns:
+        bool: True bei Erfolg.
+    """
+    from resources.lib import zip_extract
+    try:
+        extractor = zip_extract.ZipExtractor(target_dir, workers=zip_extract.get_worker_count(EXTRACT_WORKERS))
+        errors = extractor.extract_files(zip_path)
+        for name, error in errors:
+            xbmc.log(f"Fehler beim Entpacken von {name}: {error}", xbmc.LOGERROR)
+        if errors:
+            return False
+        stats = extractor.stats
+        xbmc.log(f"ZIP-Datei erfolgreich entpackt: {zip_path} -> {target_dir} "
+                 f"({stats['written']} geschrieben, {stats['skipped']} unverändert übersprungen)", xbmc.LOGINFO)
+        return True
+    except Exception as e:
+        xbmc.log(f"Fehler beim Entpacken der ZIP-Datei: {str(e)}", xbmc.LOGERROR)
+        return False
+
+
+def _stream_extract_addon_zip(backend, remote_zip_path, local_base_path, entry):
+    """
+    Download-Zweig ohne temporäre Datei: die Einträge von addon_data.zip werden anhand ihrer lokalen Header
+    entpackt, während der Rest noch übertragen wird (resources/lib/zip_stream.py). Geänderte Dateien bleiben
+    als <Datei>.part liegen und werden erst übernommen, wenn das ganze Archiv zum Manifest-Hash passt.
+
+    Returns:
+        bool | None: True bei Erfolg; None, wenn das Archiv nicht streambar ist (dann klassischer Download).
+    """
+    from resources.lib import zip_stream
+    extractor = zip_stream.StreamingUnzip(local_base_path, TRANSFER_BUFFER_SIZE, staged=True)
+    ok, pipe = zip_stream.run_pipeline(
+        lambda out: backend.download_stream(remote_zip_path, out.write, progress=_log_progress('addon_data.zip Download')),
+        extractor.extract, TRANSFER_BUFFER_SIZE)
+    if extractor.unsupported:
+        extractor.discard()
+        xbmc.log("addon_data.zip nicht streambar, verwende Download mit temporärer Datei.", xbmc.LOGINFO)
+        return None
+    if ok and entry.get('hash') and pipe.hexdigest() != entry['hash']:
+        xbmc.log("addon_data.zip passt nicht zum Manifest-Hash.", xbmc.LOGERROR)
+        ok = False
+    if not ok:
+        extractor.discard()
+    else:
+        try:
+            extractor.commit()
+        except OSError as e:
+            xbmc.log(f"Fehler beim Übernehmen der entpackten Dateien: {e}", xbmc.LOGERROR)
+            extractor.discard()
+            ok = False
+    if ok:
+        xbmc.log(f"ZIP gestreamt und entpackt: {remote_zip_path} ({pipe.size} Bytes)", xbmc.LOGINFO)
+        _record_download(remote_zip_path, entry)
+        show_notification(30025, 5000)  # Addon-Daten heruntergeladen & entpackt
+    else:
+        show_notification(30021, 5000)  # Fehler beim Herunterladen
+    return ok
+
 
 def sync_addon_data():
     """
     Synchronisiert den addon_data-Ordner (lokal -> FTP / FTP -> lokal) mittels einer ZIP-Datei.
+    Im Spiegel-Modus wird die von sync_mirror() einmal erstellte ZIP-Datei hochgeladen.
 
     Returns:
-        bool: False, wenn die Funktion nicht ausgeführt wurde (z.B. deaktiviert). Sonst kein bestimmter Rückgabewert bei Erfolg.
+        bool: False, wenn die Funktion nicht ausgeführt wurde (z.B. deaktiviert) oder der Transfer fehlschlug.
     """
     if not ENABLE_ADDON_SYNC:
         return False  # Falls auf 'false' gesetzt, abbrechen
@@ -380,93 +1017,363 @@ def sync_addon_data():
 
     xbmc.log("Starte sync_addon_data() mit ZIP-Variante", xbmc.LOGINFO)
     local_base_path = xbmcvfs.translatePath('special://userdata/addon_data')
+    shared_zip = getattr(_TARGET, 'zip_path', None)
+    local_zip_path = shared_zip or os.path.join(xbmcvfs.translatePath('special://userdata'),
+                                                f'addon_data{_target_suffix()}.zip')
+    remote_zip_path = _remote_path(CUSTOM_FOLDER, 'addon_data.zip')
+
+    ok = False
+    backend = _get_backend()
+    try:
+        if ADDON_SYNC_MODE == 1 and _sync_addon_data_delta(backend, local_base_path):
+            return True
+        if ADDON_SYNC_MODE == 2 and _sync_addon_data_shards(backend, local_base_path):
+            return True
+        if IS_MAIN_SYSTEM:
+            # ================
+            # Upload-Zweig
+            # ================
+            xbmc.log("Hauptsystem erkannt. Beginne ZIP-Erstellung.", xbmc.LOGINFO)
+            if os.path.exists(local_base_path) and STREAM_ADDON_ZIP and not shared_zip:
+                ok = _stream_addon_zip(backend, local_base_path, remote_zip_path)
+            elif os.path.exists(local_base_path):
+                if not shared_zip:
+                    create_zip(local_base_path, local_zip_path)
+                if os.path.exists(local_zip_path):
+                    xbmc.log(f"ZIP-Datei vorhanden: {local_zip_path}", xbmc.LOGINFO)
+                    sig = _check_upload(local_zip_path, remote_zip_path)
+                    if sig is None:
+                        xbmc.log("addon_data unverändert seit letztem Upload, überspringe Upload.", xbmc.LOGINFO)
+                        ok = True
+                    elif backend.upload(local_zip_path, remote_zip_path, progress=_log_progress('addon_data.zip Upload')):
+                        xbmc.log(f"ZIP erfolgreich hochgeladen: {remote_zip_path}", xbmc.LOGINFO)
+                        _record_upload(remote_zip_path, sig)
+                        ok = True
+                        show_notification(30020, 5000)  # z.B. "Addon-Daten erfolgreich hochgeladen"
+                    else:
+                        xbmc.log("FTP-Upload fehlgeschlagen.", xbmc.LOGERROR)
+                        show_notification(30029, 5000)  # z.B. "Fehler beim Upload"
+                    if ok and not shared_zip:
+                        os.remove(local_zip_path)
+                else:
+                    xbmc.log(f"FEHLER: ZIP-Datei wurde nicht erstellt: {local_zip_path}", xbmc.LOGERROR)
+            else:
+                xbmc.log("Lokaler Ordner 'addon_data' existiert nicht.", xbmc.LOGERROR)
+
+        else:
+            # ===================
+            # Download-Zweig
+            # ===================
+            xbmc.log("Kein Hauptsystem. Versuche ZIP herunterzuladen.", xbmc.LOGINFO)
+            entry = _check_download(remote_zip_path, local_base_path)
+            streamed = None
+            if entry is not None and STREAM_ADDON_ZIP:
+                streamed = _stream_extract_addon_zip(backend, remote_zip_path, local_base_path, entry)
+            if entry is None:
+                xbmc.log("addon_data.zip laut Manifest unverändert, überspringe Download.", xbmc.LOGINFO)
+                ok = True
+            elif streamed is not None:
+                ok = streamed
+            # 1. ZIP herunterladen
+            elif backend.download(remote_zip_path, local_zip_path, progress=_log_progress('addon_data.zip Download')):
+                xbmc.log(f"ZIP-Datei vom Server heruntergeladen: {local_zip_path}", xbmc.LOGINFO)
+
+                # 2. ZIP entpacken ins addon_data-Verzeichnis
+                extracted = extract_zip(local_zip_path, local_base_path)
+
+                # 3. Lokale ZIP wieder löschen
+                if os.path.exists(local_zip_path):
+                    os.remove(local_zip_path)
+                    xbmc.log(f"Lokale ZIP-Datei gelöscht: {local_zip_path}", xbmc.LOGINFO)
+                if extracted:
+                    _record_download(remote_zip_path, entry)
+                    ok = True
+                show_notification(30025, 5000)  # "Addon-Daten heruntergeladen & entpackt"
+            else:
+                xbmc.log("ZIP-Download vom FTP fehlgeschlagen.", xbmc.LOGERROR)
+                show_notification(30021, 5000)  # "Fehler beim Herunterladen"
+    finally:
+        _save_sync_state()
+        _close_backend()
+    return ok
+
+async def _addon_data_async(abackend, limit):
+    """
+    addon_data-Stufe der async Pipeline. ZIP-Modus: Packen/Entpacken im Executor, Transfer über das async Backend.
+    Delta-/Archiv-Modus laufen als Ganzes im Executor (eigene TransferJobs über das blockierende Backend).
+    Rückgabe wie sync_addon_data(): False, wenn nicht ausgeführt oder der Transfer fehlschlug.
+    """
+    loop = asyncio.get_running_loop()
+    if not ENABLE_ADDON_SYNC or (not CUSTOM_FOLDER and not IS_MAIN_SYSTEM):
+        return False
+    if ADDON_SYNC_MODE != 0 or STREAM_ADDON_ZIP:
+        return await loop.run_in_executor(None, sync_addon_data)
+    local_base_path = xbmcvfs.translatePath('special://userdata/addon_data')
     local_zip_path = os.path.join(xbmcvfs.translatePath('special://userdata'), 'addon_data.zip')
     remote_zip_path = _remote_path(CUSTOM_FOLDER, 'addon_data.zip')
+    if IS_MAIN_SYSTEM:
+        if not os.path.exists(local_base_path):
+            xbmc.log("Lokaler Ordner 'addon_data' existiert nicht.", xbmc.LOGERROR)
+            return False
+        await loop.run_in_executor(None, create_zip, local_base_path, local_zip_path)
+        if not os.path.exists(local_zip_path):
+            return False
+        sig = await loop.run_in_executor(None, _check_upload, local_zip_path, remote_zip_path)
+        ok = True
+        if sig is not None:
+            async with limit:
+                ok = await abackend.upload(local_zip_path, remote_zip_path, _log_progress('addon_data.zip Upload'))
+            if ok:
+                _record_upload(remote_zip_path, sig)
+                show_notification(30020, 5000)  # Addon-Daten erfolgreich hochgeladen
+            else:
+                show_notification(30029, 5000)  # Fehler beim Upload
+        if ok:
+            os.remove(local_zip_path)
+        return ok
+    entry = await loop.run_in_executor(None, _check_download, remote_zip_path, local_base_path)
+    if entry is None:
+        return True
+    async with limit:
+        ok = await abackend.download(remote_zip_path, local_zip_path, _log_progress('addon_data.zip Download'))
+    if not ok:
+        show_notification(30021, 5000)  # Fehler beim Herunterladen
+        return False
+    extracted = await loop.run_in_executor(None, extract_zip, local_zip_path, local_base_path)
+    if os.path.exists(local_zip_path):
+        os.remove(local_zip_path)
+    if extracted:
+        _record_download(remote_zip_path, entry)
+    show_notification(30025, 5000)  # Addon-Daten heruntergeladen & entpackt
+    return extracted
 
-    def create_zip(source_dir, zip_path):
-        """
-        Erstellt eine ZIP-Datei von einem Quellverzeichnis.
 
-        Args:
-            source_dir (str): Pfad zum Quellordner.
-            zip_path (str): Zielpfad für das ZIP.
+async def _favourites_async(abackend, limit):
+    """
+    Favoriten-Stufe der async Pipeline: favourites.xml und statische Ordner teilen sich das Limit.
+    Rückgabe wie sync_favourites().
+    """
+    from resources.lib import async_backend
+    loop = asyncio.get_running_loop()
+    if not CUSTOM_FOLDER:
+        show_notification(30022, 5000)  # Ein benutzerdefinierter Ordnername ist erforderlich
+        return False
+    if not await abackend.folder_exists(_remote_path(CUSTOM_FOLDER)):
+        show_notification(30023, 5000, folder=CUSTOM_FOLDER)  # Benutzerdefinierter Ordner nicht gefunden
+        return False
+    std_jobs, std_sigs, std_entries = await loop.run_in_executor(None, _plan_standard_favourites)
+    static_jobs, static_sigs, static_entries = [], {}, {}
+    if STATIC_FOLDERS:
+        static_jobs, static_sigs, static_entries = await loop.run_in_executor(None, _plan_static_favourites)
+    results = await async_backend.run_jobs_async(abackend, std_jobs + static_jobs, limit)
+    _record_results(results, dict(std_sigs, **static_sigs), dict(std_entries, **static_entries))
+    result_std = all(r.ok for r in results[:len(std_jobs)])
+    result_stat = bool(STATIC_FOLDERS) and (not static_jobs or _finish_static_favourites(results[len(std_jobs):]))
+    if result_std or result_stat:
+        show_notification(30024, 5000)  # "Favoriten erfolgreich synchronisiert"
+        return True
+    show_notification(30028, 5000)  # "Fehler bei Favoriten-Sync"
+    return False
 
-        Returns:
-            None
-        """
-        try:
-            xbmc.log(f"Starte die Erstellung der ZIP-Datei: {zip_path}", xbmc.LOGINFO)
-            with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                for root, dirs, files in os.walk(source_dir):
-                    for file in files:
-                        file_path = os.path.join(root, file)
-                        arcname = os.path.relpath(file_path, source_dir)
-                        zipf.write(file_path, arcname)
-                        xbmc.log(f"Datei zur ZIP hinzugefügt: {file_path} -> {arcname}", xbmc.LOGINFO)
-            xbmc.log(f"ZIP-Datei erstellt: {zip_path}", xbmc.LOGINFO)
-        except Exception as e:
-            xbmc.log(f"Fehler beim Erstellen der ZIP-Datei: {str(e)}", xbmc.LOGERROR)
 
-    def extract_zip(zip_path, target_dir):
-        """
-        Entpackt eine ZIP-Datei in ein Zielverzeichnis.
+async def _pipeline_async():
+    from resources.lib import async_backend
+    workers = _get_transfer_workers()
+    abackend = async_backend.get_async_backend(
+        _get_active_profile_settings(), buffer_size=TRANSFER_BUFFER_SIZE, max_sessions=workers, **_network_kwargs())
+    limit = asyncio.Semaphore(workers)
+    try:
+        results = await asyncio.gather(_addon_data_async(abackend, limit), _favourites_async(abackend, limit),
+                                       return_exceptions=True)
+        for stage, result in zip(('addon_data', 'Favoriten'), results):
+            if isinstance(result, Exception):
+                xbmc.log(f"[AutoFTP] Async Pipeline {stage}: {result}", xbmc.LOGERROR)
+        return all(result is True for result in results)
+    finally:
+        await abackend.close()
 
-        Args:
-            zip_path (str): Pfad zur ZIP-Datei.
-            target_dir (str): Zielverzeichnis für das Entpacken.
 
-        Returns:
-            None
-        """
-        try:
-            with zipfile.ZipFile(zip_path, 'r') as zipf:
-                zipf.extractall(target_dir)
-                xbmc.log(f"ZIP-Datei erfolgreich entpackt: {zip_path} -> {target_dir}", xbmc.LOGINFO)
-        except Exception as e:
-            xbmc.log(f"Fehler beim Entpacken der ZIP-Datei: {str(e)}", xbmc.LOGERROR)
+def sync_pipeline_async():
+    """
+    Führt addon_data- und Favoriten-Sync gleichzeitig in einer asyncio-Event-Loop aus (Setting async_pipeline).
+    Transfers laufen über resources/lib/async_backend.py, begrenzt auf die Worker-Anzahl des Verbindungstyps;
+    Manifest-/Sync-Status-Prüfungen nutzen weiter das blockierende Backend (im Executor).
 
-    backend = _get_backend()
-    if IS_MAIN_SYSTEM:
-        # ================
-        # Upload-Zweig
-        # ================
-        xbmc.log("Hauptsystem erkannt. Beginne ZIP-Erstellung.", xbmc.LOGINFO)
-        if os.path.exists(local_base_path):
-            create_zip(local_base_path, local_zip_path)
-            if os.path.exists(local_zip_path):
-                xbmc.log(f"ZIP-Datei vorhanden: {local_zip_path}", xbmc.LOGINFO)
-                if backend.upload(local_zip_path, remote_zip_path):
-                    xbmc.log(f"ZIP erfolgreich hochgeladen: {remote_zip_path}", xbmc.LOGINFO)
-                    os.remove(local_zip_path)
-                    show_notification(30020, 5000)  # z.B. "Addon-Daten erfolgreich hochgeladen"
-                else:
-                    xbmc.log("FTP-Upload fehlgeschlagen.", xbmc.LOGERROR)
-                    show_notification(30029, 5000)  # z.B. "Fehler beim Upload"
-            else:
-                xbmc.log(f"FEHLER: ZIP-Datei wurde nicht erstellt: {local_zip_path}", xbmc.LOGERROR)
-        else:
-            xbmc.log("Lokaler Ordner 'addon_data' existiert nicht.", xbmc.LOGERROR)
+    Returns:
+        bool: True wenn beide Stufen erfolgreich waren.
+    """
+    global _PIPELINE_ACTIVE
+    _get_backend()  # vor dem Start anlegen, damit alle Executor-Threads dieselbe Instanz nutzen
+    if not IS_MAIN_SYSTEM and CUSTOM_FOLDER:
+        _get_remote_manifest()  # ebenso vorab laden: beide Stufen prüfen ihre Downloads dagegen
+    _PIPELINE_ACTIVE = True
+    start = time.monotonic()
+    try:
+        ok = asyncio.run(_pipeline_async())
+    finally:
+        _PIPELINE_ACTIVE = False
+        _save_sync_state()
+        _close_backend()
+    xbmc.log(f"[AutoFTP] Async Pipeline beendet in {time.monotonic() - start:.2f}s", xbmc.LOGINFO)
+    return ok
+
+
+def _mirror_targets():
+    """
+    Zielprofile des Spiegel-Modus: eingerichtete Profile aus mirror_profiles (leer = alle eingerichteten).
+
+    Returns:
+        list: Profil-Dicts; leer, wenn der Spiegel-Modus nicht greift (aus, Nebensystem, kein Ziel).
+    """
+    if not MIRROR_MODE or not IS_MAIN_SYSTEM:
+        return []
+    from resources.lib import profiles
+    targets = profiles.get_configured_profiles()
+    wanted = {part.strip() for part in MIRROR_PROFILES.replace(';', ',').split(',') if part.strip()}
+    if wanted:
+        targets = [p for p in targets if str(p['index'] + 1) in wanted]
+    return targets
+
+
+def _mirror_target(profile, zip_path):
+    """
+    Spiegel-Thread für ein Zielprofil: Favoriten, addon_data und Manifest mit eigenem Backend.
+
+    Returns:
+        dict: Ergebnis je Teilschritt (favourites, addon_data, manifest) und Dauer in Sekunden.
+    """
+    _TARGET.profile = profile
+    _TARGET.backend = None
+    _TARGET.zip_path = zip_path
+    start = time.monotonic()
+    result = {}
+    try:
+        for name, stage in (('favourites', sync_favourites), ('addon_data', sync_addon_data),
+                            ('manifest', publish_manifest)):
+            try:
+                result[name] = bool(stage())
+            except Exception as e:
+                xbmc.log(f"[AutoFTP] Spiegel Profil {profile['index'] + 1} {stage.__name__}: {e}", xbmc.LOGERROR)
+                result[name] = False
+    finally:
+        _close_backend()
+        _TARGET.profile = _TARGET.zip_path = None
+    result['seconds'] = time.monotonic() - start
+    return result
+
+
+def sync_mirror():
+    """
+    Spiegel-Modus (Hauptsystem): lädt Favoriten und addon_data gleichzeitig auf alle Zielprofile hoch.
+    Jedes Ziel läuft in einem eigenen Thread mit eigenem Backend, Sync-Status und Manifest, sodass ein
+    langsames Ziel die schnellen nicht aufhält. Die addon_data-ZIP wird nur einmal erstellt (auch mit
+    stream_addon_zip als Datei: ein gemeinsamer Stream würde alle Ziele im Tempo des langsamsten halten).
+
+    Returns:
+        bool: True wenn alle Ziele erfolgreich synchronisiert wurden.
+    """
+    import concurrent.futures
+    targets = _mirror_targets()
+    if not targets:
+        return False
+    local_base_path = xbmcvfs.translatePath('special://userdata/addon_data')
+    zip_path = None
+    if ENABLE_ADDON_SYNC and ADDON_SYNC_MODE == 0 and os.path.exists(local_base_path):
+        zip_path = os.path.join(xbmcvfs.translatePath('special://userdata'), 'addon_data.zip')
+        create_zip(local_base_path, zip_path)
+        if not os.path.exists(zip_path):
+            zip_path = None  # jedes Ziel versucht es dann selbst
+    xbmc.log(f"[AutoFTP] Spiegel-Modus: {len(targets)} Ziele "
+             f"({', '.join(str(p['index'] + 1) for p in targets)})", xbmc.LOGINFO)
+    start = time.monotonic()
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(targets)) as pool:
+            futures = [(p, pool.submit(_mirror_target, p, zip_path)) for p in targets]
+            results = [(p, f.result()) for p, f in futures]
+    finally:
+        _save_sync_state()
+        if zip_path and os.path.exists(zip_path):
+            os.remove(zip_path)
+
+    succeeded = 0
+    for p, r in results:
+        ok = r['favourites'] and (r['addon_data'] or not ENABLE_ADDON_SYNC)
+        succeeded += ok
+        parts = ', '.join(f"{name} {'ok' if r[name] else 'Fehler'}" for name in ('favourites', 'addon_data', 'manifest'))
+        xbmc.log(f"[AutoFTP] Spiegel Profil {p['index'] + 1} {p['connection_type']}://{p['host']}: {parts} "
+                 f"in {r['seconds']:.1f}s", xbmc.LOGINFO if ok else xbmc.LOGWARNING)
+    xbmc.log(f"[AutoFTP] Spiegel-Modus beendet in {time.monotonic() - start:.2f}s "
+             f"({succeeded}/{len(targets)} Ziele erfolgreich)", xbmc.LOGINFO)
+    show_notification(30166, 5000, ok=succeeded, total=len(targets))
+    return succeeded == len(targets)
+
+
+def run_sync_stages(stages):
+    """
+    Führt die Sync-Stufen nacheinander im Zeitbudget SYNC_DEADLINE aus. Backends dieses Laufs begrenzen
+    Timeouts und Retries auf das Restbudget; ist es aufgebraucht, werden die übrigen Stufen zurückgestellt.
+    Eine gestartete Stufe wird nur zurückgestellt, wenn sie fehlschlug (False oder Exception) und das Budget
+    dabei abgelaufen ist; eine vollständig durchgelaufene Stufe wird nicht wiederholt.
+
+    Returns:
+        list: Zurückgestellte Stufen (nicht gestartet oder während der Ausführung am Budget gescheitert).
+    """
+    global _DEADLINE
+    from resources.lib import sync_backend
+    _DEADLINE = sync_backend.Deadline(SYNC_DEADLINE)
+    deferred = []
+    try:
+        for stage in stages:
+            if _DEADLINE.expired():
+                deferred.append(stage)
+                continue
+            try:
+                ok = stage() is not False
+            except Exception as e:
+                xbmc.log(f"[AutoFTP] {stage.__name__}: {e}", xbmc.LOGERROR)
+                ok = False
+            if not ok and _DEADLINE.expired():
+                xbmc.log(f"[AutoFTP] Zeitbudget ({SYNC_DEADLINE}s) während {stage.__name__} aufgebraucht", xbmc.LOGWARNING)
+                deferred.append(stage)
+    finally:
+        _DEADLINE = None
+    if deferred:
+        xbmc.log(f"[AutoFTP] Zurückgestellt: {', '.join(s.__name__ for s in deferred)}", xbmc.LOGWARNING)
+    return deferred
+
+
+def retry_deferred_stages(stages):
+    """
+    Wiederholt zurückgestellte Sync-Stufen im Hintergrund (nach dem Start, UI ist bereits frei)
+    mit exponentiellem Backoff und Jitter, bis alles erledigt ist oder Kodi beendet wird.
+    Auf Nebensystemen wurde dabei heruntergeladen: danach wird der Skin neu geladen wie beim Start;
+    nachgeholte addon_data greift erst nach einem Neustart von Kodi (Notification).
+    """
+    from resources.lib import profiles
+    monitor = xbmc.Monitor()
+    pulled_addon_data = not IS_MAIN_SYSTEM and any(s in (sync_addon_data, sync_pipeline_async) for s in stages)
+    if publish_manifest not in stages:
+        stages = list(stages) + [publish_manifest]
+    for attempt in range(DEFERRED_ATTEMPTS):
+        delay = DEFERRED_BASE_DELAY * (2 ** attempt) * random.uniform(0.5, 1.0)
+        xbmc.log(f"[AutoFTP] Hintergrund-Sync Versuch {attempt + 1}/{DEFERRED_ATTEMPTS} in {delay:.0f}s", xbmc.LOGINFO)
+        if monitor.waitForAbort(delay):
+            return False
+        _close_backend()
+        if profiles.is_auto_mode():
+            profiles.select_fastest_profile(force=True)  # Failover: ggf. anderes erreichbares Profil
+        stages = run_sync_stages(stages)
+        if not stages:
+            xbmc.log("[AutoFTP] Hintergrund-Sync abgeschlossen", xbmc.LOGINFO)
+            if not IS_MAIN_SYSTEM:
+                xbmc.executebuiltin('ReloadSkin()')
+            if pulled_addon_data:
+                show_notification(30189, 8000)  # Neustart nötig, damit die Addon-Daten greifen
+            xbmc.executebuiltin('Container.Refresh()')
+            return True
+    xbmc.log("[AutoFTP] Hintergrund-Sync aufgegeben", xbmc.LOGWARNING)
+    return False
 
-    else:
-        # ===================
-        # Download-Zweig
-        # ===================
-        xbmc.log("Kein Hauptsystem. Versuche ZIP herunterzuladen.", xbmc.LOGINFO)
-        # 1. ZIP herunterladen
-        if backend.download(remote_zip_path, local_zip_path):
-            xbmc.log(f"ZIP-Datei vom Server heruntergeladen: {local_zip_path}", xbmc.LOGINFO)
-
-            # 2. ZIP entpacken ins addon_data-Verzeichnis
-            extract_zip(local_zip_path, local_base_path)
-
-            # 3. Lokale ZIP wieder löschen
-            if os.path.exists(local_zip_path):
-                os.remove(local_zip_path)
-                xbmc.log(f"Lokale ZIP-Datei gelöscht: {local_zip_path}", xbmc.LOGINFO)
-            show_notification(30025, 5000)  # "Addon-Daten heruntergeladen & entpackt"
-        else:
-            xbmc.log("ZIP-Download vom FTP fehlgeschlagen.", xbmc.LOGERROR)
-            show_notification(30021, 5000)  # "Fehler beim Herunterladen"
 
 #
 # =========================
@@ -475,8 +1382,9 @@ def sync_addon_data():
 # 0) Settings laden (repariert defekte Werte)
 # 1) Ersteinrichtungs-Assistent (nur wenn first_run_done nicht gesetzt)
 # 2) Auto-Clean (wenn aktiv und fällig)
-# 3) FTP-Sync (addon_data, Favoriten), Bildrotation, Custom_Startup, uservar
+# 3) FTP-Sync (addon_data, Favoriten) im Zeitbudget, Bildrotation, Custom_Startup, uservar
 # 4) Texture-Cache leeren, ReloadSkin
+# 5) Zurückgestellte Sync-Stufen im Hintergrund wiederholen
 #
 _load_settings()
 try:
@@ -493,12 +1401,19 @@ if ENABLED:
         auto_clean.run_if_due()
     except Exception as e:
         xbmc.log(f"Auto-Clean: {e}", xbmc.LOGERROR)
-    # 2) Sync und Optionen
-    sync_addon_data()
-    sync_favourites()
+    # 2) Sync (im Zeitbudget) und Optionen
+    if _mirror_targets():
+        deferred_stages = run_sync_stages([sync_mirror])
+    elif ASYNC_PIPELINE:
+        deferred_stages = run_sync_stages([sync_pipeline_async, publish_manifest])
+    else:
+        deferred_stages = run_sync_stages([sync_addon_data, sync_favourites, publish_manifest])
     download_random_image()
     copy_custom_startup_file()
     # 3) Texture-Cache und UI
     auto_clean.clear_thumbs()
     xbmc.executebuiltin('ReloadSkin()')
     xbmc.executebuiltin('Container.Refresh()')
+    # 4) Was das Zeitbudget nicht geschafft hat, läuft ohne die UI zu blockieren im Hintergrund nach
+    if deferred_stages:
+        retry_deferred_stages(deferred_stages)
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 """
 Plugin entry point: grouped menu (Sync, Wartung, Info, Einstellungen).
-Wartung contains Backup, Restore, Auto-Clean. Info opens the help/info dialog.
+Wartung contains Backup, Restore, Auto-Clean, chunk store cleanup. Sync holds info, wizard, the speed test
+and the addon_data sync preview.
+Info opens the help/info dialog.
 """
 import os
 import sys
@@ -46,6 +48,15 @@ def run_action(action):
         auto_clean.run_auto_clean()
         auto_clean.set_next_run()
         xbmcgui.Dialog().ok(ADDON.getLocalizedString(30001), _l(30047))
+    elif action == 'speed_test':
+        from resources.lib import speed_test
+        speed_test.run_speed_test()
+    elif action == 'addon_data_report':
+        from resources.lib import sync_filter
+        sync_filter.run_scan_report()
+    elif action == 'chunk_gc':
+        from resources.lib import delta_sync
+        delta_sync.run_chunk_gc()
     elif action == 'settings':
         ADDON.openSettings()
     elif action == 'info':
@@ -141,7 +152,8 @@ if mode == 'static':
     sys.exit(0)
 
 # Direct actions (no folder)
-if action in ('backup', 'restore', 'autoclean', 'settings', 'info', 'about', 'first_run_again'):
+if action in ('backup', 'restore', 'autoclean', 'chunk_gc', 'speed_test', 'addon_data_report', 'settings', 'info', 'about',
+              'first_run_again'):
     run_action(action)
     xbmcplugin.endOfDirectory(handle)
 elif action == 'category' and category == 'maintenance':
@@ -149,12 +161,15 @@ elif action == 'category' and category == 'maintenance':
     add_item(_l(30060), 'backup')   # Backup erstellen
     add_item(_l(30063), 'restore')  # Restore aus Backup
     add_item(_l(30051), 'autoclean')
+    add_item(_l(30136), 'chunk_gc')   # Chunk-Speicher aufräumen
     xbmcplugin.endOfDirectory(handle)
 elif action == 'category' and category == 'sync':
     xbmcplugin.setPluginCategory(handle, _l(30069))
     add_item(_l(30071), 'info')
     add_item(_l(30079), 'about')
     add_item(_l(30100), 'first_run_again')
+    add_item(_l(30149), 'speed_test')  # Verbindungs-Geschwindigkeitstest
+    add_item(_l(30181), 'addon_data_report')  # Vorschau: was der addon_data-Sync überträgt
     xbmcplugin.endOfDirectory(handle)
 else:
     # Main menu: Sync, Wartung, Info, Einstellungen
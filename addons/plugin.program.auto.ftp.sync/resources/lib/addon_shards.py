@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Per-addon sharded addon_data archives (alternative to the single addon_data.zip).
+
+Remote layout below <remote_root> (auto_fav_sync/<custom_folder>/addon_data_shards):
+  index.json      {'generation': n, 'addons': {addon_id: {'size', 'hash', 'files', 'signature'}}}
+  <addon_id>.zip  addon_data/<addon_id>/ of the main system (member names keep the <addon_id>/ prefix)
+
+push() (main system) rebuilds and uploads only shards whose file list (path, size, mtime) changed.
+pull(selected) (secondaries) downloads and extracts only the selected addon IDs whose hash differs
+from what was last applied. Loose files directly in addon_data go into the ROOT_SHARD archive.
+A downloaded shard is extracted only if its SHA-256 matches the index. shards_applied.json keeps the member
+list of every applied shard, so files dropped from a shard are deleted locally on the next pull.
+"""
+import json
+import os
+import zipfile
+
+import xbmc
+
+from resources.lib import delta_sync
+from resources.lib import sync_state
+from resources.lib import transfer_jobs
+
+INDEX_NAME = 'index.json'
+ROOT_SHARD = '_root'
+LOG_PREFIX = "[AddonShards]"
+
+
+def parse_addon_ids(value):
+    """Comma/whitespace separated addon IDs from the addon_sync_ids setting; empty set = all."""
+    return {part.strip() for part in (value or '').replace(';', ',').replace(' ', ',').split(',') if part.strip()}
+
+
+def _empty_index():
+    return {'generation': 0, 'addons': {}}
+
+
+def _shard_of(rel):
+    return rel.split('/', 1)[0] if '/' in rel else ROOT_SHARD
+
+
+class ShardSync:
+    """
+    backend: sync_backend instance; remote_root: remote directory of this device's shards;
+    local_root: addon_data directory; work_dir: local directory for archives, index copy and applied state;
+    state_key: key of the connection profile (applied state is kept per profile).
+    """
+    def __init__(self, backend, remote_root, local_root, work_dir, state_key='', workers=1, prune_dir=None,
+                 scan=None):
+        self.backend = backend
+        self.remote_root = remote_root.rstrip('/')
+        self.local_root = local_root
+        self.work_dir = work_dir
+        self.shard_dir = os.path.join(work_dir, 'shards')
+        self.state_key = state_key
+        self.workers = workers
+        self.prune_dir = prune_dir
+        self.scan = scan
+        self.stats = {'transferred': 0, 'unchanged': 0, 'removed': 0, 'failed': 0, 'bytes': 0, 'bytes_skipped': 0}
+        self.index_path = os.path.join(work_dir, 'shards_index.json')
+
+    def _remote_shard(self, addon_id):
+        return f"{self.remote_root}/{addon_id}.zip"
+
+    def _local_shard(self, addon_id):
+        return os.path.join(self.shard_dir, addon_id + '.zip')
+
+    def _remote_index(self):
+        return f"{self.remote_root}/{INDEX_NAME}"
+
+    def fetch_index(self):
+        """Download the remote index into index_path; returns the parsed index or None."""
+        os.makedirs(self.work_dir, exist_ok=True)
+        if not self.backend.download(self._remote_index(), self.index_path):
+            return None
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(index, dict) or not isinstance(index.get('addons'), dict):
+            return None
+        index['generation'] = int(index.get('generation') or 0)
+        return index
+
+    def _scan(self):
+        """Group local files by addon ID: {addon_id: [(rel, abs_path, stat), ...]}."""
+        shards = {}
+        local = self.scan() if self.scan else delta_sync.iter_local_files(self.local_root, self.prune_dir)
+        for rel, abs_path, st in local:
+            shards.setdefault(_shard_of(rel), []).append((rel, abs_path, st))
+        return shards
+
+    def _build(self, addon_id, files):
+        """Write the shard archive; returns {'size', 'hash', 'files'}."""
+        os.makedirs(self.shard_dir, exist_ok=True)
+        path = self._local_shard(addon_id)
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED, strict_timestamps=False) as zipf:
+            for rel, abs_path, _ in sorted(files, key=lambda f: f[0]):
+                zipf.write(abs_path, rel)
+        return {'size': os.path.getsize(path), 'hash': sync_state.file_hash(path), 'files': len(files)}
+
+    def _remove_local(self, addon_id):
+        try:
+            os.remove(self._local_shard(addon_id))
+        except OSError:
+            pass
+
+    def push(self):
+        """
+        Rebuild and upload changed shards, drop shards of removed addons, publish the new index.
+        Returns True on success, False if the caller should fall back to the single ZIP.
+        """
+        old = self.fetch_index() or _empty_index()
+        addons = {}
+        changed = []
+        for addon_id, files in sorted(self._scan().items()):
+            sig = sync_state.tree_signature(files)
+            prev = old['addons'].get(addon_id)
+            if prev and prev.get('signature') == sig:
+                addons[addon_id] = prev
+                self.stats['unchanged'] += 1
+                self.stats['bytes_skipped'] += prev.get('size', 0)
+                continue
+            try:
+                entry = dict(self._build(addon_id, files), signature=sig)
+            except (OSError, ValueError, zipfile.BadZipFile) as e:
+                xbmc.log(f"{LOG_PREFIX} Shard {addon_id} not built: {e}", xbmc.LOGERROR)
+                self._remove_local(addon_id)
+                self.stats['failed'] += 1
+                if prev:
+                    addons[addon_id] = prev
+                continue
+            if prev and prev.get('hash') == entry['hash']:
+                addons[addon_id] = entry
+                self._remove_local(addon_id)
+                self.stats['unchanged'] += 1
+                self.stats['bytes_skipped'] += entry['size']
+                continue
+            changed.append((addon_id, entry))
+
+        if changed and not self.backend.makedirs(self.remote_root):
+            for addon_id, _ in changed:
+                self._remove_local(addon_id)
+            return False
+        jobs = [transfer_jobs.TransferJob(transfer_jobs.UPLOAD, self._local_shard(addon_id),
+                                          self._remote_shard(addon_id), label=addon_id)
+                for addon_id, _ in changed]
+        ok = {r.label: r.ok for r in transfer_jobs.run_jobs(self.backend, jobs, self.workers)}
+        for addon_id, entry in changed:
+            self._remove_local(addon_id)
+            if ok.get(addon_id):
+                addons[addon_id] = entry
+                self.stats['transferred'] += 1
+                self.stats['bytes'] += entry['size']
+            else:
+                self.stats['failed'] += 1
+                if addon_id in old['addons']:
+                    addons[addon_id] = old['addons'][addon_id]  # remote still holds the previous shard
+
+        for addon_id in old['addons']:
+            if addon_id not in addons:
+                self.backend.delete(self._remote_shard(addon_id))
+                self.stats['removed'] += 1
+
+        if addons == old['addons'] and old['generation']:
+            self._log('push')
+            return True
+        index = {'generation': old['generation'] + 1, 'addons': addons}
+        with open(self.index_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        published = self.backend.makedirs(self.remote_root) and self.backend.upload(self.index_path, self._remote_index())
+        self._log('push')
+        return published
+
+    def pull(self, selected=None, index=None):
+        """
+        Download and extract changed shards of the selected addon IDs (None/empty = all).
+        Returns True on success, False if no remote index exists (caller falls back to ZIP) or transfers failed.
+        """
+        index = index or self.fetch_index()
+        if index is None:
+            return False
+        applied_state = sync_state.SyncState(os.path.join(self.work_dir, 'shards_applied.json'))
+        wanted = sorted(index['addons'])
+        if selected:
+            for addon_id in sorted(set(selected) - set(wanted)):
+                xbmc.log(f"{LOG_PREFIX} {addon_id} not on the server", xbmc.LOGINFO)
+            wanted = [a for a in wanted if a in selected]
+        os.makedirs(self.shard_dir, exist_ok=True)
+        pending = []
+        for addon_id in wanted:
+            if not delta_sync._safe_rel(addon_id) or '/' in addon_id:
+                xbmc.log(f"{LOG_PREFIX} unsafe addon ID in index skipped: {addon_id!r}", xbmc.LOGERROR)
+                self.stats['failed'] += 1
+                continue
+            entry = index['addons'][addon_id]
+            applied = applied_state.get(self.state_key, addon_id)
+            present = addon_id == ROOT_SHARD or os.path.isdir(os.path.join(self.local_root, addon_id))
+            if present and applied.get('hash') == entry.get('hash'):
+                self.stats['unchanged'] += 1
+                self.stats['bytes_skipped'] += entry.get('size', 0)
+                continue
+            pending.append(addon_id)
+
+        jobs = [transfer_jobs.TransferJob(transfer_jobs.DOWNLOAD, self._local_shard(addon_id),
+                                          self._remote_shard(addon_id), label=addon_id)
+                for addon_id in pending]
+        ok = {r.label: r.ok for r in transfer_jobs.run_jobs(self.backend, jobs, self.workers)}
+        for addon_id in pending:
+            entry = index['addons'][addon_id]
+            path = self._local_shard(addon_id)
+            try:
+                if not ok.get(addon_id):
+                    raise IOError("download failed")
+                if entry.get('hash') and sync_state.file_hash(path) != entry['hash']:
+                    raise IOError("hash mismatch")
+                with zipfile.ZipFile(path, 'r') as zipf:
+                    members = sorted(n for n in zipf.namelist() if not n.endswith('/'))
+                    zipf.extractall(self.local_root)
+                previous = applied_state.get(self.state_key, addon_id).get('members') or []
+                self._remove_dropped(addon_id, set(previous) - set(members))
+                applied_state.record(self.state_key, addon_id,
+                                     {'hash': entry.get('hash'), 'size': entry.get('size'), 'members': members})
+                self.stats['transferred'] += 1
+                self.stats['bytes'] += entry.get('size', 0)
+            except (OSError, IOError, zipfile.BadZipFile) as e:
+                xbmc.log(f"{LOG_PREFIX} Shard {addon_id} not applied: {e}", xbmc.LOGERROR)
+                self.stats['failed'] += 1
+            finally:
+                self._remove_local(addon_id)
+        applied_state.save()
+        self._log('pull')
+        return self.stats['failed'] == 0
+
+    def _remove_dropped(self, addon_id, rels):
+        """Delete local files of addon_id that the previously applied shard had and the new one does not."""
+        for rel in sorted(rels):
+            if not isinstance(rel, str) or not delta_sync._safe_rel(rel) or _shard_of(rel) != addon_id:
+                continue
+            try:
+                os.remove(os.path.join(self.local_root, *rel.split('/')))
+                self.stats['removed'] += 1
+            except OSError:
+                pass
+
+    def _log(self, direction):
+        st = self.stats
+        xbmc.log(
+            f"{LOG_PREFIX} {direction}: {st['transferred']} shards transferred ({st['bytes']} bytes), "
+            f"{st['unchanged']} unchanged ({st['bytes_skipped']} bytes skipped), "
+            f"{st['removed']} removed, {st['failed']} failed", xbmc.LOGINFO)
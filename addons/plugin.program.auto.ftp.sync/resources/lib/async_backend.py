@@ -0,0 +1,443 @@
+# -*- coding: utf-8 -*-
+"""
+Asyncio backends: the same operations as sync_backend as coroutines, so transfers, listings and
+metadata probes of one sync run can overlap under a single event loop.
+Each backend provides: async upload(local_path, remote_path, progress=None), download(remote_path, local_path,
+progress=None), stat(remote_path), list(remote_dir), folder_exists(remote_path), makedirs(remote_dir),
+delete(remote_path), close().
+
+AsyncFTPBackend speaks FTP over asyncio streams (passive mode, sessions pooled up to max_sessions). Like
+sync_backend.FTPBackend it never leaves a half-written file under the final name: uploads go to <remote>.part and
+are renamed after the server confirmed the transfer, downloads go to <local>.part and are moved into place.
+AsyncExecutorBackend runs a blocking sync_backend instance (SFTP/SMB via xbmcvfs) on an executor.
+"""
+import asyncio
+import contextlib
+import ftplib
+import functools
+import os
+import re
+import time
+
+import xbmc
+
+from resources.lib import sync_backend
+from resources.lib import transfer_jobs
+
+FTP_PORT = 21
+LOG_PREFIX = "[AutoFTP]"
+_PASV_RE = re.compile(r'(\d+),(\d+),(\d+),(\d+),(\d+),(\d+)')
+
+
+def _reply_error(code, text):
+    """ftplib exception for an unexpected reply, so callers can handle both backends alike."""
+    if code.startswith('5'):
+        return ftplib.error_perm(text)
+    if code.startswith('4'):
+        return ftplib.error_temp(text)
+    return ftplib.error_reply(text)
+
+
+class _FTPSession:
+    """One logged-in FTP control connection; every read waits at most read_timeout seconds."""
+    def __init__(self, host, reader, writer, read_timeout=sync_backend.DEFAULT_READ_TIMEOUT):
+        self.host = host
+        self.reader = reader
+        self.writer = writer
+        self.read_timeout = read_timeout
+
+    @classmethod
+    async def open(cls, host, port, user, password, connect_timeout=sync_backend.DEFAULT_CONNECT_TIMEOUT,
+                   read_timeout=sync_backend.DEFAULT_READ_TIMEOUT):
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), connect_timeout)
+        session = cls(host, reader, writer, read_timeout)
+        code, text = await asyncio.wait_for(session.reply(), connect_timeout)
+        if not code.startswith('2'):
+            raise _reply_error(code, text)
+        code, text = await session.command('USER ' + user)
+        if code.startswith('3'):
+            await session.command('PASS ' + password, expect='2')
+        elif not code.startswith('2'):
+            raise _reply_error(code, text)
+        await session.command('TYPE I', expect='2')
+        return session
+
+    async def reply(self):
+        """Read one (possibly multi-line) reply; returns (code, text)."""
+        line = await self._read(self.reader.readline())
+        if not line:
+            raise EOFError('connection closed')
+        text = line.decode('utf-8', 'replace').rstrip('\r\n')
+        code = text[:3]
+        lines = [text]
+        if text[3:4] == '-':
+            while True:
+                line = await self._read(self.reader.readline())
+                if not line:
+                    raise EOFError('connection closed')
+                lines.append(line.decode('utf-8', 'replace').rstrip('\r\n'))
+                if lines[-1].startswith(code + ' '):
+                    break
+        return code, '\n'.join(lines)
+
+    async def _read(self, coro):
+        try:
+            return await asyncio.wait_for(coro, self.read_timeout)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"no answer within {self.read_timeout}s") from None
+
+    async def command(self, cmd, expect=None):
+        self.writer.write((cmd + '\r\n').encode('utf-8'))
+        await self.writer.drain()
+        code, text = await self.reply()
+        if expect and not code.startswith(expect):
+            raise _reply_error(code, text)
+        return code, text
+
+    async def _open_data(self, cmd):
+        """PASV + cmd; returns the data connection (reader, writer). Like ftplib, the PASV host is ignored."""
+        _, text = await self.command('PASV', expect='227')
+        match = _PASV_RE.search(text)
+        if not match:
+            raise ftplib.error_proto(text)
+        nums = [int(n) for n in match.groups()]
+        data = await asyncio.wait_for(asyncio.open_connection(self.host, nums[4] * 256 + nums[5]), self.read_timeout)
+        try:
+            await self.command(cmd, expect='1')
+        except Exception:
+            data[1].close()
+            raise
+        return data
+
+    async def _finish_data(self, writer):
+        writer.close()
+        with contextlib.suppress(Exception):
+            await writer.wait_closed()
+        code, text = await self.reply()
+        if not code.startswith('2'):
+            raise _reply_error(code, text)
+
+    async def stor(self, local_path, remote, buffer_size, progress=None):
+        total = os.path.getsize(local_path)
+        _, writer = await self._open_data('STOR ' + remote)
+        done = 0
+        try:
+            with open(local_path, 'rb') as f:
+                while True:
+                    buf = f.read(buffer_size)
+                    if not buf:
+                        break
+                    writer.write(buf)
+                    await self._read(writer.drain())
+                    done += len(buf)
+                    if progress:
+                        progress(done, total)
+        finally:
+            await self._finish_data(writer)
+
+    async def retr(self, remote, local_path, buffer_size, progress=None, total=None):
+        reader, writer = await self._open_data('RETR ' + remote)
+        done = 0
+        try:
+            with open(local_path, 'wb') as f:
+                while True:
+                    buf = await self._read(reader.read(buffer_size))
+                    if not buf:
+                        break
+                    f.write(buf)
+                    done += len(buf)
+                    if progress:
+                        progress(done, total)
+        finally:
+            await self._finish_data(writer)
+
+    async def rename(self, source, target):
+        """RNFR/RNTO; some servers refuse to rename onto an existing file, so the target is deleted and it is retried."""
+        try:
+            await self.command('RNFR ' + source, expect='3')
+            await self.command('RNTO ' + target, expect='2')
+        except ftplib.error_perm:
+            await self.command('DELE ' + target, expect='2')
+            await self.command('RNFR ' + source, expect='3')
+            await self.command('RNTO ' + target, expect='2')
+
+    async def lines(self, cmd):
+        reader, writer = await self._open_data(cmd)
+        try:
+            data = await self._read(reader.read())
+        finally:
+            await self._finish_data(writer)
+        return [line for line in data.decode('utf-8', 'replace').splitlines() if line]
+
+    async def quit(self):
+        with contextlib.suppress(Exception):
+            await asyncio.wait_for(self.command('QUIT'), 5)
+        self.writer.close()
+
+
+class AsyncFTPBackend:
+    """
+    FTP over asyncio streams; at most max_sessions control connections, idle ones are reused.
+    Connecting is retried with backoff (retries, deadline) like sync_backend.FTPBackend.
+    """
+    def __init__(self, host, user, password, base_path, port=FTP_PORT, buffer_size=sync_backend.DEFAULT_BUFFER_SIZE,
+                 max_sessions=4, connect_timeout=sync_backend.DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=sync_backend.DEFAULT_READ_TIMEOUT, retries=sync_backend.DEFAULT_RETRIES, deadline=None):
+        # host may carry its own port (host:port), e.g. a stand-in server
+        self.host, host_port = sync_backend.split_host_port(host)
+        self.port = host_port or int(port or FTP_PORT)
+        self.user = user
+        self.password = password
+        self.base_path = sync_backend._norm_ftp_path(base_path.rstrip('/'))
+        self.buffer_size = buffer_size
+        self.max_sessions = max(1, max_sessions)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.deadline = deadline
+        self._idle = []
+        self._slots = None  # created inside the running loop
+        self._dirs_made = set()
+        self.stats = {'connections': 0, 'reused': 0, 'handshake_time': 0.0}
+
+    def _remote(self, path):
+        p = path.replace('\\', '/')
+        return p if p.startswith('/') else self.base_path + '/' + p.lstrip('/')
+
+    @contextlib.asynccontextmanager
+    async def _session(self):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_sessions)
+        async with self._slots:
+            if self._idle:
+                session = self._idle.pop()
+                self.stats['reused'] += 1
+            else:
+                start = time.monotonic()
+                session = await self._connect()
+                self.stats['connections'] += 1
+                self.stats['handshake_time'] += time.monotonic() - start
+            try:
+                yield session
+            except ftplib.error_perm:
+                self._idle.append(session)  # the command failed, the session is fine
+                raise
+            except BaseException:
+                await session.quit()
+                raise
+            self._idle.append(session)
+
+    async def _connect(self):
+        attempt = 0
+        while True:
+            timeout = self.deadline.cap(self.connect_timeout) if self.deadline else self.connect_timeout
+            try:
+                return await _FTPSession.open(self.host, self.port, self.user, self.password, timeout,
+                                              self.read_timeout)
+            except (asyncio.TimeoutError, *sync_backend.TRANSIENT_ERRORS) as e:
+                delay = sync_backend.backoff_delay(attempt)
+                remaining = self.deadline.remaining() if self.deadline else None
+                if attempt >= self.retries or (remaining is not None and delay >= remaining):
+                    raise
+                xbmc.log(f"{LOG_PREFIX} FTP connect failed ({e}), retry {attempt + 1}/{self.retries} "
+                         f"in {delay:.1f}s", xbmc.LOGDEBUG)
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def upload(self, local_path, remote_path, progress=None):
+        """STOR into <remote>.part; renamed onto remote only after the server confirmed the transfer (226)."""
+        remote = self._remote(remote_path)
+        part = remote + '.part'
+        try:
+            async with self._session() as session:
+                await session.stor(local_path, part, self.buffer_size, progress)
+                await session.rename(part, remote)
+            return True
+        except Exception as e:
+            xbmc.log(f"{LOG_PREFIX} FTP upload failed: {e}", xbmc.LOGERROR)
+            with contextlib.suppress(Exception):
+                async with self._session() as session:
+                    await session.command('DELE ' + part)
+            return False
+
+    async def download(self, remote_path, local_path, progress=None):
+        """RETR into <local>.part; moved onto local_path only when complete, so a failure keeps the old file."""
+        part = local_path + '.part'
+        try:
+            async with self._session() as session:
+                await session.retr(self._remote(remote_path), part, self.buffer_size, progress)
+            os.replace(part, local_path)
+            return True
+        except Exception as e:
+            xbmc.log(f"{LOG_PREFIX} FTP download failed: {e}", xbmc.LOGERROR)
+            sync_backend._remove_quietly(part)
+            return False
+
+    async def stat(self, remote_path):
+        """{'type': 'file', 'size', 'mtime'} via SIZE/MDTM, or None if the file is missing."""
+        remote = self._remote(remote_path)
+        try:
+            async with self._session() as session:
+                _, text = await session.command('SIZE ' + remote, expect='2')
+                size = int(text[4:].strip())
+                code, text = await session.command('MDTM ' + remote)
+            mtime = sync_backend._parse_mdtm(text[4:].strip()) if code.startswith('2') else None
+            return {'type': 'file', 'size': size, 'mtime': mtime}
+        except ftplib.error_perm:
+            return None
+        except Exception as e:
+            xbmc.log(f"{LOG_PREFIX} FTP stat failed: {e}", xbmc.LOGERROR)
+            return None
+
+    async def list(self, remote_dir):
+        """{name: {'type', 'size', 'mtime'}} via MLSD, or None if the directory is missing."""
+        try:
+            async with self._session() as session:
+                lines = await session.lines('MLSD ' + self._remote(remote_dir))
+        except ftplib.error_perm:
+            return None
+        except Exception as e:
+            xbmc.log(f"{LOG_PREFIX} FTP list failed: {e}", xbmc.LOGERROR)
+            return None
+        entries = {}
+        for line in lines:
+            facts_part, _, name = line.partition(' ')
+            facts = dict(f.split('=', 1) for f in facts_part.split(';') if '=' in f)
+            kind = facts.get('type', '').lower()
+            if kind in ('file', 'dir'):
+                size = facts.get('size', '')
+                entries[name] = {'type': kind, 'size': int(size) if size.isdigit() else None,
+                                 'mtime': sync_backend._parse_mdtm(facts.get('modify'))}
+        return entries
+
+    async def folder_exists(self, remote_path):
+        try:
+            async with self._session() as session:
+                await session.command('CWD ' + self._remote(remote_path), expect='2')
+            return True
+        except ftplib.error_perm:
+            return False
+        except Exception as e:
+            xbmc.log(f"{LOG_PREFIX} FTP folder_exists failed: {e}", xbmc.LOGERROR)
+            return False
+
+    async def makedirs(self, remote_dir):
+        remote = self._remote(remote_dir).rstrip('/')
+        try:
+            async with self._session() as session:
+                path = ''
+                for seg in remote.strip('/').split('/'):
+                    path += '/' + seg
+                    if path not in self._dirs_made:
+                        await session.command('MKD ' + path)  # 550 = exists
+                        self._dirs_made.add(path)
+            return True
+        except Exception as e:
+            xbmc.log(f"{LOG_PREFIX} FTP makedirs failed: {e}", xbmc.LOGERROR)
+            return False
+
+    async def delete(self, remote_path):
+        try:
+            async with self._session() as session:
+                await session.command('DELE ' + self._remote(remote_path), expect='2')
+            return True
+        except ftplib.error_perm:
+            return False
+        except Exception as e:
+            xbmc.log(f"{LOG_PREFIX} FTP delete failed: {e}", xbmc.LOGERROR)
+            return False
+
+    async def close(self):
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(session.quit() for session in idle))
+        if self.stats['connections']:
+            xbmc.log(
+                f"{LOG_PREFIX} Async FTP sessions: {self.stats['connections']} connects "
+                f"({self.stats['handshake_time']:.2f}s handshake), {self.stats['reused']} reused", xbmc.LOGINFO)
+        return dict(self.stats)
+
+
+class AsyncExecutorBackend:
+    """Runs a blocking sync_backend instance on an executor (default: the loop's thread pool)."""
+    def __init__(self, backend, executor=None):
+        self.backend = backend
+        self.executor = executor
+
+    async def _run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    async def upload(self, local_path, remote_path, progress=None):
+        return await self._run(self.backend.upload, local_path, remote_path, progress=progress)
+
+    async def download(self, remote_path, local_path, progress=None):
+        return await self._run(self.backend.download, remote_path, local_path, progress=progress)
+
+    async def stat(self, remote_path):
+        return await self._run(self.backend.stat, remote_path)
+
+    async def list(self, remote_dir):
+        return await self._run(self.backend.list_dir, remote_dir)
+
+    async def folder_exists(self, remote_path):
+        return await self._run(self.backend.folder_exists, remote_path)
+
+    async def makedirs(self, remote_dir):
+        return await self._run(self.backend.makedirs, remote_dir)
+
+    async def delete(self, remote_path):
+        return await self._run(self.backend.delete, remote_path)
+
+    async def close(self):
+        return await self._run(self.backend.close)
+
+
+def get_async_backend(profile, buffer_size=None, max_sessions=4, connect_timeout=sync_backend.DEFAULT_CONNECT_TIMEOUT,
+                      read_timeout=sync_backend.DEFAULT_READ_TIMEOUT, retries=sync_backend.DEFAULT_RETRIES,
+                      deadline=None, **kwargs):
+    """Async backend for a profile dict (see profiles.py); kwargs go to sync_backend.get_backend for SFTP/SMB."""
+    network = {'connect_timeout': connect_timeout, 'read_timeout': read_timeout, 'retries': retries,
+               'deadline': deadline}
+    if profile['connection_type'] == 'ftp':
+        return AsyncFTPBackend(profile['host'], profile['user'], profile['password'], profile['base_path'] or '',
+                               buffer_size=buffer_size or sync_backend.DEFAULT_BUFFER_SIZE, max_sessions=max_sessions,
+                               **network)
+    from resources.lib import profiles
+    return AsyncExecutorBackend(profiles.get_backend(profile, buffer_size=buffer_size, **network, **kwargs))
+
+
+async def run_jobs_async(backend, jobs, limit):
+    """
+    Run transfer_jobs.TransferJob chains on an async backend; limit is an int or a shared asyncio.Semaphore
+    capping concurrent transfers. Returns list of transfer_jobs.JobResult in the order of jobs.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return []
+    if isinstance(limit, int):
+        limit = asyncio.Semaphore(max(1, limit))
+
+    async def run(job):
+        async with limit:
+            start = time.monotonic()
+            ok = False
+            error = None
+            current = job
+            while current is not None:
+                try:
+                    if current.direction == transfer_jobs.UPLOAD:
+                        done = await backend.upload(current.local_path, current.remote_path)
+                    else:
+                        done = await backend.download(current.remote_path, current.local_path)
+                    ok = bool(done) or ok
+                except Exception as e:
+                    error = str(e)
+                    xbmc.log(f"{LOG_PREFIX} Transfer {current.label} failed: {e}", xbmc.LOGERROR)
+                current = current.then
+            return transfer_jobs.JobResult(job, ok, time.monotonic() - start, error)
+
+    start = time.monotonic()
+    results = await asyncio.gather(*(run(job) for job in jobs))
+    ok = sum(1 for r in results if r.ok)
+    xbmc.log(f"{LOG_PREFIX} {ok}/{len(results)} async transfers ok in {time.monotonic() - start:.2f}s", xbmc.LOGINFO)
+    return list(results)
@@ -13,6 +13,8 @@ import xbmcaddon
 import xbmcgui
 import xbmcvfs
 
+from resources.lib import zip_extract, zip_policy
+
 ADDON = xbmcaddon.Addon()
 ADDON_ID = ADDON.getAddonInfo('id')
 HOME = xbmcvfs.translatePath('special://home')
@@ -66,6 +68,21 @@ def _download_zip_from_url(url, target_path, progress_dialog=None):
         return False
 
 
+def _compression_policy():
+    try:
+        return zip_policy.CompressionPolicy.from_settings(ADDON.getSettingString('zip_level'),
+                                                          ADDON.getSettingInt('zip_text_method'))
+    except Exception:
+        return zip_policy.CompressionPolicy()
+
+
+def _extract_workers():
+    try:
+        return zip_extract.get_worker_count(int(ADDON.getSettingString('extract_workers') or 0))
+    except Exception:
+        return zip_extract.DEFAULT_WORKERS
+
+
 def _sanitize_name(name):
     return re.sub(r'[\\/:*?"<>|]', '', name).strip() or 'backup'
 
@@ -123,6 +140,8 @@ def create_backup(include_addon_data=True, target_base=None):
 
     progress.create(ADDON.getLocalizedString(30001), ADDON.getLocalizedString(30040))
     written = 0
+    policy = _compression_policy()
+    stats = zip_policy.PolicyStats()
     try:
         with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED, allowZip64=True) as zf:
             for i, (abs_path, arcname) in enumerate(to_add):
@@ -135,13 +154,17 @@ def create_backup(include_addon_data=True, target_base=None):
                             pass
                     return False
                 try:
-                    zf.write(abs_path, os.path.join('userdata', arcname))
+                    method, level = policy.choose(abs_path, os.path.getsize(abs_path))
+                    zf.write(abs_path, os.path.join('userdata', arcname), compress_type=method, compresslevel=level)
+                    info = zf.infolist()[-1]
+                    stats.add(info.compress_type, info.file_size, info.compress_size)
                     written += 1
                 except Exception as e:
                     xbmc.log(f"{LOG_PREFIX} Skip {arcname}: {e}", xbmc.LOGERROR)
                 pct = int((i + 1) / total * 100)
                 progress.update(pct, f"{i + 1} / {total}\n{arcname}")
         progress.close()
+        xbmc.log(f"{LOG_PREFIX} Compression: {stats.finish().summary()}", xbmc.LOGINFO)
         size = os.path.getsize(zip_path)
         dialog.ok(ADDON.getLocalizedString(30001), ADDON.getLocalizedString(30041).format(path=zip_path, size=_format_size(size)))
         return True
@@ -156,6 +179,7 @@ def restore_from_zip(zip_path=None, wipe_first=False):
     """
     Restore from a ZIP file into userdata (or home).
     zip_path: full path to zip; if None, show browse dialog.
+    Files that already match the backup (size + CRC-32) are left untouched (zip_extract.ZipExtractor).
     """
     dialog = xbmcgui.Dialog()
     progress = xbmcgui.DialogProgress()
@@ -185,27 +209,27 @@ def restore_from_zip(zip_path=None, wipe_first=False):
 
     progress.create(ADDON.getLocalizedString(30001), ADDON.getLocalizedString(30046))
     extract_root = HOME  # ZIP contains "userdata/..." so extract to home
-    errors = []
+    extractor = zip_extract.ZipExtractor(extract_root, workers=_extract_workers())
     try:
         with zipfile.ZipFile(zip_path, 'r', allowZip64=True) as zf:
-            names = [n for n in zf.namelist() if not n.endswith('/')]
-            total = len(names)
-            for i, name in enumerate(names):
-                if progress.iscanceled():
-                    progress.close()
-                    return False
-                # Skip paths targeting this addon's data if we want to avoid overwriting ourselves
-                if ADDON_ID in name and 'addon_data' in name:
-                    continue
-                try:
-                    zf.extract(name, extract_root)
-                except Exception as e:
-                    errors.append(f"{name}: {e}")
-                    xbmc.log(f"{LOG_PREFIX} Extract error {name}: {e}", xbmc.LOGERROR)
-                pct = int((i + 1) / total * 100)
-                progress.update(pct, f"{i + 1} / {total}\n{name}")
+            # Skip paths targeting this addon's data if we want to avoid overwriting ourselves
+            infos = [i for i in zf.infolist() if not (ADDON_ID in i.filename and 'addon_data' in i.filename)]
+
+        def update(done, total, name):
+            progress.update(int(done / total * 100), f"{done} / {total}\n{name}")
+
+        failed = extractor.extract_files(zip_path, infos, progress=update, cancelled=progress.iscanceled)
+        if progress.iscanceled():
+            progress.close()
+            return False
+        errors = []
+        for name, e in failed:
+            errors.append(f"{name}: {e}")
+            xbmc.log(f"{LOG_PREFIX} Extract error {name}: {e}", xbmc.LOGERROR)
         progress.close()
-        msg = ADDON.getLocalizedString(30047)
+        st = extractor.stats
+        msg = ADDON.getLocalizedString(30047) + "\n" + ADDON.getLocalizedString(30168).format(
+            written=st['written'], skipped=st['skipped'], size=_format_size(st['bytes_skipped']))
         if errors:
             msg += "\n" + ADDON.getLocalizedString(30048).format(count=len(errors))
         dialog.ok(ADDON.getLocalizedString(30001), msg)
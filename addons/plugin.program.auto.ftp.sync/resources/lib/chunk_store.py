@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Content-defined chunk store for large addon_data files (used by delta_sync).
+Files are cut at content-defined boundaries, so a small change only alters the chunks around it: every byte
+is mapped to one pseudo-random bit (bytes.translate) and a chunk ends where the last 16 bits spell
+_CUT_PATTERN (bytes.find). Both run in C, so chunking costs about as much as reading the file. Chunks are stored content-addressed under <remote_root>/chunks/<xx>/<sha256>;
+only chunks the remote does not have yet are uploaded, and only chunks missing from the local copy
+of a file are downloaded. refs ({chunk: generation that last added a reference}) lives in the delta
+index and drives garbage collection.
+"""
+import hashlib
+import os
+import random
+
+import xbmc
+
+from resources.lib import transfer_jobs
+
+CHUNKS_DIR = 'chunks'
+# Files of at least this size are stored as chunk lists instead of whole files
+CHUNK_THRESHOLD = 1024 * 1024
+MIN_CHUNK = 16 * 1024
+MAX_CHUNK = 256 * 1024
+# One bit ('0'/'1') per byte value; 16 pattern bits: on average a boundary every 64 KB after MIN_CHUNK
+_rng = random.Random(0x41465453)
+_BIT_TABLE = bytes(0x30 + _rng.getrandbits(1) for _ in range(256))
+_CUT_PATTERN = b'0110100110010110'
+# Chunks transferred per batch (bounds temporary disk use to about BATCH * MAX_CHUNK)
+BATCH = 64
+LOG_PREFIX = "[ChunkStore]"
+
+
+def _find_cut(buf):
+    """Length of the next chunk at the start of buf (buf holds >= MAX_CHUNK bytes unless at EOF)."""
+    n = len(buf)
+    if n <= MIN_CHUNK:
+        return n
+    end = min(n, MAX_CHUNK)
+    start = MIN_CHUNK - len(_CUT_PATTERN)
+    found = buf[start:end].translate(_BIT_TABLE).find(_CUT_PATTERN)
+    if found >= 0:
+        return MIN_CHUNK + found
+    return end
+
+
+def iter_chunks(path):
+    """Yield (offset, length, sha256_hex, data) for the content-defined chunks of a local file."""
+    offset = 0
+    buf = b''
+    eof = False
+    with open(path, 'rb') as f:
+        while True:
+            if len(buf) < MAX_CHUNK and not eof:
+                more = f.read(4 * MAX_CHUNK)
+                if more:
+                    buf += more
+                else:
+                    eof = True
+            if not buf:
+                break
+            n = _find_cut(buf)
+            data = buf[:n]
+            buf = buf[n:]
+            yield offset, n, hashlib.sha256(data).hexdigest(), data
+            offset += n
+
+
+class ChunkStore:
+    """
+    backend: sync_backend instance; remote_root: remote directory holding chunks/;
+    work_dir: local scratch directory; refs: dict chunk -> generation (modified in place).
+    """
+    def __init__(self, backend, remote_root, work_dir, refs, workers=1):
+        self.backend = backend
+        self.remote_root = remote_root.rstrip('/')
+        self.work_dir = os.path.join(work_dir, 'chunk_tmp')
+        self.refs = refs
+        self.workers = workers
+        self.stats = {'chunks_sent': 0, 'chunks_fetched': 0, 'chunks_reused': 0, 'bytes': 0, 'bytes_saved': 0}
+
+    def remote_chunk(self, h):
+        return f"{self.remote_root}/{CHUNKS_DIR}/{h[:2]}/{h}"
+
+    def _tmp(self, h):
+        return os.path.join(self.work_dir, h)
+
+    def _transfer(self, direction, hashes):
+        """Transfer chunk temp files in batches; returns set of hashes that succeeded."""
+        jobs = [transfer_jobs.TransferJob(direction, self._tmp(h), self.remote_chunk(h), label=h) for h in hashes]
+        return {r.label for r in transfer_jobs.run_jobs(self.backend, jobs, self.workers) if r.ok}
+
+    def _flush_uploads(self, pending):
+        for d in sorted({self.remote_chunk(h).rsplit('/', 1)[0] for h in pending}):
+            if not self.backend.makedirs(d):
+                raise IOError(f"cannot create {d}")
+        done = self._transfer(transfer_jobs.UPLOAD, pending)
+        for h in pending:
+            os.remove(self._tmp(h))
+        if len(done) != len(pending):
+            raise IOError(f"{len(pending) - len(done)} chunk uploads failed")
+
+    def put_file(self, path, generation):
+        """Upload the chunks of path the remote does not have; returns [[hash, length], ...] or None."""
+        os.makedirs(self.work_dir, exist_ok=True)
+        chunks = []
+        pending = {}
+        try:
+            for _, n, h, data in iter_chunks(path):
+                chunks.append([h, n])
+                if h in self.refs or h in pending:
+                    self.stats['chunks_reused'] += 1
+                    self.stats['bytes_saved'] += n
+                else:
+                    with open(self._tmp(h), 'wb') as f:
+                        f.write(data)
+                    pending[h] = n
+                    if len(pending) >= BATCH:
+                        self._flush_uploads(pending)
+                        self._sent(pending, generation)
+                        pending = {}
+            if pending:
+                self._flush_uploads(pending)
+                self._sent(pending, generation)
+        except (OSError, IOError) as e:
+            xbmc.log(f"{LOG_PREFIX} put {path} failed: {e}", xbmc.LOGERROR)
+            return None
+        self.touch(chunks, generation)
+        return chunks
+
+    def _sent(self, pending, generation):
+        for h, n in pending.items():
+            self.refs[h] = generation
+            self.stats['chunks_sent'] += 1
+            self.stats['bytes'] += n
+
+    def touch(self, chunks, generation):
+        """Mark chunks as referenced by generation."""
+        for h, _ in chunks:
+            self.refs[h] = generation
+
+    def get_file(self, chunks, local_path, target_path, expected_hash=None):
+        """
+        Rebuild a file from chunks into target_path, reusing chunks found in the current local_path.
+        Returns True if the result matches expected_hash (if given).
+        """
+        os.makedirs(self.work_dir, exist_ok=True)
+        local = {}
+        if os.path.exists(local_path):
+            try:
+                for offset, n, h, _ in iter_chunks(local_path):
+                    local.setdefault(h, (offset, n))
+            except OSError:
+                local = {}
+        missing = list(dict.fromkeys(h for h, _ in chunks if h not in local))
+        fetched = set()
+        try:
+            for i in range(0, len(missing), BATCH):
+                batch = missing[i:i + BATCH]
+                fetched |= self._transfer(transfer_jobs.DOWNLOAD, batch)
+                if len(fetched) < i + len(batch):
+                    raise IOError("chunk download failed")
+            digest = hashlib.sha256()
+            with open(target_path, 'wb') as out:
+                src = open(local_path, 'rb') if local else None
+                try:
+                    for h, n in chunks:
+                        if h in local:
+                            src.seek(local[h][0])
+                            data = src.read(local[h][1])
+                            self.stats['chunks_reused'] += 1
+                            self.stats['bytes_saved'] += n
+                        else:
+                            with open(self._tmp(h), 'rb') as f:
+                                data = f.read()
+                        out.write(data)
+                        digest.update(data)
+                finally:
+                    if src:
+                        src.close()
+            self.stats['chunks_fetched'] += len(fetched)
+            self.stats['bytes'] += sum(n for h, n in chunks if h in fetched)
+        except (OSError, IOError) as e:
+            xbmc.log(f"{LOG_PREFIX} get {local_path} failed: {e}", xbmc.LOGERROR)
+            return False
+        finally:
+            for h in fetched:
+                try:
+                    os.remove(self._tmp(h))
+                except OSError:
+                    pass
+        if expected_hash and digest.hexdigest() != expected_hash:
+            xbmc.log(f"{LOG_PREFIX} hash mismatch for {local_path}", xbmc.LOGERROR)
+            return False
+        return True
+
+    def collect_garbage(self, generation, keep, live=()):
+        """
+        Delete chunks that no current file uses (live) and that no file of the last `keep`
+        generations referenced; returns number removed.
+        """
+        cutoff = generation - max(1, int(keep)) + 1
+        live = set(live)
+        removed = 0
+        for h, gen in list(self.refs.items()):
+            if h not in live and int(gen) < cutoff:
+                self.backend.delete(self.remote_chunk(h))
+                del self.refs[h]
+                removed += 1
+        xbmc.log(f"{LOG_PREFIX} GC: {removed} chunks removed, {len(self.refs)} kept", xbmc.LOGINFO)
+        return removed
@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+"""
+Per-file delta sync for addon_data (alternative to the single addon_data.zip).
+
+Remote layout below <remote_root> (auto_fav_sync/<custom_folder>/addon_data_files):
+  index.json   {'generation': n, 'files': {rel: {'size', 'mtime', 'hash'[, 'chunks']}},
+                'tombstones': {rel: generation}, 'chunk_refs': {chunk: generation}}
+  files/<rel>  one remote copy per file
+  chunks/      content-defined chunks of large files (chunk_store), when chunk dedup is enabled
+
+push() (main system) uploads only added/changed files and tombstones deleted ones.
+pull() (secondaries) downloads only files whose hash differs from what it last applied and removes
+tombstoned files it had received before. Works through any sync_backend backend.
+"""
+import json
+import os
+
+import xbmc
+import xbmcaddon
+import xbmcgui
+
+from resources.lib import chunk_store
+from resources.lib import sync_state
+from resources.lib import transfer_jobs
+
+INDEX_NAME = 'index.json'
+FILES_DIR = 'files'
+# Tombstones are kept for this many generations so rarely started devices still see deletions
+TOMBSTONE_GENERATIONS = 50
+LOG_PREFIX = "[DeltaSync]"
+
+
+def iter_local_files(local_root, prune_dir=None):
+    """
+    Yield (rel_path, abs_path, stat) for every file below local_root; rel_path uses '/'.
+    prune_dir: optional callable(rel_dir, name) -> True to skip a directory during the walk.
+    """
+    for root, dirs, files in os.walk(local_root):
+        rel_root = os.path.relpath(root, local_root).replace(os.sep, '/')
+        rel_root = '' if rel_root == '.' else rel_root
+        if prune_dir:
+            dirs[:] = [d for d in dirs if not prune_dir(rel_root, d)]
+        for name in files:
+            abs_path = os.path.join(root, name)
+            try:
+                st = os.stat(abs_path)
+            except OSError:
+                continue
+            yield (rel_root + '/' + name if rel_root else name), abs_path, st
+
+
+def _safe_rel(rel):
+    """True if rel is a relative '/'-path that stays below the local root (no '..', no absolute or drive parts)."""
+    if not isinstance(rel, str) or not rel or rel.startswith('/') or '\\' in rel \
+            or os.path.isabs(rel) or os.path.splitdrive(rel)[0]:
+        return False
+    return all(part not in ('', '.', '..') for part in rel.split('/'))
+
+
+def _load_json(path, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _empty_index():
+    return {'generation': 0, 'files': {}, 'tombstones': {}, 'chunk_refs': {}}
+
+
+class DeltaSync:
+    """
+    backend: sync_backend instance; remote_root: remote directory of this device's delta tree;
+    local_root: addon_data directory; work_dir: local directory for index copies and applied state;
+    state_key: key of the connection profile (applied state is kept per profile);
+    chunked: store files >= chunk_store.CHUNK_THRESHOLD as deduplicated chunks;
+    scan: optional callable returning the local files [(rel, abs_path, stat)] to push (e.g. sync_filter rules).
+    """
+    def __init__(self, backend, remote_root, local_root, work_dir, state_key='', workers=1, prune_dir=None,
+                 chunked=False, scan=None):
+        self.backend = backend
+        self.remote_root = remote_root.rstrip('/')
+        self.local_root = local_root
+        self.work_dir = work_dir
+        self.state_key = state_key
+        self.workers = workers
+        self.prune_dir = prune_dir
+        self.chunked = chunked
+        self.scan = scan
+        self.stats = {'transferred': 0, 'unchanged': 0, 'deleted': 0, 'failed': 0, 'bytes': 0, 'bytes_skipped': 0}
+        self.index_path = os.path.join(work_dir, 'delta_index.json')
+
+    def _remote_file(self, rel):
+        return f"{self.remote_root}/{FILES_DIR}/{rel}"
+
+    def _remote_index(self):
+        return f"{self.remote_root}/{INDEX_NAME}"
+
+    def fetch_index(self):
+        """Download the remote index into index_path; returns the parsed index or None."""
+        os.makedirs(self.work_dir, exist_ok=True)
+        if not self.backend.download(self._remote_index(), self.index_path):
+            return None
+        index = _load_json(self.index_path, None)
+        if not isinstance(index, dict) or not isinstance(index.get('files'), dict):
+            return None
+        index.setdefault('tombstones', {})
+        index.setdefault('chunk_refs', {})
+        index['generation'] = int(index.get('generation') or 0)
+        return index
+
+    def _chunk_store(self, index):
+        return chunk_store.ChunkStore(self.backend, self.remote_root, self.work_dir,
+                                      dict(index.get('chunk_refs') or {}), self.workers)
+
+    def _publish(self, index):
+        with open(self.index_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        return self.backend.makedirs(self.remote_root) and self.backend.upload(self.index_path, self._remote_index())
+
+    def _run(self, jobs):
+        results = transfer_jobs.run_jobs(self.backend, jobs, self.workers)
+        return {r.job.label: r.ok for r in results}
+
+    def push(self):
+        """
+        Upload added/changed files, tombstone deleted ones, publish the new index.
+        Returns True on success (index published or nothing changed), False if the caller should fall back to ZIP.
+        """
+        old = self.fetch_index() or _empty_index()
+        generation = old['generation'] + 1
+        store = self._chunk_store(old)
+        files = {}
+        changed = []
+        local = self.scan() if self.scan else iter_local_files(self.local_root, self.prune_dir)
+        for rel, abs_path, st in local:
+            prev = old['files'].get(rel)
+            entry = {'size': st.st_size, 'mtime': int(st.st_mtime)}
+            if prev and prev.get('size') == entry['size'] and prev.get('mtime') == entry['mtime']:
+                files[rel] = prev
+                self.stats['unchanged'] += 1
+                self.stats['bytes_skipped'] += entry['size']
+                continue
+            try:
+                entry['hash'] = sync_state.file_hash(abs_path)
+            except OSError as e:
+                # Unreadable right now (locked, vanished): keep the remote copy instead of tombstoning it
+                xbmc.log(f"{LOG_PREFIX} Skip {rel}: {e}", xbmc.LOGWARNING)
+                self.stats['failed'] += 1
+                if prev:
+                    files[rel] = prev
+                continue
+            if prev and prev.get('hash') == entry['hash']:
+                files[rel] = dict(prev, mtime=entry['mtime'])  # keeps the chunk list of a chunked file
+                self.stats['unchanged'] += 1
+                self.stats['bytes_skipped'] += entry['size']
+                continue
+            if self.chunked and entry['size'] >= chunk_store.CHUNK_THRESHOLD:
+                sent = store.stats['bytes']
+                entry['chunks'] = store.put_file(abs_path, generation)
+                if entry['chunks'] is None:
+                    self.stats['failed'] += 1
+                    if prev:
+                        files[rel] = prev
+                    continue
+                files[rel] = entry
+                self.stats['transferred'] += 1
+                self.stats['bytes'] += store.stats['bytes'] - sent
+                if prev and not prev.get('chunks'):
+                    self.backend.delete(self._remote_file(rel))  # whole-file copy is superseded
+                continue
+            changed.append((rel, abs_path, entry))
+
+        for d in sorted({self._remote_file(rel).rsplit('/', 1)[0] for rel, _, _ in changed}):
+            if not self.backend.makedirs(d):
+                return False
+        jobs = [transfer_jobs.TransferJob(transfer_jobs.UPLOAD, abs_path, self._remote_file(rel), label=rel)
+                for rel, abs_path, _ in changed]
+        ok = self._run(jobs)
+        for rel, _, entry in changed:
+            if ok.get(rel):
+                files[rel] = entry
+                self.stats['transferred'] += 1
+                self.stats['bytes'] += entry['size']
+            else:
+                self.stats['failed'] += 1
+                if rel in old['files']:
+                    files[rel] = old['files'][rel]  # remote still holds the previous version
+
+        tombstones = {rel: gen for rel, gen in old['tombstones'].items()
+                      if rel not in files and generation - int(gen) <= TOMBSTONE_GENERATIONS}
+        for rel, prev in old['files'].items():
+            if rel not in files:
+                tombstones[rel] = generation
+                if not prev.get('chunks'):
+                    self.backend.delete(self._remote_file(rel))  # chunks are left to collect_garbage()
+                self.stats['deleted'] += 1
+
+        if (files == old['files'] and tombstones == old['tombstones'] and store.refs == old['chunk_refs']
+                and old['generation']):
+            self._log('push', store)
+            return True
+        index = {'generation': generation, 'files': files, 'tombstones': tombstones, 'chunk_refs': store.refs}
+        published = self._publish(index)
+        self._log('push', store)
+        return published
+
+    def pull(self, index=None):
+        """
+        Download changed files and apply tombstones. Returns True on success,
+        False if no remote index exists (caller falls back to ZIP) or transfers failed.
+        """
+        index = index or self.fetch_index()
+        if index is None:
+            return False
+        applied_state = sync_state.SyncState(os.path.join(self.work_dir, 'delta_applied.json'))
+        store = self._chunk_store(index)
+        jobs = []
+        chunked = []
+        pending = {}
+        for rel, entry in index['files'].items():
+            if not _safe_rel(rel):
+                xbmc.log(f"{LOG_PREFIX} unsafe path in index skipped: {rel!r}", xbmc.LOGERROR)
+                self.stats['failed'] += 1
+                continue
+            local_path = os.path.join(self.local_root, *rel.split('/'))
+            applied = applied_state.get(self.state_key, rel)
+            try:
+                st = os.stat(local_path)
+            except OSError:
+                st = None
+            if st is not None and st.st_size == entry.get('size'):
+                current = {'size': st.st_size, 'mtime': int(st.st_mtime)}
+                if applied.get('hash') == entry.get('hash') and applied.get('mtime') == current['mtime']:
+                    self.stats['unchanged'] += 1
+                    self.stats['bytes_skipped'] += st.st_size
+                    continue
+                try:
+                    if sync_state.file_hash(local_path) == entry.get('hash'):
+                        applied_state.record(self.state_key, rel, dict(current, hash=entry['hash']))
+                        self.stats['unchanged'] += 1
+                        self.stats['bytes_skipped'] += st.st_size
+                        continue
+                except OSError:
+                    pass
+            os.makedirs(os.path.dirname(local_path), exist_ok=True)
+            pending[rel] = (local_path, entry)
+            if entry.get('chunks'):
+                chunked.append(rel)
+            else:
+                jobs.append(transfer_jobs.TransferJob(
+                    transfer_jobs.DOWNLOAD, local_path + '.delta', self._remote_file(rel), label=rel))
+
+        ok = self._run(jobs)
+        for job in jobs:
+            # Chunked files are checked by get_file(); a whole-file copy must match the index as well
+            rel = job.label
+            if ok.get(rel) and not self._matches(job.local_path, pending[rel][1].get('hash')):
+                xbmc.log(f"{LOG_PREFIX} hash mismatch for {rel}, not applied", xbmc.LOGERROR)
+                ok[rel] = False
+        for rel in chunked:
+            local_path, entry = pending[rel]
+            ok[rel] = store.get_file(entry['chunks'], local_path, local_path + '.delta', entry.get('hash'))
+        for rel, (local_path, entry) in pending.items():
+            tmp = local_path + '.delta'
+            if ok.get(rel):
+                os.replace(tmp, local_path)
+                st = os.stat(local_path)
+                applied_state.record(self.state_key, rel,
+                                     {'size': st.st_size, 'mtime': int(st.st_mtime), 'hash': entry.get('hash')})
+                self.stats['transferred'] += 1
+                self.stats['bytes'] += st.st_size
+            else:
+                self.stats['failed'] += 1
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+
+        for rel in index['tombstones']:
+            # Only delete what this device received through delta sync earlier
+            if rel in index['files'] or not _safe_rel(rel) or not applied_state.get(self.state_key, rel):
+                continue
+            local_path = os.path.join(self.local_root, *rel.split('/'))
+            try:
+                os.remove(local_path)
+                self.stats['deleted'] += 1
+            except OSError:
+                pass
+            applied_state.forget(self.state_key, rel)
+        applied_state.save()
+        self._log('pull', store)
+        return self.stats['failed'] == 0
+
+    @staticmethod
+    def _matches(path, expected_hash):
+        """True if the file at path has the SHA-256 expected_hash (an index entry without hash is not checked)."""
+        if not expected_hash:
+            return True
+        try:
+            return sync_state.file_hash(path) == expected_hash
+        except OSError:
+            return False
+
+    def collect_garbage(self, keep):
+        """
+        Remove remote chunks no current file uses and no file of the last `keep` generations referenced.
+        Republishes the index without a generation bump. Returns number of chunks removed, or None.
+        """
+        index = self.fetch_index()
+        if index is None:
+            return None
+        store = self._chunk_store(index)
+        live = {h for entry in index['files'].values() for h, _ in entry.get('chunks') or ()}
+        removed = store.collect_garbage(index['generation'], keep, live)
+        if removed:
+            index['chunk_refs'] = store.refs
+            if not self._publish(index):
+                return None
+        return removed
+
+    def _log(self, direction, store=None):
+        st = self.stats
+        xbmc.log(
+            f"{LOG_PREFIX} {direction}: {st['transferred']} transferred ({st['bytes']} bytes), "
+            f"{st['unchanged']} unchanged ({st['bytes_skipped']} bytes skipped), "
+            f"{st['deleted']} deleted, {st['failed']} failed", xbmc.LOGINFO)
+        if store and (store.stats['chunks_sent'] or store.stats['chunks_fetched'] or store.stats['chunks_reused']):
+            cs = store.stats
+            xbmc.log(
+                f"{LOG_PREFIX} chunks: {cs['chunks_sent']} sent, {cs['chunks_fetched']} fetched, "
+                f"{cs['chunks_reused']} reused ({cs['bytes_saved']} bytes not transferred)", xbmc.LOGINFO)
+
+
+def run_chunk_gc():
+    """Plugin entry: remove unused chunks of this device's delta tree on the active profile."""
+    from resources.lib import profiles
+    addon = xbmcaddon.Addon()
+    try:
+        keep = int(addon.getSettingString('chunk_gc_generations') or '5')
+    except (TypeError, ValueError):
+        keep = 5
+    profile = profiles.get_active_profile_settings()
+    backend = profiles.get_backend(profile)
+    remote_root = profiles.remote_path(profile, addon.getSettingString('custom_folder'), 'addon_data_files')
+    try:
+        engine = DeltaSync(backend, remote_root, '', sync_state.STATE_DIR,
+                           workers=transfer_jobs.get_worker_count(profile['connection_type']))
+        removed = engine.collect_garbage(keep)
+    finally:
+        backend.close()
+    if removed is None:
+        message = addon.getLocalizedString(30138)
+    else:
+        message = addon.getLocalizedString(30137).format(removed=removed)
+    xbmcgui.Dialog().ok(addon.getLocalizedString(30001), message)
@@ -49,7 +49,7 @@ def run_wizard():
     ADDON.setSettingBool('is_main_system', is_main)
 
     # Schritt 4: Verbindungstyp
-    conn_labels = [_l(30096), _l(30097), _l(30098)]  # FTP, SFTP, SMB
+    conn_labels = [_l(30096), _l(30097), _l(30098), _l(30159)]  # FTP, SFTP, SMB, WebDAV
     title = "%s: %s" % (step_fmt % (4, total), _l(30107))
     idx = d.select(title, conn_labels)
     if idx < 0:
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+Connection profiles (three slots in Settings → Connection) and remote path helpers.
+Shared by the service (auto_ftp_sync.py) and plugin actions, which cannot import the service script.
+
+active_profile = AUTO_PROFILE probes all configured profiles in parallel and uses the fastest reachable one.
+The RTT is the TCP connect time for every connection type; FTP login and the SFTP SSH banner are checked
+afterwards for reachability only, so profiles of different types compare fairly. Probe results
+(reachability, RTT) are cached in probe_cache.json for probe_cache_ttl seconds.
+"""
+import concurrent.futures
+import ftplib
+import json
+import os
+import socket
+import time
+
+import xbmc
+import xbmcaddon
+import xbmcvfs
+
+ADDON = xbmcaddon.Addon()
+CONNECTION_TYPES = ('ftp', 'sftp', 'smb', 'webdav')
+# active_profile value for "fastest reachable profile"
+AUTO_PROFILE = 3
+# Seconds a probe may take; seconds a probe result stays valid (setting probe_cache_ttl)
+PROBE_TIMEOUT = 5
+DEFAULT_PROBE_TTL = 300
+SMB_PORT = 445
+PROBE_CACHE_FILE = os.path.join(xbmcvfs.translatePath(ADDON.getAddonInfo('profile')), 'sync_state', 'probe_cache.json')
+LOG_PREFIX = "[AutoFTP]"
+# Setting prefixes per profile index; profile 1 uses the historic ftp_* ids
+_PROFILE_KEYS = (
+    {'connection_type': 'connection_type', 'host': 'ftp_host', 'user': 'ftp_user', 'password': 'ftp_pass',
+     'base_path': 'ftp_base_path', 'sftp_port': 'sftp_port'},
+    {'connection_type': 'profile_2_connection_type', 'host': 'profile_2_host', 'user': 'profile_2_user',
+     'password': 'profile_2_pass', 'base_path': 'profile_2_base_path', 'sftp_port': 'profile_2_sftp_port'},
+    {'connection_type': 'profile_3_connection_type', 'host': 'profile_3_host', 'user': 'profile_3_user',
+     'password': 'profile_3_pass', 'base_path': 'profile_3_base_path', 'sftp_port': 'profile_3_sftp_port'},
+)
+
+
+def _get_string(setting_id, default=''):
+    """Read a string setting; on error write the default back (repairs stored value)."""
+    try:
+        return ADDON.getSettingString(setting_id) or default
+    except (TypeError, Exception):
+        try:
+            ADDON.setSettingString(setting_id, default)
+        except Exception:
+            pass
+        return default
+
+
+def is_auto_mode():
+    """True if active_profile is set to the fastest reachable profile."""
+    return _get_string('active_profile', '0') == str(AUTO_PROFILE)
+
+
+def get_active_profile_index():
+    """Index of the profile to sync against; in auto mode the fastest reachable one (chosen once per run)."""
+    try:
+        idx = int(_get_string('active_profile', '0') or '0')
+    except (ValueError, TypeError):
+        idx = 0
+    if idx == AUTO_PROFILE:
+        return select_fastest_profile()
+    return idx if idx in (0, 1, 2) else 0
+
+
+def get_profile_settings(idx):
+    """
+    Settings of profile idx (0..2).
+    Returns: dict with index, connection_type, host, user, password, base_path, sftp_port
+    """
+    keys = _PROFILE_KEYS[idx]
+    try:
+        ct = int(_get_string(keys['connection_type'], '0') or '0')
+    except (ValueError, TypeError):
+        ct = 0
+    ct = CONNECTION_TYPES[ct] if 0 <= ct < len(CONNECTION_TYPES) else 'ftp'
+    return {
+        'index': idx,
+        'connection_type': ct,
+        'host': _get_string(keys['host'], ''),
+        'user': _get_string(keys['user'], ''),
+        'password': _get_string(keys['password'], ''),
+        'base_path': _get_string(keys['base_path'], ''),
+        'sftp_port': _get_string(keys['sftp_port'], '22'),
+    }
+
+
+def get_active_profile_settings():
+    return get_profile_settings(get_active_profile_index())
+
+
+def get_configured_profiles():
+    """Settings of all profiles that have a host set."""
+    return [p for p in (get_profile_settings(i) for i in range(len(_PROFILE_KEYS))) if p['host'].strip()]
+
+
+def remote_path(profile, *path_parts):
+    """Remote path below <base_path>/auto_fav_sync for profile; path_parts without leading slash."""
+    base = (profile.get('base_path') or '').strip().strip('/')
+    segs = [base, 'auto_fav_sync'] if base else ['auto_fav_sync']
+    segs.extend(str(p).strip('/') for p in path_parts if p)
+    return '/' + '/'.join(segs)
+
+
+def get_backend(profile, **kwargs):
+    """sync_backend instance for profile; kwargs are passed to sync_backend.get_backend."""
+    from resources.lib import sync_backend
+    return sync_backend.get_backend(
+        profile['connection_type'], profile['host'], profile['user'], profile['password'],
+        profile['base_path'] or '', profile['sftp_port'], **kwargs)
+
+
+def _probe(profile, timeout):
+    """Measure one profile; raises on failure, returns the RTT (TCP connect time) in seconds."""
+    from resources.lib import sync_backend
+    host, host_port = sync_backend.split_host_port(profile['host'])
+    ct = profile['connection_type']
+    if ct == 'webdav':
+        _, host, port, _ = sync_backend.parse_webdav_host(profile['host'])
+    elif ct == 'ftp':
+        port = host_port or ftplib.FTP_PORT
+    else:
+        port = host_port or (int(profile.get('sftp_port') or 22) if ct == 'sftp' else SMB_PORT)
+    start = time.monotonic()
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        rtt = time.monotonic() - start
+        if ct == 'sftp':
+            sock.settimeout(timeout)
+            if not sock.recv(64).startswith(b'SSH-'):
+                raise OSError("no SSH banner")
+    if ct == 'ftp':
+        # Reachability only: the login round trips are not part of the RTT
+        ftp = ftplib.FTP(timeout=timeout)
+        try:
+            ftp.connect(host, port)
+            ftp.login(profile['user'], profile['password'])
+        finally:
+            try:
+                ftp.quit()
+            except Exception:
+                ftp.close()
+    return rtt
+
+
+def probe_profile(profile, timeout=PROBE_TIMEOUT):
+    """Probe profile; returns {'ok', 'rtt', 'error', 'time'} (rtt in seconds, None if unreachable)."""
+    try:
+        rtt = _probe(profile, timeout)
+        return {'ok': True, 'rtt': round(rtt, 4), 'error': '', 'time': time.time()}
+    except (OSError, EOFError, ValueError, ftplib.Error) as e:
+        return {'ok': False, 'rtt': None, 'error': str(e) or type(e).__name__, 'time': time.time()}
+
+
+def _load_probe_cache():
+    try:
+        with open(PROBE_CACHE_FILE, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        return data if isinstance(data, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_probe_cache(data):
+    try:
+        os.makedirs(os.path.dirname(PROBE_CACHE_FILE), exist_ok=True)
+        tmp = PROBE_CACHE_FILE + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+        os.replace(tmp, PROBE_CACHE_FILE)
+    except OSError as e:
+        xbmc.log(f"{LOG_PREFIX} Probe cache not saved: {e}", xbmc.LOGERROR)
+
+
+def probe_profiles(timeout=PROBE_TIMEOUT, ttl=None, force=False):
+    """
+    Probe all configured profiles in parallel, reusing cached results younger than ttl seconds.
+    Returns: list of (profile, result) for profiles with a host set.
+    """
+    from resources.lib import sync_state
+    if ttl is None:
+        try:
+            ttl = int(_get_string('probe_cache_ttl', str(DEFAULT_PROBE_TTL)) or DEFAULT_PROBE_TTL)
+        except (ValueError, TypeError):
+            ttl = DEFAULT_PROBE_TTL
+    configured = get_configured_profiles()
+    cache = _load_probe_cache()
+    now = time.time()
+    results = {}
+    stale = []
+    for p in configured:
+        cached = cache.get(sync_state.profile_key(p))
+        if not force and isinstance(cached, dict) and 0 <= now - cached.get('time', 0) < ttl:
+            results[p['index']] = dict(cached, cached=True)
+        else:
+            stale.append(p)
+    if stale:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(stale)) as pool:
+            for p, result in zip(stale, pool.map(lambda prof: probe_profile(prof, timeout), stale)):
+                results[p['index']] = result
+                cache[sync_state.profile_key(p)] = result
+        _save_probe_cache(cache)
+    return [(p, results[p['index']]) for p in configured]
+
+
+_AUTO_CHOICE = None
+
+
+def select_fastest_profile(timeout=PROBE_TIMEOUT, ttl=None, force=False):
+    """
+    Index of the reachable profile with the lowest RTT (profile 1 if none is reachable).
+    The choice is kept for the rest of the process; force=True re-probes (e.g. before a retry).
+    """
+    global _AUTO_CHOICE
+    if _AUTO_CHOICE is not None and not force:
+        return _AUTO_CHOICE
+    probed = probe_profiles(timeout, ttl, force)
+    for p, r in probed:
+        state = f"{r['rtt'] * 1000:.0f} ms" if r['ok'] else f"unreachable ({r['error']})"
+        xbmc.log(f"{LOG_PREFIX} Probe profile {p['index'] + 1} {p['connection_type']}://{p['host']}: {state}"
+                 f"{' [cached]' if r.get('cached') else ''}", xbmc.LOGINFO)
+    reachable = sorted((r['rtt'], p['index']) for p, r in probed if r['ok'])
+    if reachable:
+        rtt, _AUTO_CHOICE = reachable[0]
+        others = len(reachable) - 1
+        xbmc.log(f"{LOG_PREFIX} Auto profile: profile {_AUTO_CHOICE + 1} selected (lowest RTT {rtt * 1000:.0f} ms, "
+                 f"{others} other reachable, {len(probed) - len(reachable)} unreachable)", xbmc.LOGINFO)
+    else:
+        _AUTO_CHOICE = 0
+        xbmc.log(f"{LOG_PREFIX} Auto profile: no profile reachable ({len(probed)} probed), using profile 1",
+                 xbmc.LOGWARNING)
+    return _AUTO_CHOICE
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Connection speed test (plugin action 'speed_test'): the same benchmark against every configured profile,
+so FTP/SFTP/SMB, servers and networks can be compared.
+Per profile: connect latency (PROBES probes, see profiles.probe_profile), small-file round trips (SMALL_FILES
+uploads + downloads of SMALL_SIZE bytes) and large-file upload/download throughput (setting speedtest_size_mb).
+Test objects live in auto_fav_sync/.speedtest_<random>/ and are removed afterwards.
+Results are appended to sync_state/speed_test.json (last HISTORY_SIZE runs) and compared with the previous run.
+A profile host may carry its own port (host:port) to benchmark local stand-in servers.
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+import uuid
+
+import xbmc
+import xbmcaddon
+import xbmcgui
+
+from resources.lib import profiles
+from resources.lib import sync_state
+
+ADDON = xbmcaddon.Addon()
+PROBES = 3
+SMALL_FILES = 10
+SMALL_SIZE = 4 * 1024
+DEFAULT_LARGE_MB = 8
+HISTORY_SIZE = 20
+HISTORY_FILE = os.path.join(sync_state.STATE_DIR, 'speed_test.json')
+WORK_DIR = os.path.join(sync_state.STATE_DIR, 'speed_test_tmp')
+LOG_PREFIX = "[SpeedTest]"
+
+
+def _setting_int(setting_id, default):
+    try:
+        return int(ADDON.getSettingString(setting_id) or default)
+    except (TypeError, ValueError):
+        return default
+
+
+def _write_random(path, size):
+    """Write size random bytes (incompressible, so compression on the wire cannot skew results); returns sha256."""
+    h = hashlib.sha256()
+    with open(path, 'wb') as f:
+        left = size
+        while left > 0:
+            block = os.urandom(min(left, 1024 * 1024))
+            f.write(block)
+            h.update(block)
+            left -= len(block)
+    return h.hexdigest()
+
+
+def _timed(func, *args):
+    start = time.monotonic()
+    ok = func(*args)
+    return ok, time.monotonic() - start
+
+
+def benchmark_profile(profile, large_size, work_dir=WORK_DIR, cancelled=None):
+    """
+    Benchmark one profile. cancelled: optional callable; the test stops early when it returns True.
+    Returns: dict with profile, key, type, host, time, ok and (if reachable) latency_ms, small_rtt_ms,
+    upload_mbps, download_mbps, size_mb; error on failure.
+    """
+    result = {'profile': profile['index'] + 1, 'key': sync_state.profile_key(profile),
+              'type': profile['connection_type'], 'host': profile['host'], 'time': time.time(), 'ok': False}
+    probes = [profiles.probe_profile(profile) for _ in range(PROBES)]
+    rtts = [p['rtt'] for p in probes if p['ok']]
+    if not rtts:
+        result['error'] = probes[-1]['error']
+        return result
+    result['latency_ms'] = {'min': round(min(rtts) * 1000, 1), 'avg': round(sum(rtts) / len(rtts) * 1000, 1)}
+
+    buffer_size = max(16, _setting_int('transfer_buffer_kb', 256)) * 1024
+    backend = profiles.get_backend(profile, buffer_size=buffer_size, resume_threshold=0, metadata_ttl=0)
+    remote_dir = profiles.remote_path(profile, f".speedtest_{uuid.uuid4().hex[:8]}")
+    created = []
+    os.makedirs(work_dir, exist_ok=True)
+    small, large, back = (os.path.join(work_dir, n) for n in ('small.bin', 'large.bin', 'back.bin'))
+    try:
+        if not backend.makedirs(remote_dir):
+            raise IOError("cannot create test directory")
+        _write_random(small, SMALL_SIZE)
+        start = time.monotonic()
+        for i in range(SMALL_FILES):
+            if cancelled and cancelled():
+                raise IOError("cancelled")
+            remote = f"{remote_dir}/small_{i}.bin"
+            created.append(remote)
+            if not (backend.upload(small, remote) and backend.download(remote, back)):
+                raise IOError("small-file transfer failed")
+        result['small_rtt_ms'] = round((time.monotonic() - start) / SMALL_FILES * 1000, 1)
+
+        digest = _write_random(large, large_size)
+        remote = f"{remote_dir}/large.bin"
+        created.append(remote)
+        ok, up = _timed(backend.upload, large, remote)
+        if not ok:
+            raise IOError("upload failed")
+        ok, down = _timed(backend.download, remote, back)
+        if not ok or sync_state.file_hash(back) != digest:
+            raise IOError("download failed or corrupted")
+        mb = large_size / (1024 * 1024)
+        result.update({'size_mb': round(mb, 1), 'upload_mbps': round(mb / max(up, 1e-6), 2),
+                       'download_mbps': round(mb / max(down, 1e-6), 2), 'ok': True})
+    except (OSError, IOError) as e:
+        result['error'] = str(e)
+    finally:
+        for remote in created:
+            backend.delete(remote)
+        backend.rmdir(remote_dir)
+        backend.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    xbmc.log(f"{LOG_PREFIX} {json.dumps(result)}", xbmc.LOGINFO)
+    return result
+
+
+def load_history():
+    try:
+        with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
+            runs = json.load(f).get('runs')
+        return runs if isinstance(runs, list) else []
+    except (OSError, ValueError, AttributeError):
+        return []
+
+
+def save_run(results):
+    """Append a run to the history (keeps the last HISTORY_SIZE runs)."""
+    runs = (load_history() + [{'time': time.time(), 'results': results}])[-HISTORY_SIZE:]
+    try:
+        os.makedirs(os.path.dirname(HISTORY_FILE), exist_ok=True)
+        tmp = HISTORY_FILE + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'runs': runs}, f, indent=1)
+        os.replace(tmp, HISTORY_FILE)
+    except OSError as e:
+        xbmc.log(f"{LOG_PREFIX} History not saved: {e}", xbmc.LOGERROR)
+
+
+def _previous(history, key):
+    """Latest successful earlier result for a profile key, or None."""
+    for run in reversed(history):
+        for r in run.get('results', []):
+            if r.get('key') == key and r.get('ok'):
+                return r
+    return None
+
+
+def format_report(results, history):
+    _l = ADDON.getLocalizedString
+    lines = []
+    for r in results:
+        lines.append(f"[B]{_l(30151).format(n=r['profile'], type=r['type'], host=r['host'])}[/B]")
+        if 'latency_ms' in r:
+            lines.append(_l(30152).format(min=r['latency_ms']['min'], avg=r['latency_ms']['avg']))
+        if 'small_rtt_ms' in r:
+            lines.append(_l(30153).format(count=SMALL_FILES, size=SMALL_SIZE // 1024, rtt=r['small_rtt_ms']))
+        if r['ok']:
+            lines.append(_l(30154).format(up=r['upload_mbps'], down=r['download_mbps'], size=r['size_mb']))
+        else:
+            lines.append(_l(30156).format(err=r.get('error', '')))
+        prev = _previous(history, r['key'])
+        if prev:
+            lines.append(_l(30155).format(
+                date=time.strftime('%Y-%m-%d %H:%M', time.localtime(prev['time'])), lat=prev['latency_ms']['avg'],
+                up=prev['upload_mbps'], down=prev['download_mbps']))
+        lines.append('')
+    return '\n'.join(lines)
+
+
+def run_speed_test():
+    """Plugin entry: benchmark all configured profiles, show the report and store the results."""
+    dialog = xbmcgui.Dialog()
+    configured = profiles.get_configured_profiles()
+    if not configured:
+        dialog.ok(ADDON.getLocalizedString(30001), ADDON.getLocalizedString(30157))
+        return
+    large_size = max(1, _setting_int('speedtest_size_mb', DEFAULT_LARGE_MB)) * 1024 * 1024
+    progress = xbmcgui.DialogProgress()
+    progress.create(ADDON.getLocalizedString(30149))
+    results = []
+    try:
+        for i, profile in enumerate(configured):
+            if progress.iscanceled():
+                break
+            progress.update(int(i * 100 / len(configured)),
+                            ADDON.getLocalizedString(30150).format(n=profile['index'] + 1, host=profile['host']))
+            results.append(benchmark_profile(profile, large_size, cancelled=progress.iscanceled))
+    finally:
+        progress.close()
+    if not results:
+        return
+    history = load_history()
+    save_run(results)
+    dialog.textviewer(ADDON.getLocalizedString(30149), format_report(results, history))
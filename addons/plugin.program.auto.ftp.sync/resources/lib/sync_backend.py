@@ -1,179 +1,1652 @@
 # -*- coding: utf-8 -*-
 """
-Sync backends: FTP, SFTP (via xbmcvfs if vfs.sftp present), SMB (via xbmcvfs).
-Each backend provides: upload(local_path, remote_path), download(remote_path, local_path), folder_exists(remote_path).
+Sync backends: FTP, SFTP (via xbmcvfs if vfs.sftp present), SMB (via xbmcvfs), WebDAV (http.client).
+Each backend provides: upload(local_path, remote_path), upload_stream(stream, remote_path), download(remote_path, local_path),
+download_stream(remote_path, write), folder_exists(remote_path), makedirs(remote_dir), delete(remote_path), rmdir(remote_dir),
+list_dir(remote_dir), stat(remote_path), close() (end of a sync run; releases pooled connections).
+Transfers accept progress=callable(done, total).
+upload_stream reads a one-shot stream (stream.read(n), b'' at EOF) of unknown size; download_stream hands the remote file
+to write(bytes) chunk by chunk. Neither can be replayed, so they are not retried.
+Transfers are streamed in fixed-size chunks (buffer_size), so memory use does not grow with the file size.
+Directory listings are cached with a TTL (RemoteMetadataCache); folder_exists/stat read from it and writes through
+the same backend invalidate the affected directory.
+Network latency is bounded: connect/read timeouts on every connection, transient errors retried with exponential
+backoff and jitter (retry_call), and an optional Deadline that stops retrying once a run's time budget is spent.
 """
+import base64
+import calendar
+import contextlib
+import email.utils
 import ftplib
-from urllib.parse import quote
+import hashlib
+import http.client
+import io
+import json
+import os
+import random
+import re
+import socket
+import threading
+import time
+import xml.etree.ElementTree as ElementTree
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote, unquote, urlsplit
 import xbmc
 import xbmcvfs
 
 
+class TransferError(IOError):
+    """A transfer came out short or a VFS read/write failed; retried like a dropped connection."""
+
+
+# Idle pooled FTP sessions older than this (seconds) are probed with NOOP before reuse
+FTP_KEEPALIVE_INTERVAL = 30
+# Errors that mean a pooled control connection went stale (server timeout, dropped TCP, 421).
+# Only socket errors: a local file error says nothing about the session.
+FTP_STALE_ERRORS = (ConnectionError, socket.timeout, EOFError, ftplib.error_temp, ftplib.error_reply)
+# Chunk size for streamed transfers (bytes); overridden by setting transfer_buffer_kb
+DEFAULT_BUFFER_SIZE = 256 * 1024
+# FTP transfers of at least this size resume after interruptions (0 = off); setting resume_threshold_mb
+DEFAULT_RESUME_THRESHOLD = 8 * 1024 * 1024
+# FTP files of at least segment_threshold bytes are transferred in `segments` parallel byte ranges (1 = off);
+# settings segmented_transfers, segment_count, segment_threshold_mb
+DEFAULT_SEGMENTS = 1
+DEFAULT_SEGMENT_THRESHOLD = 32 * 1024 * 1024
+# Part manifest stored next to a segmented upload: {'size', 'mdtm', 'segments': [[offset, length, sha256], ...]}
+SEGMENT_MANIFEST_SUFFIX = '.segments.json'
+# Server-side checksum commands (FEAT) used to verify a segmented upload, in order of preference:
+# (command, local digest, hex digits of the answer)
+SERVER_HASH_COMMANDS = (('HASH', 'sha256', 64), ('XSHA256', 'sha256', 64), ('XCRC', 'crc32', 8))
+# Bytes hashed from head and tail of a file for the upload checkpoint fingerprint
+FINGERPRINT_SAMPLE = 1024 * 1024
+# Seconds a remote directory listing stays valid (0 = no caching); setting metadata_cache_ttl
+DEFAULT_METADATA_TTL = 60
+# Seconds to establish a connection / to wait for data on an open one; settings connect_timeout_s, read_timeout_s
+DEFAULT_CONNECT_TIMEOUT = 10
+DEFAULT_READ_TIMEOUT = 30
+# Retries of transient errors after the first attempt; setting transfer_retries
+DEFAULT_RETRIES = 3
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+# Errors worth retrying: network failures, 4xx answers and short transfers. 5xx answers (error_perm) and
+# local file errors are final.
+TRANSIENT_ERRORS = FTP_STALE_ERRORS + (socket.gaierror, TransferError)
+
+
 def _norm_ftp_path(path):
     """Ensure path starts with / for FTP."""
     path = path.replace('\\', '/')
     return path if path.startswith('/') else '/' + path
 
 
+def _file_fingerprint(path):
+    """Cheap identity of a local file: size + SHA-1 over head and tail (a ZIP's central directory lives in the tail)."""
+    size = os.path.getsize(path)
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        h.update(f.read(FINGERPRINT_SAMPLE))
+        if size > FINGERPRINT_SAMPLE:
+            f.seek(max(FINGERPRINT_SAMPLE, size - FINGERPRINT_SAMPLE))
+            h.update(f.read(FINGERPRINT_SAMPLE))
+    return f"{size}:{h.hexdigest()}"
+
+
+def _read_checkpoint(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_checkpoint(path, data):
+    try:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+    except OSError as e:
+        xbmc.log(f"[AutoFTP] Checkpoint not written ({path}): {e}", xbmc.LOGWARNING)
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def split_ranges(start, size, parts):
+    """Split size bytes from start into at most `parts` contiguous (offset, length) ranges."""
+    if size <= 0:
+        return []
+    step = -(-size // max(1, parts))
+    return [(start + offset, min(step, size - offset)) for offset in range(0, size, step)]
+
+
+def split_host_port(host, default_port=0):
+    """'host', 'host:port' or '[ipv6]:port' -> (host, port); default_port if no port is given."""
+    host = (host or '').strip()
+    if host.startswith('['):
+        addr, _, rest = host[1:].partition(']')
+        return addr, int(rest[1:]) if rest[1:].isdigit() else default_port
+    addr, sep, port = host.rpartition(':')
+    if sep and port.isdigit() and ':' not in addr:
+        return addr, int(port)
+    return host, default_port
+
+
+class Deadline:
+    """Time budget of a sync run; seconds=None or 0 means unlimited."""
+    def __init__(self, seconds=None):
+        self.end = time.monotonic() + seconds if seconds else None
+
+    def remaining(self):
+        return None if self.end is None else max(0.0, self.end - time.monotonic())
+
+    def expired(self):
+        return self.end is not None and time.monotonic() >= self.end
+
+    def cap(self, timeout, floor=1.0):
+        """timeout limited to the remaining budget (at least floor, so a last attempt can still fail cleanly)."""
+        remaining = self.remaining()
+        return timeout if remaining is None else max(floor, min(timeout, remaining))
+
+
+def backoff_delay(attempt, base=RETRY_BASE_DELAY, cap=RETRY_MAX_DELAY):
+    """Exponential backoff with full jitter: uniform in [0, min(cap, base * 2**attempt)]."""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _wait(seconds):
+    """Sleep, but return early (True) when Kodi is shutting down."""
+    return xbmc.Monitor().waitForAbort(seconds)
+
+
+def retry_call(func, retries=DEFAULT_RETRIES, deadline=None, transient=TRANSIENT_ERRORS, label=''):
+    """
+    Call func() and retry transient errors up to `retries` times with backoff_delay() pauses.
+    Gives up early (re-raising the last error) when the deadline would be exceeded or Kodi aborts.
+    """
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except transient as e:
+            if attempt >= retries:
+                raise
+            delay = backoff_delay(attempt)
+            remaining = deadline.remaining() if deadline else None
+            if remaining is not None and delay >= remaining:
+                raise
+            xbmc.log(f"[AutoFTP] {label or 'Remote call'} failed ({e}), retry {attempt + 1}/{retries} "
+                     f"in {delay:.1f}s", xbmc.LOGDEBUG)
+            if _wait(delay):
+                raise
+            attempt += 1
+
+
+def _run_with_timeout(func, timeout, *args):
+    """
+    Run a blocking call (xbmcvfs has no timeouts) on a daemon thread; raise TimeoutError if it does not
+    return within timeout seconds. The stuck call is abandoned, not cancelled.
+    """
+    result = {}
+
+    def target():
+        try:
+            result['value'] = func(*args)
+        except Exception as e:
+            result['error'] = e
+    worker = threading.Thread(target=target, daemon=True)
+    worker.start()
+    worker.join(timeout)
+    if worker.is_alive():
+        raise TimeoutError(f"no answer within {timeout:.0f}s")
+    if 'error' in result:
+        raise result['error']
+    return result['value']
+
+
+def _parent(path):
+    path = path.rstrip('/')
+    return path.rsplit('/', 1)[0] or '/'
+
+
+def _parse_mdtm(value):
+    """MLSD modify fact / MDTM reply (YYYYMMDDHHMMSS[.sss], UTC) -> epoch seconds or None."""
+    try:
+        return calendar.timegm(time.strptime(value[:14], '%Y%m%d%H%M%S'))
+    except (TypeError, ValueError):
+        return None
+
+
+class RemoteMetadataCache:
+    """
+    TTL cache of remote directory listings: {dir: {name: {'type': 'dir'|'file'|None, 'size', 'mtime'}}}.
+    A missing directory is cached as None. Shared by all worker threads of one backend.
+    """
+    def __init__(self, ttl=DEFAULT_METADATA_TTL):
+        self.ttl = max(0, ttl or 0)
+        self._lock = threading.Lock()
+        self._dirs = {}
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def listing(self, path, load):
+        """Cached listing of path; load() -> dict or None is called on a miss."""
+        path = path.rstrip('/') or '/'
+        now = time.monotonic()
+        with self._lock:
+            cached = self._dirs.get(path)
+            if cached and cached[0] > now:
+                self.stats['hits'] += 1
+                return cached[1]
+            self.stats['misses'] += 1
+        entries = load()
+        if self.ttl:
+            with self._lock:
+                self._dirs[path] = (now + self.ttl, entries)
+        return entries
+
+    def invalidate(self, path):
+        """Forget path and its parent directory listing (called after writes)."""
+        path = path.rstrip('/') or '/'
+        with self._lock:
+            self._dirs.pop(path, None)
+            self._dirs.pop(_parent(path), None)
+
+    def clear(self):
+        with self._lock:
+            self._dirs.clear()
+
+
+def copy_stream(read, write, buffer_size=DEFAULT_BUFFER_SIZE, progress=None, total=None):
+    """
+    Copy data in fixed-size chunks: read(n) -> bytes (empty at EOF), write(bytes).
+    Works with local files (f.read / f.write) and xbmcvfs.File (readBytes / write) alike.
+    progress: optional callable(done_bytes, total_bytes_or_None), called after every chunk.
+    Returns number of bytes copied.
+    """
+    done = 0
+    while True:
+        chunk = read(buffer_size)
+        if not chunk:
+            break
+        if write(chunk) is False:
+            raise TransferError("write failed")
+        done += len(chunk)
+        if progress:
+            progress(done, total)
+    return done
+
+
+def upload_to_vfs(local_path, url, buffer_size=DEFAULT_BUFFER_SIZE, progress=None):
+    """Stream a local file to an xbmcvfs URL (smb://, sftp://, nfs://, ...)."""
+    total = os.path.getsize(local_path)
+    with open(local_path, 'rb') as src:
+        dst = xbmcvfs.File(url, 'wb')
+        try:
+            return copy_stream(src.read, dst.write, buffer_size, progress, total)
+        finally:
+            dst.close()
+
+
+def download_from_vfs(url, local_path, buffer_size=DEFAULT_BUFFER_SIZE, progress=None):
+    """Stream an xbmcvfs URL to <local_path>.part and move it into place when complete (a failure keeps the old file)."""
+    part = local_path + '.part'
+    src = xbmcvfs.File(url, 'rb')
+    try:
+        total = src.size() or None
+        with open(part, 'wb') as dst:
+            done = copy_stream(src.readBytes, dst.write, buffer_size, progress, total)
+        if total is not None and done != total:
+            # xbmcvfs signals a failed read as EOF
+            raise TransferError(f"read {done} of {total} bytes")
+        os.replace(part, local_path)
+        return done
+    except BaseException:
+        _remove_quietly(part)
+        raise
+    finally:
+        src.close()
+
+
+class FTPSessionPool:
+    """
+    Keeps authenticated FTP control connections alive for one sync run (thread-safe).
+    Sessions idle longer than keepalive are probed with NOOP before reuse; dead ones are replaced.
+    stats: connections (TCP+login handshakes), reused, reconnects, handshake_time (seconds).
+    New connections use connect_timeout (capped by deadline); established ones read_timeout.
+    """
+    def __init__(self, host, user, password, keepalive=FTP_KEEPALIVE_INTERVAL,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT, deadline=None):
+        self.host = host
+        self.user = user
+        self.password = password
+        self.keepalive = keepalive
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.deadline = deadline
+        self._idle = []  # (ftp, last_used)
+        self._lock = threading.Lock()
+        self.stats = {'connections': 0, 'reused': 0, 'reconnects': 0, 'handshake_time': 0.0}
+
+    def _connect(self):
+        start = time.monotonic()
+        timeout = self.deadline.cap(self.connect_timeout) if self.deadline else self.connect_timeout
+        ftp = ftplib.FTP(timeout=timeout)
+        try:
+            ftp.connect(*split_host_port(self.host))  # port 0 = ftplib default (21)
+            ftp.login(self.user, self.password)
+            # Control and data connections of this session wait at most read_timeout for the server
+            ftp.timeout = self.read_timeout
+            ftp.sock.settimeout(self.read_timeout)
+        except OSError as e:
+            self._quit(ftp)
+            if isinstance(e, FTP_STALE_ERRORS):
+                raise
+            # Unreachable network or host, failed name lookup: retried like a refused connection
+            raise ConnectionError(f"cannot connect to {self.host}: {e}") from e
+        except Exception:
+            self._quit(ftp)
+            raise
+        with self._lock:
+            self.stats['connections'] += 1
+            self.stats['handshake_time'] += time.monotonic() - start
+        return ftp
+
+    @staticmethod
+    def _quit(ftp):
+        try:
+            ftp.quit()
+        except Exception:
+            ftp.close()
+
+    @staticmethod
+    def _alive(ftp):
+        try:
+            ftp.voidcmd('NOOP')
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        """Return (ftp, reused): an idle session that still answers, or a new one."""
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                ftp, last_used = self._idle.pop()
+            if time.monotonic() - last_used < self.keepalive or self._alive(ftp):
+                with self._lock:
+                    self.stats['reused'] += 1
+                return ftp, True
+            self._quit(ftp)
+        return self._connect(), False
+
+    def release(self, ftp):
+        with self._lock:
+            self._idle.append((ftp, time.monotonic()))
+
+    @contextlib.contextmanager
+    def session(self):
+        """Yield (ftp, reused). The session goes back to the pool unless the connection failed."""
+        ftp, reused = self.acquire()
+        try:
+            yield ftp, reused
+        except (ftplib.error_perm, FileNotFoundError, PermissionError, IsADirectoryError):
+            # Server answered with 5xx or a local file could not be opened: control connection is still healthy
+            self.release(ftp)
+            raise
+        except BaseException:
+            self._quit(ftp)
+            raise
+        self.release(ftp)
+
+    def close(self):
+        """Quit all idle sessions; returns stats."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for ftp, _ in idle:
+            self._quit(ftp)
+        return dict(self.stats)
+
+
 class FTPBackend:
-    """FTP backend using ftplib."""
-    def __init__(self, host, user, password, base_path):
+    """
+    FTP backend using ftplib; control connections are pooled for the whole sync run (see close()).
+    Files >= resume_threshold are transferred resumably: uploads go to <remote>.part (continued with APPE,
+    renamed when complete), downloads to <local>.part (continued with REST); <local>.upload.json /
+    <local>.part.json hold the checkpoint so an interrupted transfer continues on the next run.
+    Transient errors are retried up to `retries` times with backoff (resumable transfers continue where they stopped).
+    Files >= segment_threshold are moved over `segments` parallel sessions: downloads RETR byte ranges with REST
+    into <local>.seg; uploads write ranges with REST + STOR into <remote>.part, check SIZE and, if FEAT offers one,
+    a server-side checksum (HASH / XSHA256 / XCRC) of the whole file, rename and store a part manifest
+    (<remote>.segments.json, per-range SHA-256) that downloads verify against. Without a server checksum every range
+    is read back and compared only if segment_readback is set. Servers that cannot store at offsets fall back to a
+    single stream.
+    """
+    def __init__(self, host, user, password, base_path, buffer_size=DEFAULT_BUFFER_SIZE,
+                 resume_threshold=DEFAULT_RESUME_THRESHOLD, metadata_ttl=DEFAULT_METADATA_TTL,
+                 connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                 retries=DEFAULT_RETRIES, deadline=None, segments=DEFAULT_SEGMENTS,
+                 segment_threshold=DEFAULT_SEGMENT_THRESHOLD, segment_readback=False):
         self.host = host
         self.user = user
         self.password = password
         self.base_path = _norm_ftp_path(base_path.rstrip('/'))
+        self.buffer_size = buffer_size
+        self.resume_threshold = resume_threshold
+        self.retries = retries
+        self.deadline = deadline
+        self._pool = FTPSessionPool(host, user, password, connect_timeout=connect_timeout,
+                                    read_timeout=read_timeout, deadline=deadline)
+        self._dirs_made = set()
+        self.cache = RemoteMetadataCache(metadata_ttl)
+        self._mlsd = True  # cleared when the server rejects MLSD
+        self.segments = max(1, int(segments or 1))
+        self.segment_threshold = max(0, segment_threshold or 0)
+        self._rest_stor = True  # cleared when the server cannot STOR at an offset
+        self.segment_readback = segment_readback
+        self._hash_command = None  # SERVER_HASH_COMMANDS entry from FEAT, () if none; None = not asked yet
 
     def _remote(self, path):
         p = path.replace('\\', '/')
         return p if p.startswith('/') else self.base_path + '/' + p.lstrip('/')
 
-    def upload(self, local_path, remote_path):
+    def _call(self, op):
+        """
+        Run op(ftp) on a pooled session. A reused session that turns out stale is replaced once right away;
+        further transient errors (timeouts, refused connections, 4xx) are retried via retry_call.
+        """
+        state = {'stale_retry': True}
+
+        def attempt():
+            reused = False
+            try:
+                with self._pool.session() as (ftp, reused):
+                    return op(ftp)
+            except FTP_STALE_ERRORS as e:
+                if not (reused and state['stale_retry']):
+                    raise
+                state['stale_retry'] = False
+                xbmc.log(f"[AutoFTP] FTP session lost ({e}), reconnecting", xbmc.LOGDEBUG)
+                self._pool.stats['reconnects'] += 1
+                with self._pool.session() as (ftp, _):
+                    return op(ftp)
+        return retry_call(attempt, self.retries, self.deadline, label=f"FTP {self.host}")
+
+    def _resumable(self, size):
+        return bool(self.resume_threshold) and size is not None and size >= self.resume_threshold
+
+    @staticmethod
+    def _size(ftp, remote):
+        """Remote file size or None (missing file / SIZE unsupported)."""
+        try:
+            ftp.voidcmd('TYPE I')
+            return ftp.size(remote)
+        except ftplib.error_perm:
+            return None
+
+    @staticmethod
+    def _mdtm(ftp, remote):
+        try:
+            return ftp.sendcmd('MDTM ' + remote)[4:].strip()
+        except ftplib.error_perm:
+            return ''
+
+    def _stor(self, ftp, local_path, remote, progress, offset=0, total=None):
+        done = [offset]
+
+        def callback(buf):
+            done[0] += len(buf)
+            progress(done[0], total)
+        with open(local_path, 'rb') as f:
+            if offset:
+                f.seek(offset)
+                ftp.storbinary('APPE ' + remote, f, self.buffer_size, callback if progress else None)
+            else:
+                ftp.storbinary('STOR ' + remote, f, self.buffer_size, callback if progress else None)
+
+    def _retr(self, ftp, remote, local_path, progress, offset=0, total=None):
+        done = [offset]
+        with open(local_path, 'ab' if offset else 'wb') as f:
+            def callback(buf):
+                f.write(buf)
+                if progress:
+                    done[0] += len(buf)
+                    progress(done[0], total)
+            ftp.retrbinary('RETR ' + remote, callback, self.buffer_size, rest=offset or None)
+
+    def _upload_resumable(self, ftp, local_path, remote, total, progress):
+        part = remote + '.part'
+        checkpoint_path = local_path + '.upload.json'
+        fingerprint = _file_fingerprint(local_path)
+        checkpoint = _read_checkpoint(checkpoint_path)
+        offset = 0
+        if checkpoint.get('remote') == remote and checkpoint.get('fingerprint') == fingerprint:
+            offset = self._size(ftp, part) or 0
+            if offset > total:
+                offset = 0
+        else:
+            _write_checkpoint(checkpoint_path, {'remote': remote, 'fingerprint': fingerprint})
+        if offset:
+            xbmc.log(f"[AutoFTP] Resuming upload of {remote} at {offset} / {total} bytes", xbmc.LOGINFO)
+        if offset < total or total == 0:
+            self._stor(ftp, local_path, part, progress, offset, total)
+        remote_size = self._size(ftp, part)
+        if remote_size is not None and remote_size != total:
+            raise TransferError(f"size mismatch after upload ({remote_size} != {total})")
+        self._replace(ftp, part, remote)
+        _remove_quietly(checkpoint_path)
+
+    @staticmethod
+    def _replace(ftp, source, target):
+        try:
+            ftp.rename(source, target)
+        except ftplib.error_perm:
+            # Some servers refuse to rename onto an existing file
+            ftp.delete(target)
+            ftp.rename(source, target)
+
+    def _segment_ranges(self, size):
+        """Byte ranges for a segmented transfer of size bytes, or None if the file is transferred in one stream."""
+        if self.segments < 2 or size is None or size < max(self.segment_threshold, self.segments):
+            return None
+        return split_ranges(0, size, self.segments)
+
+    @staticmethod
+    def _segment_progress(progress, total):
+        """advance(n) callable that sums the bytes of all segments for progress(done, total)."""
+        lock = threading.Lock()
+        done = [0]
+
+        def advance(n):
+            if progress:
+                with lock:
+                    done[0] += n
+                    progress(done[0], total)
+        return advance
+
+    def _run_segments(self, ranges, func, advance):
+        """Run func(ftp, offset, length, advance) per range, each on its own pooled session; results in order."""
+        with ThreadPoolExecutor(max_workers=len(ranges)) as pool:
+            futures = [pool.submit(self._call, lambda ftp, o=o, n=n: func(ftp, o, n, advance)) for o, n in ranges]
+            return [f.result() for f in futures]
+
+    def _stor_range(self, ftp, local_path, remote, offset, length, advance):
+        """Write length bytes of local_path at offset into remote (REST + STOR; offset 0 creates/truncates)."""
+        h = hashlib.sha256()
+        ftp.voidcmd('TYPE I')
+        with open(local_path, 'rb') as f:
+            f.seek(offset)
+            with ftp.transfercmd('STOR ' + remote, rest=offset or None) as conn:
+                left = length
+                while left:
+                    chunk = f.read(min(self.buffer_size, left))
+                    if not chunk:
+                        raise IOError("local file shrank during upload")
+                    conn.sendall(chunk)
+                    h.update(chunk)
+                    left -= len(chunk)
+                    advance(len(chunk))
+        ftp.voidresp()
+        return h.hexdigest()
+
+    def _recv_range(self, ftp, remote, offset, length, write, advance):
+        """Pass length bytes of remote from offset (REST + RETR) to write(chunk); returns their SHA-256."""
+        h = hashlib.sha256()
+        ftp.voidcmd('TYPE I')
+        with ftp.transfercmd('RETR ' + remote, rest=offset or None) as conn:
+            left = length
+            while left:
+                chunk = conn.recv(min(self.buffer_size, left))
+                if not chunk:
+                    raise EOFError(f"{remote} ended at {offset + length - left}")
+                write(chunk)
+                h.update(chunk)
+                left -= len(chunk)
+                advance(len(chunk))
+        try:
+            ftp.voidresp()
+        except (ftplib.error_temp, ftplib.error_perm):
+            pass  # data connection closed before the end of the file: 426/451 instead of 226
+        return h.hexdigest()
+
+    def _retr_range(self, ftp, remote, local_path, offset, length, advance):
+        """Read length bytes of remote from offset (REST + RETR) into local_path at the same offset."""
+        with open(local_path, 'r+b') as f:
+            f.seek(offset)
+            return self._recv_range(ftp, remote, offset, length, f.write, advance)
+
+    def _hash_range(self, ftp, remote, offset, length, advance):
+        """SHA-256 of length bytes of remote from offset, read back without storing them."""
+        return self._recv_range(ftp, remote, offset, length, lambda chunk: None, advance)
+
+    def _server_hash(self):
+        """SERVER_HASH_COMMANDS entry the server advertises in FEAT (asked once per backend), or None."""
+        if self._hash_command is None:
+            try:
+                features = {line.strip().split(' ', 1)[0].upper()
+                            for line in self._call(lambda ftp: ftp.sendcmd('FEAT')).splitlines()[1:-1]}
+            except ftplib.error_perm:
+                features = set()
+            self._hash_command = next((c for c in SERVER_HASH_COMMANDS if c[0] in features), ())
+        return self._hash_command or None
+
+    def _verify_on_server(self, local_path, remote):
+        """
+        Compare a server-side checksum of remote with the local file. Returns True/False, or None if the
+        server offers no checksum command (or refuses it for this file).
+        """
+        command = self._server_hash()
+        if not command:
+            return None
+        cmd, digest, digits = command
+
+        def ask(ftp):
+            if cmd == 'HASH':
+                try:
+                    ftp.sendcmd('OPTS HASH SHA-256')
+                except ftplib.error_perm:
+                    pass
+            return ftp.sendcmd(f'{cmd} {remote}')
+        try:
+            reply = self._call(ask)
+        except ftplib.error_perm as e:
+            xbmc.log(f"[AutoFTP] {cmd} not available for {remote} ({e})", xbmc.LOGDEBUG)
+            return None
+        found = [t for t in reply[4:].split() if re.fullmatch(f'[0-9A-Fa-f]{{{digits}}}', t)]
+        if not found:
+            return None
+        h = hashlib.sha256() if digest == 'sha256' else None
+        crc = 0
+        with open(local_path, 'rb') as f:
+            while True:
+                chunk = f.read(self.buffer_size)
+                if not chunk:
+                    break
+                if h:
+                    h.update(chunk)
+                else:
+                    crc = zlib.crc32(chunk, crc)
+        local = h.hexdigest() if h else f'{crc:08x}'
+        return found[0].lower() == local
+
+    def _upload_segmented(self, local_path, remote, total, progress):
+        """
+        Upload a large file over parallel sessions. The first buffer_size bytes are stored alone (creating the
+        .part object), the rest in parallel ranges at their offsets. Before the .part is published its SIZE is
+        checked and, if the server offers HASH/XSHA256/XCRC, its checksum compared with the local file: a server
+        that accepts REST but appends or truncates can still end up with the right size. Without a server
+        checksum every range is read back (REST + RETR) and compared only if segment_readback is set (it doubles
+        the traffic); otherwise downloads catch a bad copy through the part manifest. Returns False if the server
+        does not support REST for STOR or the content does not match (nothing published; the caller uploads in
+        one stream).
+        """
+        part = remote + '.part'
+        head = min(self.buffer_size, total)
+        ranges = [(0, head)] + split_ranges(head, total - head, self.segments)
+
+        def store(ftp, offset, length, advance):
+            return self._stor_range(ftp, local_path, part, offset, length, advance)
+        advance = self._segment_progress(progress, total)
+        try:
+            hashes = self._run_segments(ranges[:1], store, advance)
+            hashes += self._run_segments(ranges[1:], store, advance)
+            remote_size = self._call(lambda ftp: self._size(ftp, part))
+            if remote_size != total:
+                raise ftplib.error_perm(f"size {remote_size} != {total}")
+            verified = self._verify_on_server(local_path, part)
+            if verified is None and self.segment_readback:
+                stored = self._run_segments(
+                    ranges, lambda ftp, o, n, _: self._hash_range(ftp, part, o, n, lambda size: None), None)
+                verified = stored == hashes
+            if verified is False:
+                raise ftplib.error_perm("stored content differs from the uploaded file")
+        except ftplib.error_perm as e:
+            self._rest_stor = False
+            xbmc.log(f"[AutoFTP] Segmented upload not supported by server ({e}), using one stream", xbmc.LOGWARNING)
+            try:
+                self._call(lambda ftp: ftp.delete(part))
+            except Exception:
+                pass
+            return False
+        self._call(lambda ftp: self._replace(ftp, part, remote))
+        manifest = {'size': total, 'mdtm': self._call(lambda ftp: self._mdtm(ftp, remote)),
+                    'segments': [[o, n, h] for (o, n), h in zip(ranges, hashes)]}
+        data = json.dumps(manifest).encode('utf-8')
+        self._call(lambda ftp: ftp.storbinary('STOR ' + remote + SEGMENT_MANIFEST_SUFFIX, io.BytesIO(data)))
+        xbmc.log(f"[AutoFTP] Uploaded {remote} in {len(ranges)} segments", xbmc.LOGDEBUG)
+        return True
+
+    def _segment_manifest(self, remote, total):
+        """[(offset, length, sha256)] from the part manifest of remote if it describes the current file, else None."""
+        name = remote + SEGMENT_MANIFEST_SUFFIX
+        entries = self.list_dir(_parent(remote))
+        if not entries or name.rsplit('/', 1)[-1] not in entries:
+            return None
+        buf = io.BytesIO()
+        try:
+            self._call(lambda ftp: ftp.retrbinary('RETR ' + name, buf.write))
+            manifest = json.loads(buf.getvalue().decode('utf-8'))
+            segments = [(int(o), int(n), str(h)) for o, n, h in manifest['segments']]
+        except (ftplib.error_perm, ValueError, KeyError, TypeError):
+            return None
+        if manifest.get('size') != total or manifest.get('mdtm') != self._call(lambda ftp: self._mdtm(ftp, remote)):
+            return None
+        if [o for o, _, _ in segments] != [sum(n for _, n, _ in segments[:i]) for i in range(len(segments))] \
+                or sum(n for _, n, _ in segments) != total:
+            return None
+        return segments
+
+    def _download_segmented(self, remote, local_path, total, progress):
+        """Download byte ranges in parallel into <local>.seg, verify against the part manifest if present."""
+        segments = self._segment_manifest(remote, total)
+        ranges = [(o, n) for o, n, _ in segments] if segments else self._segment_ranges(total)
+        tmp = local_path + '.seg'
+        try:
+            with open(tmp, 'wb') as f:
+                f.truncate(total)
+            hashes = self._run_segments(
+                ranges, lambda ftp, o, n, advance: self._retr_range(ftp, remote, tmp, o, n, advance),
+                self._segment_progress(progress, total))
+            if os.path.getsize(tmp) != total:
+                raise TransferError(f"size mismatch after download ({os.path.getsize(tmp)} != {total})")
+            if segments and hashes != [h for _, _, h in segments]:
+                raise TransferError("segment checksum mismatch")
+            os.replace(tmp, local_path)
+        except BaseException:
+            _remove_quietly(tmp)
+            raise
+        xbmc.log(f"[AutoFTP] Downloaded {remote} in {len(ranges)} segments"
+                 f"{' (verified)' if segments else ''}", xbmc.LOGDEBUG)
+
+    def _download_resumable(self, ftp, remote, local_path, total, progress):
+        part = local_path + '.part'
+        checkpoint_path = part + '.json'
+        mdtm = self._mdtm(ftp, remote)
+        checkpoint = _read_checkpoint(checkpoint_path)
+        offset = 0
+        if (checkpoint.get('remote') == remote and checkpoint.get('size') == total
+                and checkpoint.get('mdtm') == mdtm and os.path.exists(part)):
+            offset = os.path.getsize(part)
+            if offset > total:
+                offset = 0
+        else:
+            _write_checkpoint(checkpoint_path, {'remote': remote, 'size': total, 'mdtm': mdtm})
+        if offset:
+            xbmc.log(f"[AutoFTP] Resuming download of {remote} at {offset} / {total} bytes", xbmc.LOGINFO)
+        if offset < total or total == 0:
+            self._retr(ftp, remote, part, progress, offset, total)
+        if os.path.getsize(part) != total:
+            raise TransferError(f"size mismatch after download ({os.path.getsize(part)} != {total})")
+        os.replace(part, local_path)
+        _remove_quietly(checkpoint_path)
+
+    def upload(self, local_path, remote_path, progress=None):
         try:
             remote = self._remote(remote_path)
-            with ftplib.FTP(self.host) as ftp:
-                ftp.login(self.user, self.password)
-                with open(local_path, 'rb') as f:
-                    ftp.storbinary('STOR ' + remote, f)
+            total = os.path.getsize(local_path)
+            if self._rest_stor and self._segment_ranges(total) and \
+                    self._upload_segmented(local_path, remote, total, progress):
+                return True
+
+            def op(ftp):
+                if self._resumable(total):
+                    self._upload_resumable(ftp, local_path, remote, total, progress)
+                else:
+                    self._stor(ftp, local_path, remote, progress, total=total)
+            self._call(op)
             return True
         except Exception as e:
             xbmc.log(f"[AutoFTP] FTP upload failed: {e}", xbmc.LOGERROR)
             return False
+        finally:
+            self.cache.invalidate(self._remote(remote_path))
 
-    def download(self, remote_path, local_path):
+    def upload_stream(self, stream, remote_path, progress=None):
+        """Store stream into <remote>.part and rename it when complete; a broken stream keeps the old file."""
+        remote = self._remote(remote_path)
+        part = remote + '.part'
+        done = [0]
+
+        def callback(buf):
+            done[0] += len(buf)
+            progress(done[0], None)
+        try:
+            with self._pool.session() as (ftp, _):
+                ftp.storbinary('STOR ' + part, stream, self.buffer_size, callback if progress else None)
+                self._replace(ftp, part, remote)
+            return True
+        except Exception as e:
+            xbmc.log(f"[AutoFTP] FTP stream upload failed: {e}", xbmc.LOGERROR)
+            try:
+                self._call(lambda ftp: ftp.delete(part))
+            except Exception:
+                pass
+            return False
+        finally:
+            self.cache.invalidate(remote)
+
+    def download_stream(self, remote_path, write, progress=None):
+        """RETR remote_path into write(bytes) in buffer_size chunks."""
+        done = [0]
         try:
             remote = self._remote(remote_path)
-            with ftplib.FTP(self.host) as ftp:
-                ftp.login(self.user, self.password)
-                with open(local_path, 'wb') as f:
-                    ftp.retrbinary('RETR ' + remote, f.write)
+            with self._pool.session() as (ftp, _):
+                total = self._size(ftp, remote)
+
+                def callback(buf):
+                    write(buf)
+                    done[0] += len(buf)
+                    if progress:
+                        progress(done[0], total)
+                ftp.retrbinary('RETR ' + remote, callback, self.buffer_size)
+            return True
+        except Exception as e:
+            xbmc.log(f"[AutoFTP] FTP stream download failed: {e}", xbmc.LOGERROR)
+            return False
+
+    def download(self, remote_path, local_path, progress=None):
+        try:
+            remote = self._remote(remote_path)
+            if self.segments > 1:
+                total = self._call(lambda ftp: self._size(ftp, remote))
+                if self._segment_ranges(total):
+                    self._download_segmented(remote, local_path, total, progress)
+                    return True
+
+            def op(ftp):
+                total = self._size(ftp, remote) if self.resume_threshold else None
+                if self._resumable(total):
+                    self._download_resumable(ftp, remote, local_path, total, progress)
+                else:
+                    self._retr(ftp, remote, local_path, progress, total=total)
+            self._call(op)
             return True
         except Exception as e:
             xbmc.log(f"[AutoFTP] FTP download failed: {e}", xbmc.LOGERROR)
             return False
 
+    def _load_listing(self, ftp, remote):
+        """MLSD listing of remote (NLST + CWD if MLSD is unsupported); None if the directory is missing."""
+        if self._mlsd:
+            try:
+                entries = {}
+                for name, facts in ftp.mlsd(remote, ['type', 'size', 'modify']):
+                    kind = facts.get('type', '').lower()
+                    if kind not in ('file', 'dir'):
+                        continue
+                    size = facts.get('size')
+                    entries[name] = {'type': kind, 'size': int(size) if size and size.isdigit() else None,
+                                     'mtime': _parse_mdtm(facts.get('modify'))}
+                return entries
+            except ftplib.error_perm as e:
+                if str(e)[:3] not in ('500', '501', '502', '504'):
+                    return None
+                self._mlsd = False
+                xbmc.log("[AutoFTP] MLSD not supported, listing with NLST", xbmc.LOGDEBUG)
+        try:
+            ftp.cwd(remote)
+        except ftplib.error_perm:
+            return None
+        try:
+            names = ftp.nlst()
+        except ftplib.error_perm:
+            names = []  # some servers answer 550 for an empty directory
+        return {n.rsplit('/', 1)[-1]: {'type': None, 'size': None, 'mtime': None} for n in names}
+
+    def list_dir(self, remote_dir):
+        """Cached listing {name: {'type', 'size', 'mtime'}} of remote_dir, or None if it does not exist."""
+        remote = self._remote(remote_dir).rstrip('/') or '/'
+        try:
+            return self.cache.listing(remote, lambda: self._call(lambda ftp: self._load_listing(ftp, remote)))
+        except Exception as e:
+            xbmc.log(f"[AutoFTP] FTP list failed: {e}", xbmc.LOGERROR)
+            return None
+
+    def stat(self, remote_path):
+        """{'type', 'size', 'mtime'} of a remote file from the cached parent listing, or None if missing."""
+        remote = self._remote(remote_path).rstrip('/')
+        entries = self.list_dir(_parent(remote))
+        entry = entries.get(remote.rsplit('/', 1)[-1]) if entries else None
+        if entry is not None and entry['type'] != 'dir' and (entry['size'] is None or entry['mtime'] is None):
+            # NLST fallback: fill in SIZE/MDTM once, the cached entry keeps them until the TTL expires
+            try:
+                entry['size'] = self._call(lambda ftp: self._size(ftp, remote))
+                entry['mtime'] = _parse_mdtm(self._call(lambda ftp: self._mdtm(ftp, remote)))
+            except Exception as e:
+                xbmc.log(f"[AutoFTP] FTP stat failed: {e}", xbmc.LOGERROR)
+        return dict(entry) if entry is not None else None
+
     def folder_exists(self, remote_path):
+        return self.list_dir(remote_path) is not None
+
+    def makedirs(self, remote_dir):
+        """Create remote_dir and missing parents; existing directories are fine."""
+        try:
+            remote = self._remote(remote_dir).rstrip('/')
+            if not remote or remote in self._dirs_made:
+                return True
+
+            def op(ftp):
+                path = ''
+                for seg in remote.strip('/').split('/'):
+                    path += '/' + seg
+                    if path in self._dirs_made:
+                        continue
+                    try:
+                        ftp.mkd(path)
+                    except ftplib.error_perm:
+                        pass  # exists; a missing permission surfaces on the following STOR
+                    self._dirs_made.add(path)
+                    self.cache.invalidate(path)
+            self._call(op)
+            return True
+        except Exception as e:
+            xbmc.log(f"[AutoFTP] FTP makedirs failed: {e}", xbmc.LOGERROR)
+            return False
+
+    def delete(self, remote_path):
+        """Delete a remote file. Returns False if it did not exist or could not be deleted."""
         try:
             remote = self._remote(remote_path)
-            with ftplib.FTP(self.host) as ftp:
-                ftp.login(self.user, self.password)
-                ftp.cwd(remote)
+            self._call(lambda ftp: ftp.delete(remote))
             return True
-        except ftplib.error_perm as e:
-            if '550' in str(e):
-                return False
-            xbmc.log(f"[AutoFTP] FTP error: {e}", xbmc.LOGERROR)
+        except ftplib.error_perm:
             return False
         except Exception as e:
-            xbmc.log(f"[AutoFTP] FTP folder_exists failed: {e}", xbmc.LOGERROR)
+            xbmc.log(f"[AutoFTP] FTP delete failed: {e}", xbmc.LOGERROR)
             return False
+        finally:
+            self.cache.invalidate(self._remote(remote_path))
 
+    def rmdir(self, remote_dir):
+        """Remove an empty remote directory. Returns False if it did not exist or is not empty."""
+        remote = self._remote(remote_dir).rstrip('/')
+        try:
+            self._call(lambda ftp: ftp.rmd(remote))
+            return True
+        except ftplib.error_perm:
+            return False
+        except Exception as e:
+            xbmc.log(f"[AutoFTP] FTP rmdir failed: {e}", xbmc.LOGERROR)
+            return False
+        finally:
+            self._dirs_made.discard(remote)
+            self.cache.invalidate(remote)
 
-class SFTPBackend:
-    """SFTP backend using xbmcvfs (requires vfs.sftp addon). Remote path: absolute path on server."""
-    def __init__(self, host, user, password, base_path, port=22):
-        self.host = host
-        self.port = int(port) if port else 22
-        self.user = quote(user or '', safe='')
-        self.password = quote(password or '', safe='')
-        self._prefix = f"sftp://{self.user}:{self.password}@{host}:{self.port}/"
+    def close(self):
+        """Close pooled sessions and log how many handshakes the run needed."""
+        stats = self._pool.close()
+        if stats['connections'] or stats['reused']:
+            xbmc.log(
+                f"[AutoFTP] FTP sessions: {stats['connections']} connects "
+                f"({stats['handshake_time']:.2f}s handshake), {stats['reused']} reused, "
+                f"{stats['reconnects']} reconnects", xbmc.LOGINFO)
+        _log_cache_stats(self.cache)
+        stats.update(cache_hits=self.cache.stats['hits'], cache_misses=self.cache.stats['misses'])
+        self.cache.clear()
+        return stats
+
+
+def _log_cache_stats(cache):
+    if cache.stats['hits'] or cache.stats['misses']:
+        xbmc.log(f"[AutoFTP] Remote metadata cache: {cache.stats['hits']} hits, {cache.stats['misses']} misses",
+                 xbmc.LOGINFO)
+
+
+class _VFSBackend:
+    """Shared xbmcvfs implementation for SFTP and SMB; subclasses set _prefix and _label and create cache."""
+    _label = 'VFS'
+    _prefix = ''
+    buffer_size = DEFAULT_BUFFER_SIZE
+    cache = None
+    connect_timeout = DEFAULT_CONNECT_TIMEOUT
+    retries = DEFAULT_RETRIES
+    deadline = None
+
+    def _init_network(self, metadata_ttl, connect_timeout, retries, deadline):
+        self.cache = RemoteMetadataCache(metadata_ttl)
+        self.connect_timeout = connect_timeout
+        self.retries = retries
+        self.deadline = deadline
+
+    def _vfs(self, func, *args):
+        """xbmcvfs metadata call with connect_timeout (capped by the deadline); only timeouts are retried."""
+        timeout = self.deadline.cap(self.connect_timeout) if self.deadline else self.connect_timeout
+        return retry_call(lambda: _run_with_timeout(func, timeout, *args), self.retries, self.deadline,
+                          transient=(TimeoutError,), label=self._label)
+
+    def _transfer(self, func, *args):
+        """Whole-file transfer; timeouts and failed VFS reads/writes are retried, local file errors are not."""
+        return retry_call(lambda: func(*args), self.retries, self.deadline,
+                          transient=(TimeoutError, TransferError), label=self._label)
 
     def _remote_url(self, remote_path):
         p = (remote_path or '').replace('\\', '/').strip('/')
         return self._prefix + p if p else self._prefix.rstrip('/') + '/'
 
-    def upload(self, local_path, remote_path):
+    def upload(self, local_path, remote_path, progress=None):
         url = self._remote_url(remote_path)
         try:
-            with open(local_path, 'rb') as f:
-                data = f.read()
-            f = xbmcvfs.File(url, 'wb')
-            f.write(data)
-            f.close()
+            self._transfer(upload_to_vfs, local_path, url, self.buffer_size, progress)
             return True
         except Exception as e:
-            xbmc.log(f"[AutoFTP] SFTP upload failed: {e}", xbmc.LOGERROR)
+            xbmc.log(f"[AutoFTP] {self._label} upload failed: {e}", xbmc.LOGERROR)
             return False
+        finally:
+            self.cache.invalidate(url)
 
-    def download(self, remote_path, local_path):
+    def upload_stream(self, stream, remote_path, progress=None):
+        """Write stream to <url>.part through xbmcvfs.File and rename it when complete."""
         url = self._remote_url(remote_path)
+        part = url + '.part'
         try:
-            f = xbmcvfs.File(url, 'rb')
-            data = f.read()
-            f.close()
-            with open(local_path, 'wb') as out:
-                out.write(data)
+            dst = xbmcvfs.File(part, 'wb')
+            try:
+                copy_stream(stream.read, dst.write, self.buffer_size, progress)
+            finally:
+                dst.close()
+            if not xbmcvfs.rename(part, url):
+                # Some shares refuse to rename onto an existing file
+                xbmcvfs.delete(url)
+                if not xbmcvfs.rename(part, url):
+                    raise IOError(f"cannot rename {part}")
             return True
         except Exception as e:
-            xbmc.log(f"[AutoFTP] SFTP download failed: {e}", xbmc.LOGERROR)
+            xbmc.log(f"[AutoFTP] {self._label} stream upload failed: {e}", xbmc.LOGERROR)
+            xbmcvfs.delete(part)
             return False
+        finally:
+            self.cache.invalidate(url)
 
-    def folder_exists(self, remote_path):
+    def download(self, remote_path, local_path, progress=None):
+        url = self._remote_url(remote_path)
+        try:
+            self._transfer(download_from_vfs, url, local_path, self.buffer_size, progress)
+            return True
+        except Exception as e:
+            xbmc.log(f"[AutoFTP] {self._label} download failed: {e}", xbmc.LOGERROR)
+            return False
+
+    def download_stream(self, remote_path, write, progress=None):
+        url = self._remote_url(remote_path)
         try:
-            url = self._remote_url(remote_path)
-            if not url.endswith('/'):
-                url += '/'
-            dirs, files = xbmcvfs.listdir(url)
+            if not self._vfs(xbmcvfs.exists, url):
+                raise IOError("not found")
+            src = xbmcvfs.File(url, 'rb')
+            try:
+                copy_stream(src.readBytes, write, self.buffer_size, progress, src.size() or None)
+            finally:
+                src.close()
             return True
+        except Exception as e:
+            xbmc.log(f"[AutoFTP] {self._label} stream download failed: {e}", xbmc.LOGERROR)
+            return False
+
+    def _load_listing(self, url):
+        try:
+            dirs, files = self._vfs(xbmcvfs.listdir, url + '/')
         except Exception:
+            return None
+        entries = {name: {'type': 'file', 'size': None, 'mtime': None} for name in files}
+        entries.update({name: {'type': 'dir', 'size': None, 'mtime': None} for name in dirs})
+        return entries
+
+    def list_dir(self, remote_dir):
+        """Cached listing {name: {'type', 'size', 'mtime'}} of remote_dir, or None if it cannot be listed."""
+        return self._list_url(self._remote_url(remote_dir).rstrip('/'))
+
+    def _list_url(self, url):
+        return self.cache.listing(url, lambda: self._load_listing(url))
+
+    def stat(self, remote_path):
+        """{'type', 'size', 'mtime'} of a remote file from the cached parent listing, or None if missing."""
+        url = self._remote_url(remote_path).rstrip('/')
+        entries = self._list_url(_parent(url))
+        entry = entries.get(url.rsplit('/', 1)[-1]) if entries else None
+        if entry is not None and entry['type'] == 'file' and entry['size'] is None:
+            # listdir only returns names; stat once and keep the result in the cached entry
+            try:
+                st = self._vfs(xbmcvfs.Stat, url)
+                entry['size'], entry['mtime'] = st.st_size(), int(st.st_mtime())
+            except Exception as e:
+                xbmc.log(f"[AutoFTP] {self._label} stat failed: {e}", xbmc.LOGERROR)
+        return dict(entry) if entry is not None else None
+
+    def folder_exists(self, remote_path):
+        return self.list_dir(remote_path) is not None
+
+    def makedirs(self, remote_dir):
+        try:
+            url = self._remote_url(remote_dir)
+            return bool(self._vfs(xbmcvfs.exists, url.rstrip('/') + '/') or self._vfs(xbmcvfs.mkdirs, url))
+        except Exception as e:
+            xbmc.log(f"[AutoFTP] {self._label} makedirs failed: {e}", xbmc.LOGERROR)
             return False
+        finally:
+            self.cache.clear()  # mkdirs may create several levels
 
+    def delete(self, remote_path):
+        url = self._remote_url(remote_path)
+        try:
+            return bool(self._vfs(xbmcvfs.delete, url))
+        except Exception as e:
+            xbmc.log(f"[AutoFTP] {self._label} delete failed: {e}", xbmc.LOGERROR)
+            return False
+        finally:
+            self.cache.invalidate(url)
 
-class SMBBackend:
+    def rmdir(self, remote_dir):
+        url = self._remote_url(remote_dir).rstrip('/') + '/'
+        try:
+            return bool(self._vfs(xbmcvfs.rmdir, url))
+        except Exception as e:
+            xbmc.log(f"[AutoFTP] {self._label} rmdir failed: {e}", xbmc.LOGERROR)
+            return False
+        finally:
+            self.cache.clear()
+
+    def close(self):
+        """Nothing pooled: xbmcvfs manages its own connections."""
+        _log_cache_stats(self.cache)
+        stats = {'cache_hits': self.cache.stats['hits'], 'cache_misses': self.cache.stats['misses']}
+        self.cache.clear()
+        return stats
+
+
+class SFTPBackend(_VFSBackend):
+    """SFTP backend using xbmcvfs (requires vfs.sftp addon). Remote path: absolute path on server."""
+    _label = 'SFTP'
+
+    def __init__(self, host, user, password, base_path, port=22, buffer_size=DEFAULT_BUFFER_SIZE,
+                 metadata_ttl=DEFAULT_METADATA_TTL, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 retries=DEFAULT_RETRIES, deadline=None):
+        self.host, host_port = split_host_port(host)
+        self.port = host_port or (int(port) if port else 22)
+        self.user = quote(user or '', safe='')
+        self.password = quote(password or '', safe='')
+        self.buffer_size = buffer_size
+        self._init_network(metadata_ttl, connect_timeout, retries, deadline)
+        self._prefix = f"sftp://{self.user}:{self.password}@{self.host}:{self.port}/"
+
+
+class SMBBackend(_VFSBackend):
     """SMB backend using xbmcvfs. remote_path = share/path (e.g. myshare/kodi/auto_fav_sync/...)."""
-    def __init__(self, host, user, password, base_path):
+    _label = 'SMB'
+
+    def __init__(self, host, user, password, base_path, buffer_size=DEFAULT_BUFFER_SIZE,
+                 metadata_ttl=DEFAULT_METADATA_TTL, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 retries=DEFAULT_RETRIES, deadline=None):
         self.host = host
         self.user = quote(user or '', safe='')
         self.password = quote(password or '', safe='')
+        self.buffer_size = buffer_size
+        self._init_network(metadata_ttl, connect_timeout, retries, deadline)
         self._prefix = f"smb://{self.user}:{self.password}@{host}/"
 
-    def _remote_url(self, remote_path):
-        p = (remote_path or '').replace('\\', '/').strip('/')
-        return self._prefix + p if p else self._prefix.rstrip('/') + '/'
 
-    def upload(self, local_path, remote_path):
-        url = self._remote_url(remote_path)
+# Reused keep-alive connections fail with these when the server closed them in the meantime
+HTTP_STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine, BrokenPipeError,
+                     ConnectionResetError, ConnectionAbortedError)
+# Server answers worth retrying (overload / gateway problems)
+HTTP_TRANSIENT_STATUS = (408, 429, 500, 502, 503, 504)
+_DAV_NS = '{DAV:}'
+_PROPFIND_BODY = (b'<?xml version="1.0" encoding="utf-8"?><d:propfind xmlns:d="DAV:"><d:prop>'
+                  b'<d:resourcetype/><d:getcontentlength/><d:getlastmodified/><d:getetag/></d:prop></d:propfind>')
+
+
+def _parse_http_date(value):
+    """RFC 1123 date (getlastmodified) -> epoch seconds or None."""
+    try:
+        return int(email.utils.parsedate_to_datetime(value).timestamp())
+    except (TypeError, ValueError, IndexError):
+        return None
+
+
+class WebDAVError(Exception):
+    """Final (non-retried) HTTP answer; status holds the code."""
+    def __init__(self, status, reason=''):
+        super().__init__(f"HTTP {status} {reason}".strip())
+        self.status = status
+
+
+def parse_webdav_host(host):
+    """
+    Host setting of a WebDAV profile -> (scheme, host, port, path_prefix).
+    Accepts 'nas', 'nas:5006' or a full URL like 'http://nas:5005/webdav'; https is the default scheme.
+    """
+    host = (host or '').strip()
+    if '://' not in host:
+        host = 'https://' + host
+    parts = urlsplit(host)
+    scheme = parts.scheme.lower() if parts.scheme.lower() in ('http', 'https') else 'https'
+    return scheme, parts.hostname or '', parts.port or (443 if scheme == 'https' else 80), parts.path.rstrip('/')
+
+
+class HTTPConnectionPool:
+    """
+    Persistent HTTP/1.1 connections to one server for a sync run (thread-safe), like FTPSessionPool.
+    stats: connections (TCP/TLS handshakes), reused, reconnects, handshake_time (seconds).
+    """
+    def __init__(self, scheme, host, port, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, deadline=None):
+        self.scheme = scheme
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.deadline = deadline
+        self._idle = []
+        self._lock = threading.Lock()
+        self.stats = {'connections': 0, 'reused': 0, 'reconnects': 0, 'handshake_time': 0.0}
+
+    def _connect(self):
+        start = time.monotonic()
+        timeout = self.deadline.cap(self.connect_timeout) if self.deadline else self.connect_timeout
+        cls = http.client.HTTPSConnection if self.scheme == 'https' else http.client.HTTPConnection
+        conn = cls(self.host, self.port, timeout=timeout)
+        try:
+            conn.connect()
+            conn.sock.settimeout(self.read_timeout)
+        except Exception:
+            conn.close()
+            raise
+        with self._lock:
+            self.stats['connections'] += 1
+            self.stats['handshake_time'] += time.monotonic() - start
+        return conn
+
+    @contextlib.contextmanager
+    def connection(self, fresh=False):
+        """
+        Yield (conn, reused); the connection goes back to the pool unless the request failed.
+        fresh=True always opens a new connection (for request bodies that cannot be sent twice).
+        """
+        with self._lock:
+            conn = self._idle.pop() if self._idle and not fresh else None
+            if conn is not None:
+                self.stats['reused'] += 1
+        reused = conn is not None
+        if conn is None:
+            conn = self._connect()
         try:
-            with open(local_path, 'rb') as f:
-                data = f.read()
-            f = xbmcvfs.File(url, 'wb')
-            f.write(data)
-            f.close()
+            yield conn, reused
+        except BaseException:
+            conn.close()
+            raise
+        with self._lock:
+            self._idle.append(conn)
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+        return dict(self.stats)
+
+
+class WebDAVBackend:
+    """
+    WebDAV backend over persistent HTTP/1.1 connections (HTTPConnectionPool). Transfers are streamed
+    (PUT with Content-Length, or chunked for upload_stream; GET read in buffer_size chunks); listings use
+    PROPFIND Depth 1 and are cached.
+    Downloads send If-None-Match with the ETag recorded for the local file's current size/mtime, so an
+    unchanged file is answered with 304 and not transferred. ETags persist in sync_state/webdav_etags.json.
+    Authentication: HTTP Basic (use https outside the home network).
+    """
+    _label = 'WebDAV'
+
+    def __init__(self, host, user, password, base_path, buffer_size=DEFAULT_BUFFER_SIZE,
+                 metadata_ttl=DEFAULT_METADATA_TTL, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, retries=DEFAULT_RETRIES, deadline=None, etag_file=None):
+        from resources.lib import sync_state
+        self.scheme, self.host, self.port, self.prefix = parse_webdav_host(host)
+        self.buffer_size = buffer_size
+        self.retries = retries
+        self.deadline = deadline
+        self._auth = None
+        if user:
+            token = base64.b64encode(f"{user}:{password or ''}".encode('utf-8')).decode('ascii')
+            self._auth = 'Basic ' + token
+        self._pool = HTTPConnectionPool(self.scheme, self.host, self.port, connect_timeout, read_timeout, deadline)
+        self.cache = RemoteMetadataCache(metadata_ttl)
+        self._dirs_made = set()
+        self._origin = f"{self.scheme}://{self.host}:{self.port}"
+        self._etags = sync_state.SyncState(etag_file or os.path.join(sync_state.STATE_DIR, 'webdav_etags.json'))
+        self.stats = {'not_modified': 0}
+
+    def _remote(self, path):
+        """Absolute remote path (without the URL prefix), no trailing slash."""
+        p = '/' + (path or '').replace('\\', '/').strip('/')
+        return p.rstrip('/') or '/'
+
+    def _url_path(self, remote, collection=False):
+        path = quote(self.prefix + remote, safe='/')
+        return path.rstrip('/') + '/' if collection else path
+
+    def _headers(self, extra=None):
+        headers = {'Connection': 'keep-alive'}
+        if self._auth:
+            headers['Authorization'] = self._auth
+        headers.update(extra or {})
+        return headers
+
+    def _call(self, send, handle):
+        """
+        send(conn) issues a request, handle(response) reads it completely (so the connection can be reused).
+        A reused connection the server already closed is replaced once; other transient errors and 5xx/429
+        answers are retried via retry_call.
+        """
+        state = {'stale_retry': True}
+
+        def once():
+            final = None
+            with self._pool.connection() as (conn, reused):
+                try:
+                    send(conn)
+                    resp = conn.getresponse()
+                except HTTP_STALE_ERRORS:
+                    if not (reused and state['stale_retry']):
+                        raise
+                    state['stale_retry'] = False
+                    self._pool.stats['reconnects'] += 1
+                    raise _StaleConnection()
+                if resp.status in HTTP_TRANSIENT_STATUS:
+                    raise ConnectionError(f"HTTP {resp.status} {resp.reason}")
+                try:
+                    result = handle(resp)
+                except WebDAVError as e:
+                    final = e  # answered cleanly: the connection stays usable
+                resp.read()  # drain, otherwise the connection cannot carry the next request
+                if resp.will_close:
+                    conn.close()  # http.client reopens it transparently on the next request
+            if final is not None:
+                raise final
+            return result
+
+        def attempt():
+            try:
+                return once()
+            except _StaleConnection:
+                xbmc.log(f"[AutoFTP] {self._label} connection lost, reconnecting", xbmc.LOGDEBUG)
+                return once()
+        return retry_call(attempt, self.retries, self.deadline, transient=(OSError, http.client.HTTPException),
+                          label=f"{self._label} {self.host}")
+
+    def _simple(self, method, url_path, body=None, headers=None):
+        """Request without a streamed body; returns (status, headers, body bytes)."""
+        def send(conn):
+            conn.request(method, url_path, body=body, headers=self._headers(headers))
+        return self._call(send, lambda resp: (resp.status, resp.headers, resp.read()))
+
+    def upload(self, local_path, remote_path, progress=None):
+        remote = self._remote(remote_path)
+        try:
+            total = os.path.getsize(local_path)
+
+            def send(conn):
+                conn.putrequest('PUT', self._url_path(remote), skip_accept_encoding=True)
+                for k, v in self._headers({'Content-Length': str(total),
+                                           'Content-Type': 'application/octet-stream'}).items():
+                    conn.putheader(k, v)
+                conn.endheaders()
+                with open(local_path, 'rb') as f:
+                    copy_stream(f.read, conn.send, self.buffer_size, progress, total)
+
+            def handle(resp):
+                if resp.status not in (200, 201, 204):
+                    raise WebDAVError(resp.status, resp.reason)
+                return resp.headers.get('ETag')
+            etag = self._call(send, handle)
+            self._remember(remote, local_path, etag)
             return True
         except Exception as e:
-            xbmc.log(f"[AutoFTP] SMB upload failed: {e}", xbmc.LOGERROR)
+            xbmc.log(f"[AutoFTP] {self._label} upload failed: {e}", xbmc.LOGERROR)
             return False
+        finally:
+            self.cache.invalidate(remote)
 
-    def download(self, remote_path, local_path):
-        url = self._remote_url(remote_path)
+    def upload_stream(self, stream, remote_path, progress=None):
+        """PUT with chunked transfer encoding on a fresh connection (a stale pooled one would lose the stream)."""
+        remote = self._remote(remote_path)
+        done = [0]
+
+        def body():
+            while True:
+                chunk = stream.read(self.buffer_size)
+                if not chunk:
+                    return
+                done[0] += len(chunk)
+                if progress:
+                    progress(done[0], None)
+                yield chunk
         try:
-            f = xbmcvfs.File(url, 'rb')
-            data = f.read()
-            f.close()
-            with open(local_path, 'wb') as out:
-                out.write(data)
+            with self._pool.connection(fresh=True) as (conn, _):
+                conn.request('PUT', self._url_path(remote), body=body(), encode_chunked=True,
+                             headers=self._headers({'Content-Type': 'application/octet-stream'}))
+                resp = conn.getresponse()
+                resp.read()
+                if resp.status not in (200, 201, 204):
+                    raise WebDAVError(resp.status, resp.reason)
+                if resp.will_close:
+                    conn.close()
             return True
         except Exception as e:
-            xbmc.log(f"[AutoFTP] SMB download failed: {e}", xbmc.LOGERROR)
+            xbmc.log(f"[AutoFTP] {self._label} stream upload failed: {e}", xbmc.LOGERROR)
             return False
+        finally:
+            self.cache.invalidate(remote)
+
+    def _remember(self, remote, local_path, etag):
+        """Record the remote ETag for the local copy's current size/mtime (basis for If-None-Match)."""
+        if not etag:
+            self._etags.forget(self._origin, remote)
+            return
+        st = os.stat(local_path)
+        self._etags.record(self._origin, remote, {'etag': etag, 'size': st.st_size, 'mtime': int(st.st_mtime),
+                                                  'local': os.path.abspath(local_path)})
+
+    def _known_etag(self, remote, local_path):
+        """ETag of the remote file the local file is an unchanged copy of, or None."""
+        rec = self._etags.get(self._origin, remote)
+        if not rec or rec.get('local') != os.path.abspath(local_path):
+            return None
+        try:
+            st = os.stat(local_path)
+        except OSError:
+            return None
+        return rec.get('etag') if rec.get('size') == st.st_size and rec.get('mtime') == int(st.st_mtime) else None
+
+    def download(self, remote_path, local_path, progress=None):
+        remote = self._remote(remote_path)
+        tmp = local_path + '.part'
+        try:
+            etag = self._known_etag(remote, local_path)
+
+            def send(conn):
+                conn.request('GET', self._url_path(remote), headers=self._headers(
+                    {'If-None-Match': etag} if etag else None))
+
+            def handle(resp):
+                if resp.status == 304:
+                    return None
+                if resp.status != 200:
+                    raise WebDAVError(resp.status, resp.reason)
+                length = resp.headers.get('Content-Length')
+                with open(tmp, 'wb') as f:
+                    copy_stream(resp.read, f.write, self.buffer_size, progress, int(length) if length else None)
+                return resp.headers.get('ETag') or ''
+            new_etag = self._call(send, handle)
+            if new_etag is None:
+                self.stats['not_modified'] += 1
+                return True
+            os.replace(tmp, local_path)
+            self._remember(remote, local_path, new_etag)
+            return True
+        except Exception as e:
+            _remove_quietly(tmp)
+            xbmc.log(f"[AutoFTP] {self._label} download failed: {e}", xbmc.LOGERROR)
+            return False
+
+    def download_stream(self, remote_path, write, progress=None):
+        """GET on a fresh connection, body handed to write(bytes) as it arrives."""
+        remote = self._remote(remote_path)
+        try:
+            with self._pool.connection(fresh=True) as (conn, _):
+                conn.request('GET', self._url_path(remote), headers=self._headers())
+                resp = conn.getresponse()
+                if resp.status != 200:
+                    resp.read()
+                    raise WebDAVError(resp.status, resp.reason)
+                total = int(resp.headers.get('Content-Length') or 0) or None
+                copy_stream(resp.read, write, self.buffer_size, progress, total)
+                if resp.will_close:
+                    conn.close()
+            return True
+        except Exception as e:
+            xbmc.log(f"[AutoFTP] {self._label} stream download failed: {e}", xbmc.LOGERROR)
+            return False
+
+    def _load_listing(self, remote):
+        """PROPFIND Depth 1 of remote -> {name: {'type', 'size', 'mtime', 'etag'}}; None if missing."""
+        status, _, body = self._simple('PROPFIND', self._url_path(remote, collection=True), _PROPFIND_BODY,
+                                       {'Depth': '1', 'Content-Type': 'application/xml; charset=utf-8'})
+        if status in (404, 409):
+            return None
+        if status != 207:
+            raise WebDAVError(status)
+        own = unquote(self._url_path(remote, collection=True)).rstrip('/')
+        entries = {}
+        for response in ElementTree.fromstring(body).iter(_DAV_NS + 'response'):
+            href = unquote(urlsplit(response.findtext(_DAV_NS + 'href') or '').path).rstrip('/')
+            if not href or href == own:
+                continue
+            props = {}
+            for propstat in response.iter(_DAV_NS + 'propstat'):
+                prop = propstat.find(_DAV_NS + 'prop')
+                if prop is not None and '200' in (propstat.findtext(_DAV_NS + 'status') or ''):
+                    props.update({child.tag: child for child in prop})
+            rtype = props.get(_DAV_NS + 'resourcetype')
+            is_dir = rtype is not None and rtype.find(_DAV_NS + 'collection') is not None
+            text = {tag[len(_DAV_NS):]: (el.text or '').strip() for tag, el in props.items()}
+            size = text.get('getcontentlength', '')
+            entries[href.rsplit('/', 1)[-1]] = {
+                'type': 'dir' if is_dir else 'file', 'size': int(size) if size.isdigit() else None,
+                'mtime': _parse_http_date(text.get('getlastmodified')), 'etag': text.get('getetag') or None}
+        return entries
+
+    def list_dir(self, remote_dir):
+        """Cached listing {name: {'type', 'size', 'mtime', 'etag'}} of remote_dir, or None if it does not exist."""
+        remote = self._remote(remote_dir)
+        try:
+            return self.cache.listing(remote, lambda: self._load_listing(remote))
+        except Exception as e:
+            xbmc.log(f"[AutoFTP] {self._label} list failed: {e}", xbmc.LOGERROR)
+            return None
+
+    def stat(self, remote_path):
+        """{'type', 'size', 'mtime', 'etag'} of a remote file from the cached parent listing, or None."""
+        remote = self._remote(remote_path)
+        entries = self.list_dir(_parent(remote))
+        entry = entries.get(remote.rsplit('/', 1)[-1]) if entries else None
+        return dict(entry) if entry is not None else None
 
     def folder_exists(self, remote_path):
+        return self.list_dir(remote_path) is not None
+
+    def makedirs(self, remote_dir):
+        """MKCOL remote_dir and missing parents (405 = already exists)."""
         try:
-            url = self._remote_url(remote_path)
-            if not url.endswith('/'):
-                url += '/'
-            dirs, files = xbmcvfs.listdir(url)
+            remote = self._remote(remote_dir)
+            path = ''
+            for seg in [s for s in remote.split('/') if s]:
+                path += '/' + seg
+                if path in self._dirs_made:
+                    continue
+                status, _, _ = self._simple('MKCOL', self._url_path(path, collection=True))
+                if status not in (200, 201, 405):
+                    raise WebDAVError(status)
+                self._dirs_made.add(path)
+                self.cache.invalidate(path)
             return True
-        except Exception:
+        except Exception as e:
+            xbmc.log(f"[AutoFTP] {self._label} makedirs failed: {e}", xbmc.LOGERROR)
             return False
 
+    def delete(self, remote_path):
+        """Delete a remote file. Returns False if it did not exist or could not be deleted."""
+        remote = self._remote(remote_path)
+        try:
+            status, _, _ = self._simple('DELETE', self._url_path(remote))
+            self._etags.forget(self._origin, remote)
+            return status in (200, 202, 204)
+        except Exception as e:
+            xbmc.log(f"[AutoFTP] {self._label} delete failed: {e}", xbmc.LOGERROR)
+            return False
+        finally:
+            self.cache.invalidate(remote)
+
+    def rmdir(self, remote_dir):
+        remote = self._remote(remote_dir)
+        try:
+            status, _, _ = self._simple('DELETE', self._url_path(remote, collection=True))
+            return status in (200, 202, 204)
+        except Exception as e:
+            xbmc.log(f"[AutoFTP] {self._label} rmdir failed: {e}", xbmc.LOGERROR)
+            return False
+        finally:
+            self._dirs_made.discard(remote)
+            self.cache.invalidate(remote)
+
+    def close(self):
+        """Close pooled connections, save ETags and log how many handshakes the run needed."""
+        stats = self._pool.close()
+        if stats['connections'] or stats['reused']:
+            xbmc.log(
+                f"[AutoFTP] {self._label} connections: {stats['connections']} connects "
+                f"({stats['handshake_time']:.2f}s handshake), {stats['reused']} reused, "
+                f"{stats['reconnects']} reconnects, {self.stats['not_modified']} downloads not modified",
+                xbmc.LOGINFO)
+        self._etags.save()
+        _log_cache_stats(self.cache)
+        stats.update(cache_hits=self.cache.stats['hits'], cache_misses=self.cache.stats['misses'],
+                     not_modified=self.stats['not_modified'])
+        self.cache.clear()
+        return stats
+
+
+class _StaleConnection(Exception):
+    """Internal: a reused keep-alive connection was closed by the server."""
+
 
-def get_backend(connection_type, host, user, password, base_path, sftp_port='22'):
+def get_backend(connection_type, host, user, password, base_path, sftp_port='22', buffer_size=None,
+                resume_threshold=DEFAULT_RESUME_THRESHOLD, metadata_ttl=DEFAULT_METADATA_TTL,
+                connect_timeout=DEFAULT_CONNECT_TIMEOUT, read_timeout=DEFAULT_READ_TIMEOUT,
+                retries=DEFAULT_RETRIES, deadline=None, segments=DEFAULT_SEGMENTS,
+                segment_threshold=DEFAULT_SEGMENT_THRESHOLD, segment_readback=False):
     """
-    Return a sync backend. connection_type: 'ftp', 'sftp', 'smb'.
+    Return a sync backend. connection_type: 'ftp', 'sftp', 'smb', 'webdav'.
+    buffer_size: chunk size in bytes for streamed transfers (default DEFAULT_BUFFER_SIZE).
+    resume_threshold: FTP files of at least this many bytes are transferred resumably (0 = off).
+    metadata_ttl: seconds directory listings are cached (0 = off).
+    connect_timeout/read_timeout: seconds (read_timeout applies to FTP; xbmcvfs transfers have no read timeout).
+    retries: retries of transient errors; deadline: optional Deadline of the sync run.
+    segments/segment_threshold: FTP files of at least segment_threshold bytes use `segments` parallel sessions.
+    segment_readback: read segmented FTP uploads back when the server has no checksum command.
     """
     ct = (connection_type or 'ftp').strip().lower()
+    buffer_size = buffer_size or DEFAULT_BUFFER_SIZE
+    network = {'metadata_ttl': metadata_ttl, 'connect_timeout': connect_timeout, 'retries': retries,
+               'deadline': deadline}
     if ct == 'sftp':
-        return SFTPBackend(host, user, password, base_path, port=sftp_port)
+        return SFTPBackend(host, user, password, base_path, port=sftp_port, buffer_size=buffer_size, **network)
     if ct == 'smb':
-        return SMBBackend(host, user, password, base_path)
-    return FTPBackend(host, user, password, base_path)
+        return SMBBackend(host, user, password, base_path, buffer_size=buffer_size, **network)
+    if ct == 'webdav':
+        return WebDAVBackend(host, user, password, base_path, buffer_size=buffer_size, read_timeout=read_timeout,
+                             **network)
+    return FTPBackend(host, user, password, base_path, buffer_size=buffer_size, resume_threshold=resume_threshold,
+                      read_timeout=read_timeout, segments=segments, segment_threshold=segment_threshold,
+                      segment_readback=segment_readback, **network)
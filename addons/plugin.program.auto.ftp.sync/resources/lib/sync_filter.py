@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+"""
+Which files under addon_data are synced (all addon_data modes): include/exclude globs and size caps.
+Patterns are fnmatch globs, comma separated. A pattern without '/' matches a folder or file name at any depth,
+one with '/' a path relative to addon_data (e.g. plugin.video.foo/cache). Excluded folders are pruned during
+the walk, so their contents are never listed. include (if set): only paths matching it (or inside a matching
+folder) are synced. max_file_size skips single files; max_addon_size skips an addon folder as a whole when
+its remaining files exceed it, so no addon is shipped half. The local sync state is never shipped.
+"""
+import fnmatch
+import os
+
+import xbmc
+import xbmcaddon
+import xbmcgui
+import xbmcvfs
+
+from resources.lib import auto_clean, sync_state
+
+ADDON = xbmcaddon.Addon()
+# Default excludes (setting addon_sync_default_excludes): the cache folders Auto-Clean removes, plus temp files
+DEFAULT_EXCLUDES = tuple(sorted(auto_clean.CACHE_SUBDIR_NAMES)) + ('Thumbnails', '*.tmp')
+REPORT_TOP_ADDONS = 10
+LOG_PREFIX = "[AutoFTP]"
+
+
+def parse_patterns(text):
+    """Glob list from a comma/semicolon separated setting value."""
+    parts = (text or '').replace(';', ',').replace('\n', ',').split(',')
+    return [p.strip().strip('/') for p in parts if p.strip().strip('/')]
+
+
+def _format_size(size):
+    for u in ('B', 'KB', 'MB', 'GB'):
+        if size < 1024:
+            return f"{size:.1f} {u}"
+        size /= 1024
+    return f"{size:.1f} TB"
+
+
+class ScanReport:
+    """Result of SyncFilter.scan: files to ship and what was left out."""
+    def __init__(self):
+        self.files = []  # (rel_path, abs_path, stat)
+        self.addons = {}  # addon folder ('' = loose files) -> [files, bytes]
+        self.pruned = []  # excluded folders (not walked)
+        self.excluded = [0, 0]  # files excluded by pattern: count, bytes
+        self.too_large = []  # (rel_path, size) over max_file_size
+        self.over_cap = []  # (addon, size) over max_addon_size
+
+    @property
+    def size(self):
+        return sum(size for _, size in self.addons.values())
+
+    def summary(self):
+        return (f"{len(self.files)} files ({_format_size(self.size)}), {len(self.pruned)} folders pruned, "
+                f"{self.excluded[0]} files excluded, {len(self.too_large)} too large, "
+                f"{len(self.over_cap)} addons over the cap")
+
+
+class SyncFilter:
+    def __init__(self, include=(), exclude=DEFAULT_EXCLUDES, max_file_size=0, max_addon_size=0):
+        self.include_names = [p for p in include if '/' not in p]
+        self.include_paths = [p for p in include if '/' in p]
+        self.exclude_names = [p for p in exclude if '/' not in p]
+        self.exclude_paths = [p for p in exclude if '/' in p]
+        self.max_file_size = max(0, max_file_size)
+        self.max_addon_size = max(0, max_addon_size)
+
+    @classmethod
+    def from_settings(cls, addon=None):
+        """Filter from addon_sync_include/_exclude/_default_excludes/_max_file_mb/_max_addon_mb."""
+        addon = addon or ADDON
+
+        def setting(key, default=''):
+            try:
+                return addon.getSettingString(key) or default
+            except Exception:
+                return default
+
+        def megabytes(key):
+            try:
+                return max(0, int(setting(key, '0'))) * 1024 * 1024
+            except ValueError:
+                return 0
+        try:
+            defaults = addon.getSettingBool('addon_sync_default_excludes')
+        except Exception:
+            defaults = True
+        exclude = (list(DEFAULT_EXCLUDES) if defaults else []) + parse_patterns(setting('addon_sync_exclude'))
+        return cls(parse_patterns(setting('addon_sync_include')), exclude,
+                   megabytes('addon_sync_max_file_mb'), megabytes('addon_sync_max_addon_mb'))
+
+    def _excluded(self, rel, name):
+        return any(fnmatch.fnmatchcase(name, p) for p in self.exclude_names) or \
+            any(fnmatch.fnmatchcase(rel, p) for p in self.exclude_paths)
+
+    def _included(self, rel):
+        if not self.include_names and not self.include_paths:
+            return True
+        parts = rel.split('/')
+        for i, name in enumerate(parts):
+            prefix = '/'.join(parts[:i + 1])
+            if any(fnmatch.fnmatchcase(name, p) for p in self.include_names) or \
+                    any(fnmatch.fnmatchcase(prefix, p) for p in self.include_paths):
+                return True
+        return False
+
+    def scan(self, root):
+        """Walk root (sorted, excluded folders pruned) and apply the rules; returns a ScanReport."""
+        report = ScanReport()
+        state_rel = os.path.relpath(sync_state.STATE_DIR, root).replace(os.sep, '/')
+        by_addon = {}
+        for dirpath, dirs, files in os.walk(root):
+            rel_root = os.path.relpath(dirpath, root).replace(os.sep, '/')
+            rel_root = '' if rel_root == '.' else rel_root
+            keep = []
+            for d in sorted(dirs):
+                rel = f"{rel_root}/{d}" if rel_root else d
+                if rel == state_rel:
+                    continue
+                if self._excluded(rel, d):
+                    report.pruned.append(rel)
+                else:
+                    keep.append(d)
+            dirs[:] = keep
+            for name in sorted(files):
+                rel = f"{rel_root}/{name}" if rel_root else name
+                abs_path = os.path.join(dirpath, name)
+                try:
+                    st = os.stat(abs_path)
+                except OSError:
+                    continue
+                if self._excluded(rel, name) or not self._included(rel):
+                    report.excluded[0] += 1
+                    report.excluded[1] += st.st_size
+                elif self.max_file_size and st.st_size > self.max_file_size:
+                    report.too_large.append((rel, st.st_size))
+                else:
+                    by_addon.setdefault(rel.split('/', 1)[0] if rel_root else '', []).append((rel, abs_path, st))
+        for addon_dir, entries in by_addon.items():
+            size = sum(st.st_size for _, _, st in entries)
+            if self.max_addon_size and size > self.max_addon_size:
+                report.over_cap.append((addon_dir, size))
+                continue
+            report.files.extend(entries)
+            report.addons[addon_dir] = [len(entries), size]
+        return report
+
+
+def format_report(report):
+    _l = ADDON.getLocalizedString
+    lines = [f"[B]{_l(30182).format(files=len(report.files), size=_format_size(report.size))}[/B]", '']
+    largest = sorted(report.addons.items(), key=lambda item: -item[1][1])[:REPORT_TOP_ADDONS]
+    if largest:
+        lines.append(_l(30183))
+        lines.extend(f"  {name or '/'}: {n} / {_format_size(size)}" for name, (n, size) in largest)
+        lines.append('')
+    if report.pruned:
+        lines.append(_l(30184).format(count=len(report.pruned)))
+        lines.extend(f"  {rel}" for rel in report.pruned)
+    if report.excluded[0]:
+        lines.append(_l(30185).format(count=report.excluded[0], size=_format_size(report.excluded[1])))
+    if report.too_large:
+        lines.append(_l(30186).format(count=len(report.too_large),
+                                      size=_format_size(sum(size for _, size in report.too_large))))
+        lines.extend(f"  {rel}: {_format_size(size)}" for rel, size in report.too_large)
+    if report.over_cap:
+        lines.append(_l(30187))
+        lines.extend(f"  {name or '/'}: {_format_size(size)}" for name, size in report.over_cap)
+    return '\n'.join(lines)
+
+
+def run_scan_report():
+    """Plugin entry: show what the next addon_data sync would ship with the current rules."""
+    root = xbmcvfs.translatePath('special://userdata/addon_data')
+    report = SyncFilter.from_settings().scan(root)
+    xbmc.log(f"{LOG_PREFIX} addon_data scan: {report.summary()}", xbmc.LOGINFO)
+    xbmcgui.Dialog().textviewer(ADDON.getLocalizedString(30181), format_report(report))
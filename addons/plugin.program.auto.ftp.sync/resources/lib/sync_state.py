@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+"""
+Local sync state: remembers size/mtime/hash of every artifact last pushed to each connection profile,
+so unchanged files are not uploaded again. Stored as JSON under
+addon_data/plugin.program.auto.ftp.sync/sync_state/ (excluded from the addon_data sync archive).
+
+Remote manifest: the main system publishes auto_fav_sync/<custom_folder>/manifest.json
+({'generation': n, 'artifacts': {name: {'hash', 'size'}}}); secondaries compare it with the
+hashes they last applied (applied.json) and only download artifacts that changed.
+"""
+import hashlib
+import json
+import os
+import threading
+
+import xbmc
+import xbmcaddon
+import xbmcvfs
+
+ADDON = xbmcaddon.Addon()
+STATE_DIRNAME = 'sync_state'
+STATE_DIR = os.path.join(xbmcvfs.translatePath(ADDON.getAddonInfo('profile')), STATE_DIRNAME)
+STATE_FILE = os.path.join(STATE_DIR, 'uploads.json')
+APPLIED_FILE = os.path.join(STATE_DIR, 'applied.json')
+MANIFEST_NAME = 'manifest.json'
+HASH_CHUNK = 1024 * 1024
+LOG_PREFIX = "[AutoFTP]"
+
+
+def file_hash(path):
+    """SHA-256 hex digest of a local file (read in chunks)."""
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def tree_signature(files):
+    """Hash over (rel, size, mtime) of (rel, abs_path, stat) tuples; changes whenever an archive of them would."""
+    h = hashlib.sha256()
+    for rel, _, st in sorted(files, key=lambda f: f[0]):
+        h.update(f"{rel}\0{st.st_size}\0{int(st.st_mtime)}\n".encode('utf-8'))
+    return h.hexdigest()
+
+
+def profile_key(profile):
+    """Stable key for a connection profile dict (as returned by _get_active_profile_settings)."""
+    return "{}://{}@{}/{}".format(
+        profile.get('connection_type', 'ftp'), profile.get('user', ''),
+        profile.get('host', ''), (profile.get('base_path') or '').strip('/'))
+
+
+def read_manifest(path):
+    """Parse a downloaded manifest; returns None if missing or invalid."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or not isinstance(manifest.get('artifacts'), dict):
+        return None
+    manifest['generation'] = int(manifest.get('generation') or 0)
+    return manifest
+
+
+def updated_manifest(manifest, artifacts):
+    """
+    Merge artifacts ({name: {'hash', 'size'}}) into manifest (may be None).
+    Returns the new manifest with generation + 1, or None if nothing changed.
+    """
+    manifest = manifest or {'generation': 0, 'artifacts': {}}
+    merged = dict(manifest['artifacts'])
+    for name, entry in artifacts.items():
+        merged[name] = {'hash': entry['hash'], 'size': entry['size']}
+    if merged == manifest['artifacts']:
+        return None
+    return {'generation': manifest['generation'] + 1, 'artifacts': merged}
+
+
+class SyncState:
+    """JSON-backed store: {profile_key: {remote_path: {'size', 'mtime', 'hash'}}}. Thread-safe."""
+    def __init__(self, path=STATE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._dirty = False
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                self._data = json.load(f)
+        except (OSError, ValueError):
+            self._data = {}
+
+    def get(self, profile, remote_path):
+        with self._lock:
+            return dict(self._data.get(profile, {}).get(remote_path) or {})
+
+    def signature(self, profile, remote_path, local_path):
+        """
+        Return (unchanged, signature) for local_path against the last upload to remote_path.
+        The file is only hashed when size or mtime differ from the stored record.
+        """
+        st = os.stat(local_path)
+        sig = {'size': st.st_size, 'mtime': int(st.st_mtime)}
+        last = self.get(profile, remote_path)
+        if last and last.get('size') == sig['size'] and last.get('mtime') == sig['mtime'] and last.get('hash'):
+            sig['hash'] = last['hash']
+            return True, sig
+        sig['hash'] = file_hash(local_path)
+        return bool(last) and last.get('hash') == sig['hash'] and last.get('size') == sig['size'], sig
+
+    def record(self, profile, remote_path, signature):
+        with self._lock:
+            self._data.setdefault(profile, {})[remote_path] = dict(signature)
+            self._dirty = True
+
+    def forget(self, profile, remote_path):
+        with self._lock:
+            if self._data.get(profile, {}).pop(remote_path, None) is not None:
+                self._dirty = True
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                tmp = self.path + '.tmp'
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    json.dump(self._data, f)
+                os.replace(tmp, self.path)
+                self._dirty = False
+            except OSError as e:
+                xbmc.log(f"{LOG_PREFIX} Sync state not saved: {e}", xbmc.LOGERROR)
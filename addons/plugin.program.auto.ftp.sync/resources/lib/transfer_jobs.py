@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Transfer jobs: queue uploads/downloads and run them on a bounded thread pool.
+Each job reports a JobResult; callers aggregate them (e.g. into the favourites notifications).
+Backends are shared between workers: FTPBackend/WebDAVBackend hand each worker its own pooled connection,
+xbmcvfs backends are safe to call from several threads.
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import xbmc
+
+UPLOAD = 'upload'
+DOWNLOAD = 'download'
+# Default worker count per connection type (settings transfer_workers_<type> override this)
+DEFAULT_WORKERS = {'ftp': 4, 'sftp': 2, 'smb': 4, 'webdav': 4}
+MAX_WORKERS = 16
+LOG_PREFIX = "[AutoFTP]"
+
+
+class TransferJob:
+    """
+    One upload or download between local_path and remote_path.
+    then: optional follow-up TransferJob run in the same worker afterwards (e.g. overwrite with a
+    specific folder's file); the chain succeeds if any of its transfers succeeded.
+    """
+    def __init__(self, direction, local_path, remote_path, label='', then=None):
+        self.direction = direction
+        self.local_path = local_path
+        self.remote_path = remote_path
+        self.label = label or remote_path
+        self.then = then
+
+    def run(self, backend):
+        if self.direction == UPLOAD:
+            return backend.upload(self.local_path, self.remote_path)
+        return backend.download(self.remote_path, self.local_path)
+
+
+class JobResult:
+    """Outcome of a TransferJob (including its follow-up chain)."""
+    def __init__(self, job, ok, duration, error=None):
+        self.job = job
+        self.ok = ok
+        self.duration = duration
+        self.error = error
+
+    @property
+    def label(self):
+        return self.job.label
+
+
+def _run_chain(backend, job):
+    start = time.monotonic()
+    ok = False
+    error = None
+    current = job
+    while current is not None:
+        try:
+            ok = bool(current.run(backend)) or ok
+        except Exception as e:
+            error = str(e)
+            xbmc.log(f"{LOG_PREFIX} Transfer {current.label} failed: {e}", xbmc.LOGERROR)
+        current = current.then
+    return JobResult(job, ok, time.monotonic() - start, error)
+
+
+def get_worker_count(connection_type, configured=0):
+    """Worker count for a connection type; configured <= 0 means the built-in default."""
+    if configured and configured > 0:
+        return min(int(configured), MAX_WORKERS)
+    return DEFAULT_WORKERS.get((connection_type or 'ftp').lower(), 1)
+
+
+def run_jobs(backend, jobs, workers=1):
+    """
+    Run all jobs against backend on at most `workers` threads.
+    Returns list of JobResult in the order of jobs.
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return []
+    workers = max(1, min(int(workers or 1), len(jobs)))
+    start = time.monotonic()
+    if workers == 1:
+        results = [_run_chain(backend, job) for job in jobs]
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(lambda job: _run_chain(backend, job), jobs))
+    ok = sum(1 for r in results if r.ok)
+    xbmc.log(
+        f"{LOG_PREFIX} {ok}/{len(results)} transfers ok with {workers} workers "
+        f"in {time.monotonic() - start:.2f}s", xbmc.LOGINFO)
+    return results
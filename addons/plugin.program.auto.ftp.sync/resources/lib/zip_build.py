@@ -0,0 +1,356 @@
+# -*- coding: utf-8 -*-
+"""
+Parallel ZIP builder for addon_data.zip (compression method per file from zip_policy).
+Files are read in order by the calling thread and cut into blocks; the blocks are deflated on a thread pool
+(zlib releases the GIL) and written back in input order, so the archive is identical for any worker count.
+Large files are compressed pigz-style: each block is primed with the last 32 KiB of the previous one and ends
+with a sync flush, the last one with Z_FINISH, which concatenates into one valid deflate stream.
+RawZipWriter assembles the archive from precompressed data (zip64 when needed) and works on unseekable streams:
+single-block members carry their sizes in the local header, multi-block members use a data descriptor.
+Small stored members are passed through. Files the policy stores that span more than one block are written as
+deflate level 0 (stored deflate blocks, about 5 bytes per 64 KiB): their CRC and size come from the bytes actually
+read, so a file that changes or shrinks while it is archived still gives a consistent member.
+BZIP2/LZMA members are compressed as a whole by one worker.
+workers == 1 runs everything in the calling thread (single-core devices).
+ArchiveCache keeps the previous archive with an index of (size, mtime_ns) per member: unchanged files are
+copied as raw compressed bytes with their CRC, so only changed files are deflated again.
+"""
+import json
+import os
+import shutil
+import struct
+import time
+import zipfile
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from resources.lib import zip_policy
+
+BLOCK_SIZE = 1024 * 1024
+DICT_SIZE = 32 * 1024
+MAX_WORKERS = 8
+
+_LOCAL_HEADER = struct.Struct('<4sHHHHHIIIHH')
+_CENTRAL_HEADER = struct.Struct('<4sHHHHHHIIIHHHHHII')
+_END_RECORD = struct.Struct('<4sHHHHIIH')
+_ZIP64_END_RECORD = struct.Struct('<4sQHHIIQQQQ')
+_ZIP64_LOCATOR = struct.Struct('<4sIQI')
+_DESCRIPTOR = struct.Struct('<4sIII')
+_DESCRIPTOR64 = struct.Struct('<4sIQQ')
+_FLAG_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+_ZIP64_EXTRA = 0x0001
+_MAX32 = 0xFFFFFFFF
+_LOCAL_SIG = b'PK\x03\x04'
+_FLAG_ENCRYPTED = 0x01
+_CREATE_SYSTEM = 0 if os.name == 'nt' else 3
+_METHOD_VERSION = {zipfile.ZIP_BZIP2: 46, zipfile.ZIP_LZMA: 63}
+
+
+def get_worker_count(configured=0):
+    """Compression threads; configured <= 0 means one per CPU core (capped at MAX_WORKERS)."""
+    if configured and configured > 0:
+        return min(int(configured), MAX_WORKERS)
+    return max(1, min(os.cpu_count() or 1, MAX_WORKERS))
+
+
+def dos_date_time(mtime):
+    """(dos_date, dos_time) of a timestamp like zipfile (years before 1980 are clamped)."""
+    t = time.localtime(mtime)
+    if t.tm_year < 1980:
+        return (1 << 5) | 1, 0
+    return ((min(t.tm_year, 2107) - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday, \
+        (t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2)
+
+
+class ZipMember:
+    """Metadata of one archive member; sizes and CRC are filled in once known."""
+    def __init__(self, name, mtime, mode, method=zipfile.ZIP_DEFLATED, usize_hint=0):
+        self.name = name
+        self.date, self.time = dos_date_time(mtime)
+        self.external_attr = (mode & 0xFFFF) << 16
+        self.method = method
+        self.zip64 = usize_hint * 1.05 > zipfile.ZIP64_LIMIT
+        self.flags = 0
+        self.crc = 0
+        self.csize = 0
+        self.usize = 0
+        self.offset = 0
+
+
+class RawZipWriter:
+    """
+    Write a ZIP archive from already compressed member data to a (possibly unseekable) binary stream.
+    add() writes a member whose sizes are known; begin()/write()/finish() stream one with a data descriptor.
+    """
+    def __init__(self, out):
+        self._out = out
+        self.offset = 0
+        self.members = []
+
+    def _emit(self, data):
+        self._out.write(data)
+        self.offset += len(data)
+
+    def add(self, member, data):
+        """Member with crc/csize/usize set; data = raw compressed bytes (or an iterable of bytes)."""
+        self._header(member, descriptor=False)
+        for chunk in ([data] if isinstance(data, (bytes, bytearray)) else data):
+            self._emit(chunk)
+        self.members.append(member)
+
+    def begin(self, member):
+        self._header(member, descriptor=True)
+
+    def write(self, data):
+        self._emit(data)
+
+    def finish(self, member):
+        """End a member started with begin(); crc/csize/usize must be set now."""
+        if member.zip64:
+            self._emit(_DESCRIPTOR64.pack(b'PK\x07\x08', member.crc, member.csize, member.usize))
+        elif member.csize > _MAX32 or member.usize > _MAX32:
+            raise zipfile.LargeZipFile(f"{member.name}: grew beyond the zip64 limit while archiving")
+        else:
+            self._emit(_DESCRIPTOR.pack(b'PK\x07\x08', member.crc, member.csize, member.usize))
+        self.members.append(member)
+
+    @staticmethod
+    def _version(member):
+        return max(_METHOD_VERSION.get(member.method, 20), 45 if member.zip64 else 20)
+
+    def _header(self, member, descriptor):
+        try:
+            name = member.name.encode('ascii')
+        except UnicodeEncodeError:
+            name = member.name.encode('utf-8')
+            member.flags |= _FLAG_UTF8
+        if descriptor:
+            member.flags |= _FLAG_DESCRIPTOR
+            crc = csize = usize = 0
+        else:
+            member.zip64 = member.zip64 or member.csize > zipfile.ZIP64_LIMIT or member.usize > zipfile.ZIP64_LIMIT
+            crc, csize, usize = member.crc, member.csize, member.usize
+        extra = b''
+        if member.zip64:
+            extra = struct.pack('<HHQQ', _ZIP64_EXTRA, 16, usize, csize)
+            csize = usize = _MAX32
+        member.offset = self.offset
+        self._emit(_LOCAL_HEADER.pack(
+            _LOCAL_SIG, self._version(member), member.flags, member.method, member.time, member.date,
+            crc, csize, usize, len(name), len(extra)) + name + extra)
+
+    def close(self):
+        """Write the central directory and the end records."""
+        start = self.offset
+        for m in self.members:
+            name = m.name.encode('utf-8' if m.flags & _FLAG_UTF8 else 'ascii')
+            values = []
+            usize, csize, offset = m.usize, m.csize, m.offset
+            if usize > zipfile.ZIP64_LIMIT:
+                values.append(usize)
+                usize = _MAX32
+            if csize > zipfile.ZIP64_LIMIT:
+                values.append(csize)
+                csize = _MAX32
+            if offset > zipfile.ZIP64_LIMIT:
+                values.append(offset)
+                offset = _MAX32
+            extra = struct.pack('<HH%dQ' % len(values), _ZIP64_EXTRA, 8 * len(values), *values) if values else b''
+            version = max(self._version(m), 45 if values else 20)
+            self._emit(_CENTRAL_HEADER.pack(
+                b'PK\x01\x02', (_CREATE_SYSTEM << 8) | version, version, m.flags, m.method, m.time, m.date,
+                m.crc, csize, usize, len(name), len(extra), 0, 0, 0, m.external_attr, offset) + name + extra)
+        count, size = len(self.members), self.offset - start
+        if count >= zipfile.ZIP_FILECOUNT_LIMIT or size > zipfile.ZIP64_LIMIT or start > zipfile.ZIP64_LIMIT:
+            end64 = self.offset
+            self._emit(_ZIP64_END_RECORD.pack(b'PK\x06\x06', 44, 45, 45, 0, 0, count, count, size, start))
+            self._emit(_ZIP64_LOCATOR.pack(b'PK\x06\x07', 0, end64, 1))
+            count, size, start = min(count, 0xFFFF), min(size, _MAX32), min(start, _MAX32)
+        self._emit(_END_RECORD.pack(b'PK\x05\x06', 0, 0, count, count, size, start, 0))
+        self._out.flush()
+
+
+class ArchiveCache:
+    """
+    Previous archive (zip_path) and the index {arcname: [size, mtime_ns]} of the files it was built from.
+    open() before building, close() afterwards; store() makes a freshly built archive the next cache.
+    A missing or unreadable cache simply reuses nothing.
+    """
+    def __init__(self, zip_path, index_path=None):
+        self.zip_path = zip_path
+        self.index_path = index_path or os.path.splitext(zip_path)[0] + '.json'
+        self._index = {}
+        self._infos = {}
+        self._file = None
+
+    def open(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            with zipfile.ZipFile(self.zip_path) as zf:
+                infos = {i.filename: i for i in zf.infolist()}
+            self._file = open(self.zip_path, 'rb')
+            self._index, self._infos = (index if isinstance(index, dict) else {}), infos
+        except (OSError, ValueError, zipfile.BadZipFile):
+            self._index, self._infos = {}, {}
+        return self
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def lookup(self, arcname, st):
+        """ZipInfo of arcname in the previous archive if the file is unchanged since, else None."""
+        info = self._infos.get(arcname)
+        if info is None or self._file is None or info.flag_bits & _FLAG_ENCRYPTED:
+            return None
+        if self._index.get(arcname) != [st.st_size, st.st_mtime_ns] or info.file_size != st.st_size:
+            return None
+        return info
+
+    def raw(self, info, chunk_size=BLOCK_SIZE):
+        """Yield the compressed bytes of info as stored in the previous archive."""
+        self._file.seek(info.header_offset)
+        header = self._file.read(30)
+        if len(header) != 30 or header[:4] != _LOCAL_SIG:
+            raise zipfile.BadZipFile(f"{info.filename}: bad local header in archive cache")
+        name_len, extra_len = struct.unpack('<HH', header[26:30])
+        self._file.seek(name_len + extra_len, os.SEEK_CUR)
+        left = info.compress_size
+        while left:
+            data = self._file.read(min(left, chunk_size))
+            if not data:
+                raise zipfile.BadZipFile(f"{info.filename}: archive cache truncated")
+            left -= len(data)
+            yield data
+
+    def store(self, zip_path, files):
+        """Keep the archive just written to zip_path (hard link, else copy) and the index for files."""
+        self.close()
+        os.makedirs(os.path.dirname(self.zip_path), exist_ok=True)
+        tmp = self.zip_path + '.tmp'
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        try:
+            os.link(zip_path, tmp)
+        except OSError:
+            shutil.copyfile(zip_path, tmp)
+        os.replace(tmp, self.zip_path)
+        with open(self.index_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({arcname: [st.st_size, st.st_mtime_ns] for arcname, _, st in files}, f)
+        os.replace(self.index_path + '.tmp', self.index_path)
+
+
+def _deflate_block(data, zdict, last, level):
+    comp = zlib.compressobj(level, zlib.DEFLATED, -15, zdict=zdict) if zdict else \
+        zlib.compressobj(level, zlib.DEFLATED, -15)
+    return comp.compress(data) + comp.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def _done(value):
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+def build_zip(out, files, workers=1, policy=None, block_size=BLOCK_SIZE, cache=None):
+    """
+    Write a ZIP of files [(arcname, abs_path, stat), ...] to out, in the given order.
+    policy: zip_policy.CompressionPolicy choosing stored/deflate/BZIP2/LZMA per file (None = default policy).
+    At most 2 * workers compression jobs are in flight. cache: opened ArchiveCache to take unchanged members from.
+    Returns stats {'files', 'bytes_in', 'bytes_out', 'workers', 'reused', 'bytes_reused', 'policy'}.
+    """
+    workers = max(1, int(workers or 1))
+    policy = policy or zip_policy.CompressionPolicy()
+    policy_stats = zip_policy.PolicyStats()
+    writer = RawZipWriter(out)
+    # (member, kind, payload, first, last) in output order; kind: 'block' (future -> compressed block),
+    # 'whole' (future -> (data, crc, size)), 'raw' (copied from cache)
+    pending = deque()
+    reused = []
+    window = 2 * workers
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='zip-deflate') if workers > 1 else None
+
+    def submit(fn, *args):
+        if pool is None:
+            return _done(fn(*args))
+        return pool.submit(fn, *args)
+
+    def drain(limit):
+        while len(pending) > limit:
+            member, kind, payload, first, last = pending.popleft()
+            if kind == 'raw':
+                writer.add(member, cache.raw(payload, block_size))
+                continue
+            if kind == 'whole':
+                data, member.crc, member.usize = payload.result()
+                member.csize = len(data)
+                writer.add(member, data)
+            else:
+                data = payload.result()
+                member.csize += len(data)
+                if first and last:
+                    writer.add(member, data)
+                    policy_stats.add(member.method, member.usize, member.csize)
+                    continue
+                if first:
+                    writer.begin(member)
+                writer.write(data)
+                if not last:
+                    continue
+                writer.finish(member)
+            policy_stats.add(member.method, member.usize, member.csize)
+
+    try:
+        for arcname, path, st in files:
+            info = cache.lookup(arcname, st) if cache is not None else None
+            if info is not None:
+                member = ZipMember(arcname, st.st_mtime, st.st_mode, method=info.compress_type)
+                member.crc, member.csize, member.usize = info.CRC, info.compress_size, info.file_size
+                member.flags = info.flag_bits & zip_policy.member_flags(info.compress_type)
+                pending.append((member, 'raw', info, True, True))
+                reused.append(member)
+                drain(window)
+                continue
+            with open(path, 'rb') as f:
+                data = f.read(block_size)
+                method, level = policy.choose(path, st.st_size, head=data)
+                member = ZipMember(arcname, st.st_mtime, st.st_mode, method=method, usize_hint=st.st_size)
+                member.flags = zip_policy.member_flags(method)
+                if method in (zipfile.ZIP_BZIP2, zipfile.ZIP_LZMA):
+                    pending.append((member, 'whole', submit(zip_policy.compress_file, path, method, level, block_size),
+                                    True, True))
+                    drain(window)
+                    continue
+                if method == zipfile.ZIP_STORED and len(data) == block_size:
+                    # more than one block: sizes go into a data descriptor, which stored members cannot use
+                    method, level = zipfile.ZIP_DEFLATED, 0
+                    member.method = method
+                zdict, first = None, True
+                while True:
+                    following = f.read(block_size) if len(data) == block_size else b''
+                    member.crc = zlib.crc32(data, member.crc)
+                    member.usize += len(data)
+                    if method == zipfile.ZIP_STORED:
+                        job = _done(data)
+                    else:
+                        job = submit(_deflate_block, data, zdict, not following, level)
+                    pending.append((member, 'block', job, first, not following))
+                    drain(window)
+                    if not following:
+                        break
+                    zdict, data, first = data[-DICT_SIZE:], following, False
+        drain(0)
+        writer.close()
+    finally:
+        if pool is not None:
+            for entry in pending:
+                if isinstance(entry[2], Future):
+                    entry[2].cancel()
+            pool.shutdown(wait=True)
+    return {'files': len(writer.members), 'bytes_in': sum(m.usize for m in writer.members),
+            'bytes_out': writer.offset, 'workers': workers,
+            'reused': len(reused), 'bytes_reused': sum(m.usize for m in reused), 'policy': policy_stats.finish()}
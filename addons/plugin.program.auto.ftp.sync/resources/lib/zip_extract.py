@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+Change-aware ZIP extraction (addon_data.zip on secondaries, backup restore).
+A member is only written when the local file differs: same size and the CRC-32 from the central directory
+means it is skipped. Local CRCs are cached in sync_state/crc_index.json keyed by path with size + mtime,
+so an unchanged file is not even read again. Written members go to <path>.part and are moved into place.
+extract_files() runs on a bounded thread pool: every worker has its own ZipFile handle, the directory tree is
+created up front and progress callbacks are throttled.
+stats: written, skipped, bytes_written, bytes_skipped.
+"""
+import collections
+import os
+import shutil
+import threading
+import time
+import zipfile
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import xbmc
+
+from resources.lib import sync_state
+
+CRC_INDEX_FILE = os.path.join(sync_state.STATE_DIR, 'crc_index.json')
+CRC_CHUNK = 1024 * 1024
+DEFAULT_WORKERS = 4
+MAX_WORKERS = 8
+# Members queued per worker in extract_files
+QUEUE_FACTOR = 2
+# Minimum seconds between two progress callbacks
+PROGRESS_INTERVAL = 0.25
+LOG_PREFIX = "[AutoFTP]"
+
+
+def member_path(target_dir, name):
+    """Target path of member name below target_dir; drops drive letters, absolute prefixes and '..' like zipfile."""
+    name = os.path.splitdrive(name.replace('\\', '/'))[1]
+    parts = [p for p in name.split('/') if p not in ('', '.', '..')]
+    return os.path.join(target_dir, *parts) if parts else None
+
+
+def get_worker_count(configured=0):
+    """Extraction threads; configured <= 0 means DEFAULT_WORKERS."""
+    if configured and configured > 0:
+        return min(int(configured), MAX_WORKERS)
+    return DEFAULT_WORKERS
+
+
+def file_crc(path):
+    crc = 0
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(CRC_CHUNK)
+            if not chunk:
+                return crc
+            crc = zlib.crc32(chunk, crc)
+
+
+class CRCIndex:
+    """CRC-32 of local files, cached by path and only recomputed when size or mtime changed (thread-safe)."""
+    def __init__(self, path=CRC_INDEX_FILE):
+        self._state = sync_state.SyncState(path)
+
+    def crc(self, path, st):
+        entry = self._state.get('', path)
+        if entry.get('size') == st.st_size and entry.get('mtime_ns') == st.st_mtime_ns and 'crc' in entry:
+            return entry['crc']
+        crc = file_crc(path)
+        self.record(path, st, crc)
+        return crc
+
+    def record(self, path, st, crc):
+        self._state.record('', path, {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'crc': crc})
+
+    def save(self):
+        self._state.save()
+
+
+def local_matches(crc_index, path, size, crc):
+    """True if the local file at path has this size and CRC-32 (CRC taken from crc_index when possible)."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    return os.path.isfile(path) and st.st_size == size and crc_index.crc(path, st) == crc
+
+
+class ZipExtractor:
+    """
+    Extract members of a ZIP archive below target_dir, skipping files that already match.
+    crc_index: CRCIndex shared across runs (None = a fresh one on CRC_INDEX_FILE); workers: threads of extract_files.
+    """
+    def __init__(self, target_dir, crc_index=None, buffer_size=CRC_CHUNK, workers=1):
+        self.target_dir = target_dir
+        self.crc_index = crc_index or CRCIndex()
+        self.buffer_size = buffer_size
+        self.workers = max(1, int(workers or 1))
+        self.stats = {'written': 0, 'skipped': 0, 'bytes_written': 0, 'bytes_skipped': 0}
+        self._lock = threading.Lock()
+
+    def _count(self, key, size):
+        with self._lock:
+            self.stats[key] += 1
+            self.stats['bytes_' + key] += size
+
+    def extract_member(self, zf, info, make_dirs=True):
+        """
+        Extract one ZipInfo; returns True if written, False if skipped. Raises on errors (bad CRC, I/O).
+        make_dirs=False when the directory tree was created beforehand (extract_files).
+        """
+        path = member_path(self.target_dir, info.filename)
+        if path is None:
+            return False
+        if info.is_dir():
+            if make_dirs:
+                os.makedirs(path, exist_ok=True)
+            return False
+        if local_matches(self.crc_index, path, info.file_size, info.CRC):
+            self._count('skipped', info.file_size)
+            return False
+        if make_dirs:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        part = path + '.part'
+        try:
+            with zf.open(info) as src, open(part, 'wb') as dst:
+                shutil.copyfileobj(src, dst, self.buffer_size)  # zipfile checks the CRC at the end
+            os.replace(part, path)
+        finally:
+            if os.path.exists(part):
+                os.remove(part)
+        self.crc_index.record(path, os.stat(path), info.CRC)
+        self._count('written', info.file_size)
+        return True
+
+    def _make_tree(self, infos):
+        dirs = set()
+        for info in infos:
+            path = member_path(self.target_dir, info.filename)
+            if path is not None:
+                dirs.add(path if info.is_dir() else os.path.dirname(path))
+        for path in sorted(dirs):
+            os.makedirs(path, exist_ok=True)
+
+    def extract_files(self, zip_path, infos=None, progress=None, cancelled=None):
+        """
+        Extract infos (None = all members) of the archive at zip_path on self.workers threads.
+        progress(done, total, name) is called from the calling thread at most every PROGRESS_INTERVAL seconds
+        and once at the end; cancelled() -> True stops before the remaining members.
+        Returns a list of (name, error) for members that failed; stats hold the counts.
+        """
+        with zipfile.ZipFile(zip_path) as zf:
+            if infos is None:
+                infos = zf.infolist()
+            self._make_tree(infos)
+            members = [i for i in infos if not i.is_dir()]
+            errors = []
+            total = len(members)
+            last = 0.0
+
+            def report(done, name):
+                nonlocal last
+                now = time.monotonic()
+                if progress and (done == total or now - last >= PROGRESS_INTERVAL):
+                    last = now
+                    progress(done, total, name)
+
+            try:
+                if self.workers == 1 or total < 2:
+                    for done, info in enumerate(members, 1):
+                        if cancelled and cancelled():
+                            break
+                        try:
+                            self.extract_member(zf, info, make_dirs=False)
+                        except Exception as e:
+                            errors.append((info.filename, e))
+                        report(done, info.filename)
+                else:
+                    errors.extend(self._extract_parallel(zip_path, members, report, cancelled))
+            finally:
+                self.crc_index.save()
+        self.log()
+        return errors
+
+    def _extract_parallel(self, zip_path, members, report, cancelled):
+        local = threading.local()
+        handles = []
+        handles_lock = threading.Lock()
+        stop = threading.Event()
+
+        def work(info):
+            if stop.is_set():
+                return info, None, False
+            zf = getattr(local, 'zf', None)
+            if zf is None:
+                zf = local.zf = zipfile.ZipFile(zip_path)
+                with handles_lock:
+                    handles.append(zf)
+            try:
+                self.extract_member(zf, info, make_dirs=False)
+                return info, None, True
+            except Exception as e:
+                return info, e, True
+
+        errors = []
+        done = 0
+        workers = min(self.workers, len(members))
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='zip-extract') as pool:
+                # At most QUEUE_FACTOR members per worker in flight, so a cancel stops soon
+                pending = collections.deque()
+                todo = iter(members)
+                while True:
+                    while not stop.is_set() and len(pending) < workers * QUEUE_FACTOR:
+                        info = next(todo, None)
+                        if info is None:
+                            break
+                        pending.append(pool.submit(work, info))
+                    if not pending:
+                        break
+                    info, error, ran = pending.popleft().result()
+                    done += 1
+                    if error is not None:
+                        errors.append((info.filename, error))
+                    if ran:
+                        report(done, info.filename)
+                    if cancelled and not stop.is_set() and cancelled():
+                        stop.set()
+        finally:
+            for zf in handles:
+                zf.close()
+        return errors
+
+    def log(self):
+        st = self.stats
+        xbmc.log(f"{LOG_PREFIX} Extract {self.target_dir}: {st['written']} written ({st['bytes_written']} bytes), "
+                 f"{st['skipped']} unchanged ({st['bytes_skipped']} bytes not rewritten)", xbmc.LOGINFO)
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Per-file compression policy for the sync archive (zip_build) and backups (backup_restore).
+  stored:   already compressed types (by extension) and files whose first 64 KiB do not shrink at zlib level 1
+  text:     large XML/JSON/... with the configured text method (deflate 9, BZIP2 or LZMA)
+  deflate:  everything else at the configured level
+Members written with BZIP2/LZMA cannot be extracted while streaming; the addon_data download then falls
+back to a full download (zip_stream.UnsupportedArchive).
+"""
+import bz2
+import os
+import struct
+import time
+import zipfile
+import zlib
+
+try:
+    import lzma
+except ImportError:  # some Kodi builds ship without _lzma
+    lzma = None
+
+STORED_EXTENSIONS = frozenset((
+    '.jpg', '.jpeg', '.png', '.gif', '.webp', '.tbn', '.zip', '.gz', '.tgz', '.bz2', '.xz', '.7z', '.rar',
+    '.apk', '.jar', '.mp3', '.m4a', '.aac', '.ogg', '.opus', '.flac', '.mp4', '.m4v', '.mkv', '.avi', '.webm',
+))
+TEXT_EXTENSIONS = frozenset(('.xml', '.json', '.txt', '.log', '.nfo', '.csv', '.html', '.htm', '.js', '.m3u', '.m3u8'))
+# Text method choices (setting zip_text_method)
+TEXT_METHODS = (zipfile.ZIP_DEFLATED, zipfile.ZIP_BZIP2, zipfile.ZIP_LZMA)
+METHOD_NAMES = {zipfile.ZIP_STORED: 'stored', zipfile.ZIP_DEFLATED: 'deflate',
+                zipfile.ZIP_BZIP2: 'bzip2', zipfile.ZIP_LZMA: 'lzma'}
+DEFAULT_LEVEL = 6
+SAMPLE_SIZE = 64 * 1024
+SAMPLE_MIN = 16 * 1024  # smaller files are deflated without sampling
+INCOMPRESSIBLE_RATIO = 0.95
+TEXT_MIN = 64 * 1024
+# Larger text files stay on deflate: BZIP2/LZMA members are compressed as a whole in one worker
+WHOLE_FILE_MAX = 64 * 1024 * 1024
+_LZMA_FLAG_EOS = 0x02
+
+
+class CompressionPolicy:
+    """choose() picks (method, level) per file; level is the deflate level (1-9) for everything else."""
+    def __init__(self, level=DEFAULT_LEVEL, text_method=zipfile.ZIP_DEFLATED):
+        self.level = min(9, max(1, int(level or DEFAULT_LEVEL)))
+        if text_method == zipfile.ZIP_LZMA and lzma is None:
+            text_method = zipfile.ZIP_DEFLATED
+        self.text_method = text_method
+
+    @classmethod
+    def from_settings(cls, level, text_method_idx):
+        """Policy from the settings zip_level and zip_text_method (index into TEXT_METHODS)."""
+        try:
+            text_method = TEXT_METHODS[int(text_method_idx)]
+        except (ValueError, TypeError, IndexError):
+            text_method = zipfile.ZIP_DEFLATED
+        try:
+            level = int(level)
+        except (ValueError, TypeError):
+            level = DEFAULT_LEVEL
+        return cls(level, text_method)
+
+    def choose(self, path, size, head=None):
+        """(method, level) for the file at path; head = its first bytes if already read (else sampled here)."""
+        ext = os.path.splitext(path)[1].lower()
+        if ext in STORED_EXTENSIONS:
+            return zipfile.ZIP_STORED, 0
+        if ext in TEXT_EXTENSIONS and size >= TEXT_MIN:
+            if self.text_method == zipfile.ZIP_DEFLATED or size > WHOLE_FILE_MAX:
+                return zipfile.ZIP_DEFLATED, 9
+            return self.text_method, 9
+        if size >= SAMPLE_MIN:
+            if head is None:
+                try:
+                    with open(path, 'rb') as f:
+                        head = f.read(SAMPLE_SIZE)
+                except OSError:
+                    head = b''
+            sample = head[:SAMPLE_SIZE]
+            if sample and len(zlib.compress(sample, 1)) >= len(sample) * INCOMPRESSIBLE_RATIO:
+                return zipfile.ZIP_STORED, 0
+        return zipfile.ZIP_DEFLATED, self.level
+
+
+class _LZMACompressor:
+    """LZMA member data as zipfile writes it: version, properties size, LZMA1 properties, raw stream."""
+    _FILTER = {'id': lzma.FILTER_LZMA1, 'dict_size': 1 << 23, 'lc': 3, 'lp': 0, 'pb': 2} if lzma else None
+    _PROPS = struct.pack('<BI', (2 * 5 + 0) * 9 + 3, 1 << 23)
+
+    def __init__(self):
+        self._comp = lzma.LZMACompressor(lzma.FORMAT_RAW, filters=[self._FILTER])
+        self._header = struct.pack('<BBH', 9, 4, len(self._PROPS)) + self._PROPS
+
+    def compress(self, data):
+        out, self._header = self._header + self._comp.compress(data), b''
+        return out
+
+    def flush(self):
+        out, self._header = self._header + self._comp.flush(), b''
+        return out
+
+
+def member_flags(method):
+    """Extra general purpose flags zipfile sets for method (LZMA: end-of-stream marker present)."""
+    return _LZMA_FLAG_EOS if method == zipfile.ZIP_LZMA else 0
+
+
+def compress_file(path, method, level, chunk_size=1024 * 1024):
+    """Compress a whole file with BZIP2 or LZMA; returns (data, crc, size)."""
+    comp = bz2.BZ2Compressor(level) if method == zipfile.ZIP_BZIP2 else _LZMACompressor()
+    parts = []
+    crc = size = 0
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+            parts.append(comp.compress(chunk))
+    parts.append(comp.flush())
+    return b''.join(parts), crc, size
+
+
+class PolicyStats:
+    """Per-run counters per method: files, bytes in, bytes out; plus CPU time of the whole run."""
+    def __init__(self):
+        self.methods = {}
+        self._cpu_start = time.process_time()
+        self.cpu = 0.0
+
+    def add(self, method, size_in, size_out):
+        entry = self.methods.setdefault(METHOD_NAMES.get(method, str(method)), [0, 0, 0])
+        entry[0] += 1
+        entry[1] += size_in
+        entry[2] += size_out
+
+    def finish(self):
+        self.cpu = time.process_time() - self._cpu_start
+        return self
+
+    @property
+    def saved(self):
+        return sum(size_in - size_out for _, size_in, size_out in self.methods.values())
+
+    def summary(self):
+        parts = [f"{name} {n} ({size_in} -> {size_out} B)" for name, (n, size_in, size_out) in sorted(self.methods.items())]
+        return f"{', '.join(parts) or 'no files'}; saved {self.saved} B for {self.cpu:.1f} s CPU"
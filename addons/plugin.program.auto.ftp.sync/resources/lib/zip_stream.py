@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+"""
+Streaming helpers for the addon_data archive: a bounded in-memory pipe between a producer thread
+and a consumer, so the archive never lands on local storage. At most max_chunks * chunk_size bytes are
+buffered; the writer blocks while the consumer is behind, and either side failing stops the other.
+  upload:   zipfile writes into the pipe, backend.upload_stream reads from it
+  download: backend.download_stream writes into the pipe, StreamingUnzip extracts members as they arrive
+"""
+import hashlib
+import os
+import queue
+import struct
+import threading
+import zlib
+
+import xbmc
+
+from resources.lib import zip_extract
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+DEFAULT_MAX_CHUNKS = 8
+# How often (seconds) a blocked writer checks whether the reader gave up
+_PUT_POLL = 0.5
+_EOF = object()
+LOG_PREFIX = "[AutoFTP]"
+
+_LOCAL_SIG = b'PK\x03\x04'
+_DESCRIPTOR_SIG = b'PK\x07\x08'
+# Local header after the signature: version, flags, method, time, date, crc, csize, usize, name_len, extra_len
+_LOCAL_HEADER = struct.Struct('<HHHHHIIIHH')
+_FLAG_ENCRYPTED = 0x01
+_FLAG_DESCRIPTOR = 0x08
+_FLAG_UTF8 = 0x800
+_STORED = 0
+_DEFLATED = 8
+_ZIP64_EXTRA = 0x0001
+
+
+class BoundedPipe:
+    """
+    File-like pipe: the producer calls write()/close(error), the consumer calls read(n) until b''.
+    The writer side counts size and SHA-256 of everything written (the archive as stored remotely).
+    """
+    def __init__(self, chunk_size=DEFAULT_CHUNK_SIZE, max_chunks=DEFAULT_MAX_CHUNKS):
+        self.chunk_size = max(1, chunk_size)
+        self._queue = queue.Queue(max(1, max_chunks))
+        self._pending = bytearray()
+        self._buf = b''
+        self._aborted = threading.Event()
+        self._sha256 = hashlib.sha256()
+        self.size = 0
+        self.complete = False  # reader reached a clean end of stream
+
+    # producer side
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        if self._aborted.is_set():
+            raise BrokenPipeError("reader closed the pipe")
+        self._pending += data
+        self._sha256.update(data)
+        self.size += len(data)
+        while len(self._pending) >= self.chunk_size:
+            self._put(bytes(self._pending[:self.chunk_size]))
+            del self._pending[:self.chunk_size]
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def _put(self, item):
+        while True:
+            if self._aborted.is_set():
+                raise BrokenPipeError("reader closed the pipe")
+            try:
+                self._queue.put(item, timeout=_PUT_POLL)
+                return
+            except queue.Full:
+                continue
+
+    def close(self, error=None):
+        """End of stream; error (an exception) makes the reader fail instead of seeing a clean EOF."""
+        if error is None and self._pending:
+            self._put(bytes(self._pending))
+        self._pending.clear()
+        self._put(error if error is not None else _EOF)
+
+    def hexdigest(self):
+        return self._sha256.hexdigest()
+
+    # consumer side
+
+    def read(self, n=-1):
+        while not self._buf and not self.complete:
+            item = self._queue.get()
+            if item is _EOF:
+                self.complete = True
+            elif isinstance(item, BaseException):
+                self._aborted.set()
+                raise IOError(f"archive stream failed: {item}")
+            else:
+                self._buf = item
+        if n is None or n < 0:
+            n = len(self._buf)
+        data, self._buf = self._buf[:n], self._buf[n:]
+        return data
+
+    def abort(self):
+        """Reader gives up: the blocked writer raises BrokenPipeError."""
+        self._aborted.set()
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+
+
+def run_pipeline(produce, consume, chunk_size=DEFAULT_CHUNK_SIZE, max_chunks=DEFAULT_MAX_CHUNKS):
+    """
+    Run produce(pipe) in a worker thread while consume(pipe) reads in the calling thread.
+    Both return truthy on success. Returns (ok, pipe); ok only if both succeeded and the whole stream was read.
+    """
+    pipe = BoundedPipe(chunk_size, max_chunks)
+
+    def producer():
+        try:
+            ok = produce(pipe)
+            pipe.close(None if ok else IOError("producer failed"))
+        except BrokenPipeError:
+            pass
+        except Exception as e:
+            xbmc.log(f"{LOG_PREFIX} Archive stream: {e}", xbmc.LOGERROR)
+            try:
+                pipe.close(e)
+            except BrokenPipeError:
+                pass
+
+    worker = threading.Thread(target=producer, name='zip-stream', daemon=True)
+    worker.start()
+    ok = False
+    try:
+        ok = bool(consume(pipe))
+    finally:
+        if not pipe.complete:
+            pipe.abort()
+        worker.join()
+    return ok and pipe.complete, pipe
+
+
+class UnsupportedArchive(Exception):
+    """The archive uses a feature StreamingUnzip cannot handle (the caller falls back to a full download)."""
+
+
+class _Reader:
+    """Forward-only reader over stream.read with push-back (deflate reads past the end of a member)."""
+    def __init__(self, read, buffer_size):
+        self._read = read
+        self.buffer_size = buffer_size
+        self._buf = b''
+
+    def read(self, n):
+        if self._buf:
+            data, self._buf = self._buf[:n], self._buf[n:]
+            return data
+        return self._read(min(n, self.buffer_size))
+
+    def exact(self, n):
+        parts = []
+        while n:
+            data = self.read(n)
+            if not data:
+                raise EOFError("archive ends inside a member")
+            parts.append(data)
+            n -= len(data)
+        return b''.join(parts)
+
+    def unread(self, data):
+        self._buf = data + self._buf
+
+    def drain(self):
+        while self.read(self.buffer_size):
+            pass
+
+
+class StreamingUnzip:
+    """
+    Extract a ZIP archive from a forward-only stream by walking its local file headers; the central directory
+    at the end is not needed. Each member is written to <path>.part, checked against its CRC-32 and moved into
+    place, so a broken download never leaves a half-written file. Stored and deflated members are supported;
+    deflated members may carry their sizes in a data descriptor (archives written to a stream).
+    Members whose local header carries size and CRC are skipped without inflating when the local file already
+    matches (zip_extract.CRCIndex). unsupported is set when extract() stopped at a feature it cannot stream.
+    staged=True keeps the checked <path>.part files until commit() moves them all into place (e.g. once the
+    hash of the whole archive is verified); discard() removes them instead.
+    """
+    def __init__(self, target_dir, buffer_size=DEFAULT_CHUNK_SIZE, crc_index=None, staged=False):
+        self.target_dir = target_dir
+        self.buffer_size = max(1024, buffer_size)
+        self.crc_index = crc_index or zip_extract.CRCIndex()
+        self.staged = staged
+        self._pending = []  # staged: (part, path, crc) waiting for commit()
+        self.unsupported = False
+        self.stats = {'written': 0, 'skipped': 0, 'bytes_written': 0, 'bytes_skipped': 0, 'dirs': 0}
+
+    def extract(self, stream):
+        """Extract everything from stream (stream.read(n)); returns True on success, False on a broken archive."""
+        reader = _Reader(stream.read, self.buffer_size)
+        try:
+            while reader.exact(4) == _LOCAL_SIG:
+                self._member(reader)
+            if not self.stats['written'] and not self.stats['skipped'] and not self.stats['dirs']:
+                raise EOFError("no ZIP members in stream")
+            reader.drain()  # central directory: the consumer must read to the end of the stream
+        except UnsupportedArchive as e:
+            self.unsupported = True
+            xbmc.log(f"{LOG_PREFIX} Archive cannot be streamed: {e}", xbmc.LOGWARNING)
+            return False
+        except (OSError, EOFError, zlib.error, struct.error, UnicodeDecodeError) as e:
+            xbmc.log(f"{LOG_PREFIX} Streamed extraction failed: {e}", xbmc.LOGERROR)
+            return False
+        finally:
+            self.crc_index.save()
+        st = self.stats
+        xbmc.log(f"{LOG_PREFIX} Streamed extraction: {st['written']} written ({st['bytes_written']} bytes), "
+                 f"{st['skipped']} unchanged ({st['bytes_skipped']} bytes not rewritten)", xbmc.LOGINFO)
+        return True
+
+    def commit(self):
+        """Move the staged members into place; returns how many were moved."""
+        moved = 0
+        try:
+            while self._pending:
+                part, path, crc = self._pending.pop(0)
+                os.replace(part, path)
+                self.crc_index.record(path, os.stat(path), crc)
+                moved += 1
+        finally:
+            self.crc_index.save()
+            self.discard()
+        return moved
+
+    def discard(self):
+        """Remove the staged members (archive rejected); the files in target_dir stay as they were."""
+        for part, _, _ in self._pending:
+            if os.path.exists(part):
+                os.remove(part)
+        self._pending = []
+
+    def _member(self, reader):
+        _, flags, method, _, _, crc, csize, usize, name_len, extra_len = _LOCAL_HEADER.unpack(
+            reader.exact(_LOCAL_HEADER.size))
+        raw_name = reader.exact(name_len)
+        extra = reader.exact(extra_len)
+        name = raw_name.decode('utf-8' if flags & _FLAG_UTF8 else 'cp437')
+        zip64 = self._zip64_sizes(extra, csize, usize)
+        if zip64:
+            csize, usize = zip64
+        if flags & _FLAG_ENCRYPTED:
+            raise UnsupportedArchive(f"{name}: encrypted")
+        if method not in (_STORED, _DEFLATED):
+            raise UnsupportedArchive(f"{name}: compression method {method}")
+        if method == _STORED and flags & _FLAG_DESCRIPTOR:
+            raise UnsupportedArchive(f"{name}: stored member without sizes")
+
+        path = zip_extract.member_path(self.target_dir, name)
+        if path is None or name.endswith('/'):
+            if path is not None:
+                os.makedirs(path, exist_ok=True)
+                self.stats['dirs'] += 1
+            if not flags & _FLAG_DESCRIPTOR:
+                self._skip(reader, csize)
+            return
+        if not flags & _FLAG_DESCRIPTOR and zip_extract.local_matches(self.crc_index, path, usize, crc):
+            self._skip(reader, csize)
+            self.stats['skipped'] += 1
+            self.stats['bytes_skipped'] += usize
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        part = path + '.part'
+        try:
+            with open(part, 'wb') as out:
+                if method == _STORED:
+                    written, actual_crc = self._copy_stored(reader, out, csize)
+                else:
+                    written, actual_crc = self._inflate(reader, out)
+            if flags & _FLAG_DESCRIPTOR:
+                crc, usize = self._descriptor(reader, bool(zip64))
+            if actual_crc != crc or written != usize:
+                raise IOError(f"{name}: CRC or size mismatch")
+            if self.staged:
+                self._pending.append((part, path, crc))
+            else:
+                os.replace(part, path)
+        except BaseException:
+            if os.path.exists(part):
+                os.remove(part)
+            raise
+        if not self.staged:
+            self.crc_index.record(path, os.stat(path), crc)
+        self.stats['written'] += 1
+        self.stats['bytes_written'] += written
+
+    @staticmethod
+    def _zip64_sizes(extra, csize, usize):
+        """(csize, usize) from a zip64 extra field, or None if the member has none."""
+        pos = 0
+        while pos + 4 <= len(extra):
+            header_id, size = struct.unpack_from('<HH', extra, pos)
+            if header_id == _ZIP64_EXTRA:
+                values = list(struct.unpack_from('<%dQ' % (size // 8), extra, pos + 4))
+                if usize == 0xFFFFFFFF and values:
+                    usize = values.pop(0)
+                if csize == 0xFFFFFFFF and values:
+                    csize = values.pop(0)
+                return csize, usize
+            pos += 4 + size
+        return None
+
+    def _skip(self, reader, size):
+        while size:
+            data = reader.read(min(size, self.buffer_size))
+            if not data:
+                raise EOFError("archive ends inside a member")
+            size -= len(data)
+
+    def _copy_stored(self, reader, out, size):
+        crc = 0
+        left = size
+        while left:
+            data = reader.read(min(left, self.buffer_size))
+            if not data:
+                raise EOFError("archive ends inside a member")
+            out.write(data)
+            crc = zlib.crc32(data, crc)
+            left -= len(data)
+        return size, crc
+
+    def _inflate(self, reader, out):
+        """Inflate until the deflate stream ends (sizes may only follow in a data descriptor)."""
+        inflater = zlib.decompressobj(-15)
+        crc = 0
+        written = 0
+        while not inflater.eof:
+            data = reader.read(self.buffer_size)
+            if not data:
+                raise EOFError("archive ends inside a member")
+            while data and not inflater.eof:
+                chunk = inflater.decompress(data, self.buffer_size)
+                out.write(chunk)
+                crc = zlib.crc32(chunk, crc)
+                written += len(chunk)
+                data = inflater.unconsumed_tail
+        reader.unread(inflater.unused_data)
+        return written, crc
+
+    @staticmethod
+    def _descriptor(reader, zip64):
+        """(crc, usize) from the data descriptor after a member (signature optional)."""
+        head = reader.exact(4)
+        if head == _DESCRIPTOR_SIG:
+            head = reader.exact(4)
+        crc = struct.unpack('<I', head)[0]
+        if zip64:
+            _, usize = struct.unpack('<QQ', reader.exact(16))
+        else:
+            _, usize = struct.unpack('<II', reader.exact(8))
+        return crc, usize
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Test setup: minimal stand-ins for Kodi's xbmc* modules (only available inside Kodi) and the addon directory
+on sys.path, so resources.lib imports the same way it does in Kodi. Run with: python -m pytest tests
+"""
+import os
+import sys
+import tempfile
+import types
+
+ADDON_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         'addons', 'plugin.program.auto.ftp.sync')
+PROFILE_DIR = tempfile.mkdtemp(prefix='auto_ftp_sync_tests_')
+
+
+class _Monitor:
+    def abortRequested(self):
+        return False
+
+    def waitForAbort(self, timeout=None):
+        return False  # retries in tests do not sleep
+
+
+class _Addon:
+    def __init__(self, id=None):
+        pass
+
+    def getAddonInfo(self, key):
+        return PROFILE_DIR if key == 'profile' else ''
+
+    def getSetting(self, key):
+        return ''
+
+    def getLocalizedString(self, string_id):
+        return ''
+
+
+def _stub(name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    sys.modules.setdefault(name, module)
+
+
+_stub('xbmc', LOGDEBUG=0, LOGINFO=1, LOGWARNING=2, LOGERROR=3, log=lambda msg, level=0: None,
+      Monitor=_Monitor, executebuiltin=lambda command: None)
+_stub('xbmcaddon', Addon=_Addon)
+_stub('xbmcgui')
+_stub('xbmcvfs', translatePath=lambda path: path)
+sys.path.insert(0, ADDON_DIR)
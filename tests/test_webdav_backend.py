@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""WebDAVBackend against a small in-memory WebDAV server (http.server)."""
+import email.utils
+import hashlib
+import http.server
+import threading
+from urllib.parse import quote, unquote
+
+import pytest
+
+from resources.lib import sync_backend
+
+
+class DavServer(http.server.ThreadingHTTPServer):
+    """Files and collections in memory; drop_after_response closes kept-alive connections silently."""
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), DavHandler)
+        self.files = {}
+        self.dirs = {'/'}
+        self.requests = []
+        self.drop_after_response = False
+
+    def etag(self, path):
+        return '"%s"' % hashlib.sha256(self.files[path]).hexdigest()[:16]
+
+
+class DavHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _path(self):
+        return unquote(self.path).rstrip('/') or '/'
+
+    def _reply(self, status, body=b'', headers=None):
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        if self.server.drop_after_response:
+            self.close_connection = True  # no "Connection: close": the client still thinks it is alive
+
+    def _body(self):
+        return self.rfile.read(int(self.headers.get('Content-Length') or 0))
+
+    def _record(self):
+        self.server.requests.append((self.command, self._path(), dict(self.headers)))
+
+    def do_PUT(self):
+        self._record()
+        path = self._path()
+        if (path.rsplit('/', 1)[0] or '/') not in self.server.dirs:
+            self._body()
+            return self._reply(409)
+        self.server.files[path] = self._body()
+        self._reply(201, headers={'ETag': self.server.etag(path)})
+
+    def do_GET(self):
+        self._record()
+        path = self._path()
+        if path not in self.server.files:
+            return self._reply(404)
+        etag = self.server.etag(path)
+        if self.headers.get('If-None-Match') == etag:
+            return self._reply(304, headers={'ETag': etag})
+        self._reply(200, self.server.files[path], {'ETag': etag})
+
+    def do_MKCOL(self):
+        self._record()
+        path = self._path()
+        if path in self.server.dirs or path in self.server.files:
+            return self._reply(405)
+        if (path.rsplit('/', 1)[0] or '/') not in self.server.dirs:
+            return self._reply(409)
+        self.server.dirs.add(path)
+        self._reply(201)
+
+    def do_DELETE(self):
+        self._record()
+        if self.server.files.pop(self._path(), None) is None:
+            return self._reply(404)
+        self._reply(204)
+
+    def do_PROPFIND(self):
+        self._record()
+        self._body()
+        path = self._path()
+        if path not in self.server.dirs:
+            return self._reply(404)
+        prefix = path.rstrip('/') + '/'
+        date = email.utils.formatdate(1700000000, usegmt=True)
+        responses = ['<d:response><d:href>%s</d:href><d:propstat><d:prop><d:resourcetype><d:collection/>'
+                     '</d:resourcetype></d:prop><d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>'
+                     % quote(prefix)]
+        for child in sorted(self.server.dirs | set(self.server.files)):
+            if child == path or not child.startswith(prefix) or '/' in child[len(prefix):]:
+                continue
+            if child in self.server.dirs:
+                prop = '<d:resourcetype><d:collection/></d:resourcetype>'
+            else:
+                prop = ('<d:resourcetype/><d:getcontentlength>%d</d:getcontentlength><d:getlastmodified>%s'
+                        '</d:getlastmodified><d:getetag>%s</d:getetag>'
+                        % (len(self.server.files[child]), date, self.server.etag(child)))
+            responses.append('<d:response><d:href>%s</d:href><d:propstat><d:prop>%s</d:prop>'
+                             '<d:status>HTTP/1.1 200 OK</d:status></d:propstat></d:response>'
+                             % (quote(child + ('/' if child in self.server.dirs else '')), prop))
+        body = ('<?xml version="1.0" encoding="utf-8"?><d:multistatus xmlns:d="DAV:">%s</d:multistatus>'
+                % ''.join(responses)).encode('utf-8')
+        self._reply(207, body, {'Content-Type': 'application/xml; charset=utf-8'})
+
+
+@pytest.fixture
+def server():
+    srv = DavServer()
+    thread = threading.Thread(target=srv.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+
+
+@pytest.fixture
+def backend(server, tmp_path):
+    b = sync_backend.WebDAVBackend('http://127.0.0.1:%d' % server.server_address[1], 'user', 'secret', '',
+                                   buffer_size=4096, retries=1, etag_file=str(tmp_path / 'etags.json'))
+    yield b
+    b.close()
+
+
+def test_upload_and_download(server, backend, tmp_path):
+    data = bytes(range(256)) * 100
+    src = tmp_path / 'src.bin'
+    src.write_bytes(data)
+    assert backend.makedirs('/sync')
+    assert backend.upload(str(src), '/sync/data.bin')
+    assert server.files['/sync/data.bin'] == data
+    assert server.requests[-1][2]['Authorization'].startswith('Basic ')
+    dst = tmp_path / 'dst.bin'
+    assert backend.download('/sync/data.bin', str(dst))
+    assert dst.read_bytes() == data
+    assert not (tmp_path / 'dst.bin.part').exists()
+
+
+def test_download_missing_keeps_local_file(backend, tmp_path):
+    dst = tmp_path / 'dst.bin'
+    dst.write_bytes(b'old')
+    assert not backend.download('/missing.bin', str(dst))
+    assert dst.read_bytes() == b'old'
+    assert not (tmp_path / 'dst.bin.part').exists()
+
+
+def test_unchanged_download_is_answered_with_304(server, backend, tmp_path):
+    server.files['/a.txt'] = b'hello'
+    dst = tmp_path / 'a.txt'
+    assert backend.download('/a.txt', str(dst))
+    assert 'If-None-Match' not in server.requests[-1][2]
+    assert backend.download('/a.txt', str(dst))
+    assert server.requests[-1][2]['If-None-Match'] == server.etag('/a.txt')
+    assert backend.stats['not_modified'] == 1
+    server.files['/a.txt'] = b'changed'
+    assert backend.download('/a.txt', str(dst))
+    assert dst.read_bytes() == b'changed'
+    assert backend.stats['not_modified'] == 1
+
+
+def test_upload_records_etag_for_later_downloads(server, backend, tmp_path):
+    src = tmp_path / 'b.txt'
+    src.write_bytes(b'uploaded')
+    assert backend.upload(str(src), '/b.txt')
+    assert backend.download('/b.txt', str(src))
+    assert backend.stats['not_modified'] == 1
+
+
+def test_list_dir_and_stat(server, backend):
+    server.dirs.update({'/sync', '/sync/sub dir'})
+    server.files['/sync/a b.txt'] = b'12345'
+    entries = backend.list_dir('/sync')
+    assert set(entries) == {'a b.txt', 'sub dir'}
+    assert entries['sub dir']['type'] == 'dir'
+    assert entries['a b.txt'] == {'type': 'file', 'size': 5, 'mtime': 1700000000, 'etag': server.etag('/sync/a b.txt')}
+    assert backend.stat('/sync/a b.txt')['size'] == 5
+    assert backend.stat('/sync/none') is None
+    assert backend.list_dir('/nothing') is None
+    assert backend.folder_exists('/sync/sub dir')
+    assert not backend.folder_exists('/nothing')
+
+
+def test_listing_is_cached_and_invalidated_by_writes(server, backend, tmp_path):
+    server.dirs.add('/sync')
+    backend.list_dir('/sync')
+    backend.list_dir('/sync')
+    assert [r[0] for r in server.requests].count('PROPFIND') == 1
+    src = tmp_path / 'c.txt'
+    src.write_bytes(b'c')
+    assert backend.upload(str(src), '/sync/c.txt')
+    assert 'c.txt' in backend.list_dir('/sync')
+    assert backend.delete('/sync/c.txt')
+    assert 'c.txt' not in backend.list_dir('/sync')
+    assert not backend.delete('/sync/c.txt')
+
+
+def test_makedirs_creates_missing_parents(server, backend):
+    server.dirs.add('/a')
+    assert backend.makedirs('/a/b/c')
+    assert {'/a/b', '/a/b/c'} <= server.dirs
+    mkcols = [r[1] for r in server.requests if r[0] == 'MKCOL']
+    assert mkcols == ['/a', '/a/b', '/a/b/c']  # 405 for the existing /a
+    assert backend.makedirs('/a/b/c')
+    assert [r[1] for r in server.requests if r[0] == 'MKCOL'] == mkcols  # remembered for the run
+
+
+def test_stale_keepalive_connection_is_replaced(server, backend, tmp_path):
+    server.files['/a.txt'] = b'hello'
+    server.drop_after_response = True
+    assert backend.download('/a.txt', str(tmp_path / 'one'))
+    assert backend.download('/a.txt', str(tmp_path / 'two'))
+    assert (tmp_path / 'two').read_bytes() == b'hello'
+    stats = backend.close()
+    assert stats['reconnects'] == 1
+    assert stats['connections'] == 2
@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""build_zip/RawZipWriter: archives must open with zipfile and stream through StreamingUnzip."""
+import io
+import os
+import random
+import zipfile
+
+import pytest
+
+from resources.lib import zip_build
+from resources.lib import zip_policy
+from resources.lib import zip_stream
+
+BLOCK = 4096
+
+
+def _write(root, rel, data):
+    path = root / rel
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return path
+
+
+def _files(root):
+    """[(arcname, abs_path, stat), ...] like create_zip passes them, sorted by arcname."""
+    files = []
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(dirpath, name)
+            files.append((os.path.relpath(path, root).replace(os.sep, '/'), path, os.stat(path)))
+    return sorted(files)
+
+
+def _build(files, **kwargs):
+    out = io.BytesIO()
+    stats = zip_build.build_zip(out, files, block_size=BLOCK, **kwargs)
+    return out.getvalue(), stats
+
+
+def _contents(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.testzip() is None
+        return {info.filename: zf.read(info) for info in zf.infolist()}
+
+
+def _unzip(data, target):
+    unzip = zip_stream.StreamingUnzip(str(target), buffer_size=1024)
+    ok = unzip.extract(io.BytesIO(data))
+    return ok, unzip
+
+
+@pytest.fixture
+def tree(tmp_path):
+    rng = random.Random(21)
+    root = tmp_path / 'addon_data'
+    _write(root, 'plugin.a/settings.xml', b'<settings>' + b'<setting id="x">1</setting>' * 400 + b'</settings>')
+    _write(root, 'plugin.a/cache/big.db', bytes(rng.getrandbits(8) for _ in range(5 * BLOCK + 123)))
+    _write(root, 'plugin.a/cache/text.log', b'line of text\n' * 3000)
+    _write(root, 'plugin.b/empty.txt', b'')
+    _write(root, 'plugin.b/Überblick ä.txt', 'grüße'.encode('utf-8'))
+    return root
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_archive_is_valid_and_identical_for_any_worker_count(tree, workers):
+    files = _files(tree)
+    data, stats = _build(files, workers=workers)
+    assert data == _build(files, workers=1)[0]
+    assert _contents(data) == {arcname: open(path, 'rb').read() for arcname, path, _ in files}
+    assert stats['files'] == len(files)
+    assert stats['bytes_out'] == len(data)
+
+
+@pytest.mark.parametrize('workers', [1, 4])
+def test_streaming_unzip_round_trip(tree, tmp_path, workers):
+    files = _files(tree)
+    data, _ = _build(files, workers=workers)
+    ok, unzip = _unzip(data, tmp_path / 'out')
+    assert ok and not unzip.unsupported
+    assert unzip.stats['written'] == len(files)
+    for arcname, path, _ in files:
+        assert (tmp_path / 'out' / arcname).read_bytes() == open(path, 'rb').read()
+
+
+def test_utf8_names_and_empty_files(tree):
+    data, _ = _build(_files(tree))
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        utf8 = zf.getinfo('plugin.b/Überblick ä.txt')
+        assert utf8.flag_bits & 0x800
+        assert not zf.getinfo('plugin.a/settings.xml').flag_bits & 0x800
+        empty = zf.getinfo('plugin.b/empty.txt')
+        assert empty.file_size == 0 and zf.read(empty) == b''
+
+
+def test_multi_block_member_uses_data_descriptor(tree):
+    data, _ = _build(_files(tree))
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.getinfo('plugin.a/cache/big.db').flag_bits & 0x08
+        assert not zf.getinfo('plugin.b/Überblick ä.txt').flag_bits & 0x08
+
+
+def test_zip64_descriptor_member(tmp_path):
+    payload = b'zip64 member ' * 100
+    out = io.BytesIO()
+    writer = zip_build.RawZipWriter(out)
+    member = zip_build.ZipMember('big.bin', 1700000000, 0o100644, method=zipfile.ZIP_STORED,
+                                 usize_hint=zipfile.ZIP64_LIMIT)
+    assert member.zip64
+    writer.begin(member)
+    writer.write(payload)
+    member.crc, member.csize, member.usize = zipfile.crc32(payload), len(payload), len(payload)
+    writer.finish(member)
+    writer.close()
+    data = out.getvalue()
+    descriptor = zip_build._DESCRIPTOR64.pack(b'PK\x07\x08', member.crc, len(payload), len(payload))
+    assert descriptor in data
+    assert _contents(data) == {'big.bin': payload}
+
+
+def test_zip64_deflated_descriptor_member_streams(tmp_path):
+    payload = b'zip64 deflated ' * 1000
+    out = io.BytesIO()
+    writer = zip_build.RawZipWriter(out)
+    member = zip_build.ZipMember('sub/big.txt', 1700000000, 0o100644, usize_hint=zipfile.ZIP64_LIMIT)
+    writer.begin(member)
+    compressed = zip_build._deflate_block(payload, None, True, 6)
+    writer.write(compressed)
+    member.crc, member.csize, member.usize = zipfile.crc32(payload), len(compressed), len(payload)
+    writer.finish(member)
+    writer.close()
+    ok, _ = _unzip(out.getvalue(), tmp_path / 'out')
+    assert ok
+    assert (tmp_path / 'out' / 'sub' / 'big.txt').read_bytes() == payload
+
+
+def test_member_growing_past_the_limit_without_zip64_fails():
+    writer = zip_build.RawZipWriter(io.BytesIO())
+    member = zip_build.ZipMember('grown.bin', 1700000000, 0o100644)
+    writer.begin(member)
+    member.usize = zip_build._MAX32 + 1
+    with pytest.raises(zipfile.LargeZipFile):
+        writer.finish(member)
+
+
+def test_archive_cache_reuses_unchanged_members(tree, tmp_path):
+    cache_zip = str(tmp_path / 'cache' / 'addon_data.zip')
+    built = str(tmp_path / 'addon_data.zip')
+    files = _files(tree)
+    cache = zip_build.ArchiveCache(cache_zip).open()
+    with open(built, 'wb') as out:
+        stats = zip_build.build_zip(out, files, block_size=BLOCK, cache=cache)
+    assert stats['reused'] == 0
+    cache.store(built, files)
+
+    changed = tree / 'plugin.a' / 'settings.xml'
+    changed.write_bytes(b'<settings/>')
+    os.utime(changed, ns=(0, 1_000_000_000))
+    files = _files(tree)
+    cache = zip_build.ArchiveCache(cache_zip).open()
+    try:
+        data, stats = _build(files, workers=4, cache=cache)
+    finally:
+        cache.close()
+    assert stats['reused'] == len(files) - 1
+    assert stats['bytes_reused'] == sum(st.st_size for arcname, _, st in files if arcname != 'plugin.a/settings.xml')
+    assert _contents(data) == {arcname: open(path, 'rb').read() for arcname, path, _ in files}
+    ok, _ = _unzip(data, tmp_path / 'out')
+    assert ok
+
+
+def test_archive_cache_without_index_reuses_nothing(tree, tmp_path):
+    files = _files(tree)
+    cache = zip_build.ArchiveCache(str(tmp_path / 'missing.zip')).open()
+    _, stats = _build(files, cache=cache)
+    cache.close()
+    assert stats['reused'] == 0
+
+
+def test_large_stored_file_becomes_deflate_level_0(tmp_path):
+    rng = random.Random(23)
+    root = tmp_path / 'addon_data'
+    big = bytes(rng.getrandbits(8) for _ in range(3 * BLOCK + 100))
+    _write(root, 'plugin.c/fanart.png', big)
+    _write(root, 'plugin.c/icon.png', big[:100])
+    data, stats = _build(_files(root), workers=4)
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        large, small = zf.getinfo('plugin.c/fanart.png'), zf.getinfo('plugin.c/icon.png')
+        assert large.compress_type == zipfile.ZIP_DEFLATED and large.flag_bits & 0x08
+        assert large.compress_size < len(big) + 64  # stored deflate blocks, no real compression
+        assert small.compress_type == zipfile.ZIP_STORED and not small.flag_bits & 0x08
+    assert _contents(data)['plugin.c/fanart.png'] == big
+    ok, unzip = _unzip(data, tmp_path / 'out')
+    assert ok and not unzip.unsupported
+    assert (tmp_path / 'out' / 'plugin.c' / 'fanart.png').read_bytes() == big
+
+
+@pytest.mark.parametrize('method', [zipfile.ZIP_DEFLATED, zipfile.ZIP_BZIP2, zipfile.ZIP_LZMA])
+def test_text_method(tmp_path, method):
+    if method == zipfile.ZIP_LZMA and zip_policy.lzma is None:
+        pytest.skip('no lzma module')
+    root = tmp_path / 'addon_data'
+    text = b'<item><title>Some title</title><year>2001</year></item>\n' * 2000
+    _write(root, 'plugin.d/library.xml', text)
+    _write(root, 'plugin.d/small.xml', b'<small/>')
+    policy = zip_policy.CompressionPolicy(6, method)
+    data, stats = _build(_files(root), workers=4, policy=policy)
+    with zipfile.ZipFile(io.BytesIO(data)) as zf:
+        assert zf.getinfo('plugin.d/library.xml').compress_type == method
+        assert zf.getinfo('plugin.d/small.xml').compress_type == zipfile.ZIP_DEFLATED
+    assert _contents(data)['plugin.d/library.xml'] == text
+    ok, unzip = _unzip(data, tmp_path / 'out')
+    assert ok == (method == zipfile.ZIP_DEFLATED)
+    assert unzip.unsupported == (method != zipfile.ZIP_DEFLATED)